@@ -8,14 +8,19 @@ import os
 import sys
 import time
 import json
+import logging
+import queue
+import threading
+import orjson
 from typing import Optional, Dict, List
+from dataclasses import dataclass
 from datetime import datetime
+from functools import cached_property
 from pathlib import Path
 from colorama import init, Fore, Style
 from dotenv import load_dotenv
 
-# Import all our components
-from src.voice_pipeline import VoicePipeline
+# Import all our components (VoicePipeline is imported lazily)
 from src.conversation_manager_v2 import EnhancedConversationManager, ConversationState
 from src.menu_rag import TacoBellMenuRAG
 from src.response_generator import TacoBellResponseGenerator
@@ -23,6 +28,64 @@ from src.error_handler import ErrorHandler, ErrorType
 
 init(autoreset=True)
 load_dotenv()
+log = logging.getLogger(__name__)
+
+RULE = "=" * 70
+
+# Customer phrases that end the conversation
+QUIT_PHRASES = frozenset({"quit", "exit", "cancel", "never mind"})
+
+
+@dataclass(slots=True)
+class Turn:
+    """One exchange in a logged conversation"""
+    agent: str
+    customer: Optional[str] = None
+    confidence: Optional[float] = None
+    state: Optional[str] = None
+
+
+def _write_block(lines: List[str]):
+    """
+    Write a block of console lines with a single write + flush
+    
+    Each line is reset explicitly, matching what autoreset does per print().
+    """
+    sys.stdout.write("".join(f"{line}{Style.RESET_ALL}\n" for line in lines))
+    sys.stdout.flush()
+
+
+# Static main menu, rendered once
+MAIN_MENU = [
+    f"\n{Fore.CYAN}{RULE}",
+    f"{Fore.CYAN}🌮 TACO BELL VOICE AGENT - MAIN MENU",
+    f"{Fore.CYAN}{RULE}\n",
+    f"{Fore.YELLOW}1. Start new conversation",
+    f"{Fore.YELLOW}2. View statistics",
+    f"{Fore.YELLOW}3. Test menu search",
+    f"{Fore.YELLOW}4. View diagnostics",
+    f"{Fore.YELLOW}5. Exit",
+]
+
+NEW_CUSTOMER_BANNER = [
+    f"{Fore.MAGENTA}{RULE}",
+    f"{Fore.MAGENTA}🚗 NEW CUSTOMER",
+    f"{Fore.MAGENTA}{RULE}\n",
+]
+
+INIT_BANNER = [
+    f"{Fore.CYAN}{RULE}",
+    f"{Fore.CYAN}🌮 TACO BELL VOICE AGENT - INITIALIZING",
+    f"{Fore.CYAN}{RULE}\n",
+    f"{Fore.GREEN}✓ Agent ready (components load on first use)",
+    f"{Fore.GREEN}{RULE}\n",
+]
+
+MENU_SEARCH_BANNER = [
+    f"\n{Fore.CYAN}{RULE}",
+    f"{Fore.CYAN}🔍 MENU SEARCH TEST",
+    f"{Fore.CYAN}{RULE}\n",
+]
 
 class TacoBellVoiceAgent:
     """Complete Taco Bell Drive-Thru Voice Agent"""
@@ -30,24 +93,41 @@ class TacoBellVoiceAgent:
     def __init__(
         self, 
         whisper_model: str = "base",
+        beam_size: int = 1,
+        vad_filter: bool = True,
+        quantize: bool = True,
+        streaming_stt: bool = False,
+        barge_in: bool = False,
         enable_voice: bool = True,
         enable_logging: bool = True,
-        log_dir: str = "logs"
+        log_dir: str = "logs",
+        quiet: bool = False
     ):
         """
         Initialize the complete voice agent
         
         Args:
             whisper_model: Whisper model size (tiny, base, small, medium)
+            beam_size: Whisper decoding beam size (1 = greedy)
+            vad_filter: Skip silence with VAD before transcription
+            quantize: Load Whisper with int8 weights
+            streaming_stt: Use live streaming STT instead of batch Whisper
+            barge_in: Listen while the agent is still talking so the customer
+                     can cut it off (needs a headset or echo-cancelling audio;
+                     otherwise the mic hears the agent's own voice)
             enable_voice: Enable voice I/O (False for text-only testing)
             enable_logging: Enable conversation logging
             log_dir: Directory for logs
+            quiet: Suppress startup/loading banners (also implied when stdout isn't a TTY)
         """
-        print(f"{Fore.CYAN}{'='*70}")
-        print(f"{Fore.CYAN}🌮 TACO BELL VOICE AGENT - INITIALIZING")
-        print(f"{Fore.CYAN}{'='*70}\n")
+        # Startup chatter goes through _log so piped/CI runs skip it entirely
+        if quiet or not sys.stdout.isatty():
+            self._log = lambda lines: None
+        else:
+            self._log = _write_block
         
         self.enable_voice = enable_voice
+        self.barge_in = barge_in
         self.enable_logging = enable_logging
         self.log_dir = Path(log_dir)
         
@@ -55,50 +135,102 @@ class TacoBellVoiceAgent:
         if enable_logging:
             self.log_dir.mkdir(parents=True, exist_ok=True)
             self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
-            self.log_file = self.log_dir / f"session_{self.session_id}.json"
+            # Append-only JSONL: a session header line, then one line per conversation
+            self.log_file = self.log_dir / f"session_{self.session_id}.jsonl"
             self.session_log = {
                 "session_id": self.session_id,
-                "start_time": datetime.now().isoformat(),
-                "conversations": []
+                "start_time": datetime.now().isoformat()
             }
         else:
             self.log_file = None
             self.session_log = None
+        self._log_fp = None
+        self._pending_logs = []
         
-        # Initialize components
+        # Background TTS (started with the voice pipeline)
+        self._tts_q = queue.Queue()
+        self._tts_stop = threading.Event()
+        self._tts_thread = None
+        
+        # Voice pipeline settings (loaded on first use)
+        self._voice_options = dict(
+            model_size=whisper_model,
+            beam_size=beam_size,
+            vad_filter=vad_filter,
+            quantize=quantize,
+            streaming_stt=streaming_stt
+        )
+        
+        # Performance tracking
+        self.stats = {
+            "conversations": 0,
+            "successful_orders": 0,
+            "errors": 0,
+            "avg_conversation_length": 0.0,
+            "avg_order_value": 0.0
+        }
+        
+        # Heavy components are lazy-loaded properties below, so startup is
+        # instant and e.g. "View statistics" never loads Whisper or the RAG index
+        self._log(INIT_BANNER)
+    
+    @cached_property
+    def voice(self):
+        """Voice pipeline (None in text-only mode)"""
+        if not self.enable_voice:
+            self._log([f"{Fore.YELLOW}Voice disabled - text mode only"])
+            return None
+        
+        self._log([f"{Fore.YELLOW}Initializing voice pipeline..."])
+        # Deferred import - skips torch/Whisper entirely in text mode
+        from src.voice_pipeline import VoicePipeline
+        voice = self._init_component(VoicePipeline, **self._voice_options)
+        
+        # The worker thread owns playback (and the TTS engine, created by its
+        # first speak) so _output never blocks on TTS
+        self._tts_thread = threading.Thread(target=self._tts_worker, args=(voice,), daemon=True)
+        self._tts_thread.start()
+        return voice
+    
+    def _tts_worker(self, voice):
+        """Speak queued text in order until a None sentinel arrives"""
+        while True:
+            text = self._tts_q.get()
+            try:
+                if text is None:
+                    return
+                voice.speak(text, stop_event=self._tts_stop)
+            except Exception as e:
+                log.warning("TTS failed: %s", e)
+            finally:
+                self._tts_q.task_done()
+    
+    @cached_property
+    def conversation(self) -> EnhancedConversationManager:
+        """Conversation manager"""
+        self._log([f"{Fore.YELLOW}Initializing conversation manager..."])
+        return self._init_component(EnhancedConversationManager)
+    
+    @cached_property
+    def menu(self) -> TacoBellMenuRAG:
+        """Menu RAG system"""
+        # Reuse the conversation manager's index if it's already loaded
+        if "conversation" in self.__dict__:
+            return self.conversation.menu_rag
+        
+        self._log([f"{Fore.YELLOW}Initializing menu RAG system..."])
+        return self._init_component(TacoBellMenuRAG)
+    
+    @cached_property
+    def response_gen(self) -> TacoBellResponseGenerator:
+        """Response generator"""
+        self._log([f"{Fore.YELLOW}Initializing response generator..."])
+        return self._init_component(TacoBellResponseGenerator)
+    
+    def _init_component(self, component_cls, **kwargs):
+        """Construct a component, reporting failures the same way for all"""
         try:
-            # Voice pipeline (optional)
-            if enable_voice:
-                print(f"{Fore.YELLOW}Initializing voice pipeline...")
-                self.voice = VoicePipeline(model_size=whisper_model)
-            else:
-                print(f"{Fore.YELLOW}Voice disabled - text mode only")
-                self.voice = None
-            
-            # Conversation manager
-            print(f"{Fore.YELLOW}Initializing conversation manager...")
-            self.conversation = EnhancedConversationManager()
-            
-            # Menu RAG
-            print(f"{Fore.YELLOW}Initializing menu RAG system...")
-            self.menu = TacoBellMenuRAG()
-            
-            # Response generator
-            print(f"{Fore.YELLOW}Initializing response generator...")
-            self.response_gen = TacoBellResponseGenerator()
-            
-            print(f"\n{Fore.GREEN}✓ All components initialized successfully!")
-            print(f"{Fore.GREEN}{'='*70}\n")
-            
-            # Performance tracking
-            self.stats = {
-                "conversations": 0,
-                "successful_orders": 0,
-                "errors": 0,
-                "avg_conversation_length": 0.0,
-                "avg_order_value": 0.0
-            }
-            
+            return component_cls(**kwargs)
         except Exception as e:
             print(f"{Fore.RED}✗ Initialization failed: {e}")
             import traceback
@@ -111,17 +243,37 @@ class TacoBellVoiceAgent:
         self._output(greeting)
         return greeting
     
-    def _output(self, text: str):
-        """Output text (speak or print)"""
+    def _output(self, text: str) -> str:
+        """
+        Output text (speak or print)
+        
+        Speech is queued for the TTS worker, so this returns without
+        waiting for playback.
+        """
+        if self.voice:
+            # New agent output - clear any earlier barge-in
+            self._tts_stop.clear()
+        
         print(f"{Fore.GREEN}🤖 Agent: {text}")
         if self.voice:
-            self.voice.speak(text)
+            self._tts_q.put(text)
+        return text
     
     def _input(self) -> tuple[str, float]:
         """Get input (voice or text)"""
         if self.voice:
+            if not self.barge_in:
+                # Echo guard: an open mic would pick up the agent's reply,
+                # cut it off and transcribe it as the customer - wait until
+                # queued speech has finished playing
+                self._tts_q.join()
             print(f"{Fore.YELLOW}🎤 Listening...")
-            text, confidence = self.voice.process_voice_input()
+            # With barge-in, customer speech cuts off whatever the agent is still saying;
+            # streamed partials start intent detection before the customer finishes
+            text, confidence = self.voice.process_voice_input(
+                barge_in=self._tts_stop if self.barge_in else None,
+                on_partial=self.conversation.on_partial_threadsafe if self.voice.streaming_stt else None
+            )
             return text, confidence
         else:
             # Text mode
@@ -132,9 +284,16 @@ class TacoBellVoiceAgent:
         """
         Process customer input through the conversation manager
         
+        With streaming STT the turn runs on the conversation manager's
+        event loop, where intent detection started from the ASR partials
+        is already under way.
+        
         Returns:
             Tuple of (response, new_state)
         """
+        if self.voice and self.voice.streaming_stt:
+            return self.conversation.process_input_threadsafe(text, confidence)
+        
         response, state = self.conversation.process_input(text, confidence)
         return response, state
     
@@ -145,11 +304,9 @@ class TacoBellVoiceAgent:
         Returns:
             Dictionary with conversation summary
         """
-        print(f"{Fore.MAGENTA}{'='*70}")
-        print(f"{Fore.MAGENTA}🚗 NEW CUSTOMER")
-        print(f"{Fore.MAGENTA}{'='*70}\n")
+        _write_block(NEW_CUSTOMER_BANNER)
         
-        conversation_start = time.time()
+        conversation_start = time.perf_counter()
         conversation_data = {
             "timestamp": datetime.now().isoformat(),
             "turns": [],
@@ -163,10 +320,7 @@ class TacoBellVoiceAgent:
         
         # Greet customer
         greeting = self.greet_customer()
-        conversation_data["turns"].append({
-            "agent": greeting,
-            "customer": None
-        })
+        conversation_data["turns"].append(Turn(agent=greeting))
         
         # Conversation loop
         turn_count = 0
@@ -191,12 +345,12 @@ class TacoBellVoiceAgent:
                 self._output(response)
                 
                 # Log turn
-                conversation_data["turns"].append({
-                    "customer": customer_text,
-                    "confidence": confidence,
-                    "agent": response,
-                    "state": state.value
-                })
+                conversation_data["turns"].append(Turn(
+                    agent=response,
+                    customer=customer_text,
+                    confidence=confidence,
+                    state=state.value
+                ))
                 
                 # Check if conversation is complete
                 if state == ConversationState.GOODBYE:
@@ -205,7 +359,7 @@ class TacoBellVoiceAgent:
                     break
                 
                 # Check if customer wants to quit
-                if customer_text.lower() in ['quit', 'exit', 'cancel', 'never mind']:
+                if customer_text.lower() in QUIT_PHRASES:
                     self._output("No problem! Have a great day!")
                     break
                 
@@ -219,34 +373,46 @@ class TacoBellVoiceAgent:
                 break
         
         # End of conversation
-        conversation_end = time.time()
+        conversation_end = time.perf_counter()
         conversation_data["duration"] = conversation_end - conversation_start
         conversation_data["turn_count"] = turn_count
         
-        # Update stats
+        self.record_conversation(conversation_data)
+        
+        # Print summary
+        self._print_conversation_summary(conversation_data)
+        
+        return conversation_data
+    
+    def record_conversation(self, conversation_data: Dict):
+        """
+        Fold a finished conversation into the session stats and log
+        
+        Args:
+            conversation_data: Summary with turn_count, success and final_order
+        """
+        # Update stats (running means use the incremental avg += (x - avg) / n form)
         self.stats["conversations"] += 1
+        self.stats["avg_conversation_length"] += (
+            (conversation_data["turn_count"] - self.stats["avg_conversation_length"]) / self.stats["conversations"]
+        )
         if conversation_data["success"]:
             self.stats["successful_orders"] += 1
             if conversation_data["final_order"]:
                 total = conversation_data["final_order"].get("total", 0.0)
-                self.stats["avg_order_value"] = (
-                    (self.stats["avg_order_value"] * (self.stats["successful_orders"] - 1) + total) 
-                    / self.stats["successful_orders"]
+                self.stats["avg_order_value"] += (
+                    (total - self.stats["avg_order_value"]) / self.stats["successful_orders"]
                 )
         
         # Log conversation
         if self.enable_logging:
-            self.session_log["conversations"].append(conversation_data)
+            self._pending_logs.append(conversation_data)
             self._save_log()
-        
-        # Print summary
-        self._print_conversation_summary(conversation_data)
-        
-        return conversation_data
     
-    def _get_order_summary(self) -> Dict:
-        """Get current order summary"""
-        order = self.conversation.order
+    def _get_order_summary(self, order=None) -> Dict:
+        """Get the order summary (of the current conversation unless an order is given)"""
+        if order is None:
+            order = self.conversation.order
         return {
             "items": [
                 {
@@ -263,69 +429,105 @@ class TacoBellVoiceAgent:
     
     def _print_conversation_summary(self, data: Dict):
         """Print conversation summary"""
-        print(f"\n{Fore.MAGENTA}{'='*70}")
-        print(f"{Fore.MAGENTA}📊 CONVERSATION SUMMARY")
-        print(f"{Fore.MAGENTA}{'='*70}\n")
-        
-        print(f"{Fore.CYAN}Duration: {data['duration']:.1f}s")
-        print(f"{Fore.CYAN}Turns: {data['turn_count']}")
-        print(f"{Fore.CYAN}Success: {data['success']}")
+        lines = [
+            f"\n{Fore.MAGENTA}{RULE}",
+            f"{Fore.MAGENTA}📊 CONVERSATION SUMMARY",
+            f"{Fore.MAGENTA}{RULE}\n",
+            f"{Fore.CYAN}Duration: {data['duration']:.1f}s",
+            f"{Fore.CYAN}Turns: {data['turn_count']}",
+            f"{Fore.CYAN}Success: {data['success']}",
+        ]
         
         if data.get("final_order") and data["final_order"]["items"]:
-            print(f"\n{Fore.GREEN}Final Order:")
+            lines.append(f"\n{Fore.GREEN}Final Order:")
             for item in data["final_order"]["items"]:
                 mods = f" ({', '.join(item['modifications'])})" if item['modifications'] else ""
-                print(f"  • {item['quantity']}x {item['name']}{mods} - ${item['price'] * item['quantity']:.2f}")
-            print(f"\n{Fore.GREEN}Total: ${data['final_order']['total']:.2f}")
+                lines.append(f"  • {item['quantity']}x {item['name']}{mods} - ${item['price'] * item['quantity']:.2f}")
+            lines.append(f"\n{Fore.GREEN}Total: ${data['final_order']['total']:.2f}")
         else:
-            print(f"\n{Fore.YELLOW}No order completed")
+            lines.append(f"\n{Fore.YELLOW}No order completed")
         
-        print(f"\n{Fore.MAGENTA}{'='*70}\n")
+        lines.append(f"\n{Fore.MAGENTA}{RULE}\n")
+        _write_block(lines)
     
     def _save_log(self):
-        """Save session log to file"""
+        """
+        Append pending conversations to the session log
+        
+        Each conversation is written as a single JSONL line, so cost is
+        proportional to the new data rather than the whole session.
+        Turn dataclasses are serialized natively by orjson.
+        """
         try:
-            with open(self.log_file, 'w') as f:
-                json.dump(self.session_log, f, indent=2)
+            if self._log_fp is None:
+                self._log_fp = open(self.log_file, 'ab', buffering=1 << 16)
+                self._log_fp.write(orjson.dumps(self.session_log, option=orjson.OPT_APPEND_NEWLINE))
+            
+            for conversation_data in self._pending_logs:
+                self._log_fp.write(orjson.dumps(conversation_data, option=orjson.OPT_APPEND_NEWLINE))
+            self._pending_logs.clear()
+            self._log_fp.flush()
         except Exception as e:
             print(f"{Fore.YELLOW}Warning: Could not save log: {e}")
     
+    def close(self):
+        """Finish pending speech, flush and close the session log, release connections"""
+        if self._tts_thread is not None:
+            self._tts_q.put(None)
+            self._tts_thread.join()
+            self._tts_thread = None
+        
+        if self._log_fp is not None:
+            self._save_log()
+            self._log_fp.close()
+            self._log_fp = None
+        
+        if "conversation" in self.__dict__:
+            self.conversation.close()
+    
+    @staticmethod
+    def load_session_log(log_file: str) -> Dict:
+        """Rebuild the full session view from a JSONL session log"""
+        with open(log_file, 'rb') as f:
+            lines = [orjson.loads(line) for line in f if line.strip()]
+        
+        if not lines:
+            return {}
+        
+        session = lines[0]
+        session["conversations"] = lines[1:]
+        return session
+    
     def print_statistics(self):
         """Print session statistics"""
-        print(f"\n{Fore.CYAN}{'='*70}")
-        print(f"{Fore.CYAN}📈 SESSION STATISTICS")
-        print(f"{Fore.CYAN}{'='*70}\n")
-        
-        print(f"Total Conversations: {self.stats['conversations']}")
-        print(f"Successful Orders: {self.stats['successful_orders']}")
-        print(f"Success Rate: {self.stats['successful_orders']/max(1, self.stats['conversations'])*100:.1f}%")
-        print(f"Errors: {self.stats['errors']}")
-        print(f"Avg Order Value: ${self.stats['avg_order_value']:.2f}")
+        lines = [
+            f"\n{Fore.CYAN}{RULE}",
+            f"{Fore.CYAN}📈 SESSION STATISTICS",
+            f"{Fore.CYAN}{RULE}\n",
+            f"Total Conversations: {self.stats['conversations']}",
+            f"Successful Orders: {self.stats['successful_orders']}",
+            f"Success Rate: {self.stats['successful_orders']/max(1, self.stats['conversations'])*100:.1f}%",
+            f"Errors: {self.stats['errors']}",
+            f"Avg Order Value: ${self.stats['avg_order_value']:.2f}",
+        ]
         
-        # Get diagnostics from conversation manager
-        diagnostics = self.conversation.get_diagnostics()
-        print(f"\n{Fore.YELLOW}Error Statistics:")
+        # Get diagnostics from conversation manager (if it has been loaded)
+        diagnostics = self.conversation.get_diagnostics() if "conversation" in self.__dict__ else {}
+        lines.append(f"\n{Fore.YELLOW}Error Statistics:")
         if diagnostics.get("error_stats"):
             error_stats = diagnostics["error_stats"]
-            print(f"  Total Errors: {error_stats.get('total_errors', 0)}")
+            lines.append(f"  Total Errors: {error_stats.get('total_errors', 0)}")
             if error_stats.get('by_type'):
                 for error_type, count in error_stats['by_type'].items():
-                    print(f"  {error_type}: {count}")
+                    lines.append(f"  {error_type}: {count}")
         
-        print(f"\n{Fore.CYAN}{'='*70}\n")
+        lines.append(f"\n{Fore.CYAN}{RULE}\n")
+        _write_block(lines)
     
     def run_interactive_mode(self):
         """Run in interactive mode with menu"""
         while True:
-            print(f"\n{Fore.CYAN}{'='*70}")
-            print(f"{Fore.CYAN}🌮 TACO BELL VOICE AGENT - MAIN MENU")
-            print(f"{Fore.CYAN}{'='*70}\n")
-            
-            print(f"{Fore.YELLOW}1. Start new conversation")
-            print(f"{Fore.YELLOW}2. View statistics")
-            print(f"{Fore.YELLOW}3. Test menu search")
-            print(f"{Fore.YELLOW}4. View diagnostics")
-            print(f"{Fore.YELLOW}5. Exit")
+            _write_block(MAIN_MENU)
             
             choice = input(f"\n{Fore.GREEN}Select option: ").strip()
             
@@ -338,6 +540,7 @@ class TacoBellVoiceAgent:
             elif choice == "4":
                 self._print_diagnostics()
             elif choice == "5":
+                self.close()
                 print(f"\n{Fore.GREEN}Goodbye! Session saved to {self.log_file}")
                 break
             else:
@@ -345,9 +548,7 @@ class TacoBellVoiceAgent:
     
     def _test_menu_search(self):
         """Test menu search functionality"""
-        print(f"\n{Fore.CYAN}{'='*70}")
-        print(f"{Fore.CYAN}🔍 MENU SEARCH TEST")
-        print(f"{Fore.CYAN}{'='*70}\n")
+        _write_block(MENU_SEARCH_BANNER)
         
         query = input(f"{Fore.YELLOW}Enter search query: ").strip()
         if not query:
@@ -366,13 +567,14 @@ class TacoBellVoiceAgent:
     
     def _print_diagnostics(self):
         """Print system diagnostics"""
-        print(f"\n{Fore.CYAN}{'='*70}")
-        print(f"{Fore.CYAN}🔧 SYSTEM DIAGNOSTICS")
-        print(f"{Fore.CYAN}{'='*70}\n")
-        
         diagnostics = self.conversation.get_diagnostics()
-        print(json.dumps(diagnostics, indent=2))
-        print()
+        _write_block([
+            f"\n{Fore.CYAN}{RULE}",
+            f"{Fore.CYAN}🔧 SYSTEM DIAGNOSTICS",
+            f"{Fore.CYAN}{RULE}\n",
+            json.dumps(diagnostics, indent=2),
+            ""
+        ])
 
 
 def main():
@@ -391,18 +593,58 @@ def main():
         choices=["tiny", "base", "small", "medium"],
         help="Whisper model size"
     )
+    parser.add_argument(
+        "--beam-size",
+        type=int,
+        default=1,
+        help="Whisper beam size (1 = greedy decoding, fastest)"
+    )
+    parser.add_argument(
+        "--no-vad",
+        action="store_true",
+        help="Disable VAD silence trimming before transcription"
+    )
+    parser.add_argument(
+        "--no-quantize",
+        action="store_true",
+        help="Load Whisper in fp32 instead of int8"
+    )
+    parser.add_argument(
+        "--streaming-stt",
+        action="store_true",
+        help="Stream audio to Deepgram for live transcription (needs DEEPGRAM_API_KEY)"
+    )
+    parser.add_argument(
+        "--barge-in",
+        action="store_true",
+        help="Let the customer interrupt agent speech (needs a headset or echo cancellation)"
+    )
     parser.add_argument(
         "--no-logging",
         action="store_true",
         help="Disable conversation logging"
     )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Suppress startup banners"
+    )
     parser.add_argument(
         "--single-conversation",
         action="store_true",
         help="Run single conversation and exit"
     )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Show debug logging"
+    )
     
     args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
     
     # Check for API key
     if not os.getenv("OPENAI_API_KEY"):
@@ -410,12 +652,19 @@ def main():
         print(f"{Fore.YELLOW}Please create a .env file with your OpenAI API key")
         return
     
+    agent = None
     try:
         # Initialize agent
         agent = TacoBellVoiceAgent(
             whisper_model=args.whisper_model,
+            beam_size=args.beam_size,
+            vad_filter=not args.no_vad,
+            quantize=not args.no_quantize,
+            streaming_stt=args.streaming_stt,
+            barge_in=args.barge_in,
             enable_voice=not args.text_only,
-            enable_logging=not args.no_logging
+            enable_logging=not args.no_logging,
+            quiet=args.quiet
         )
         
         # Run mode
@@ -431,6 +680,10 @@ def main():
         print(f"\n{Fore.RED}Fatal error: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        # Finish queued speech and flush the session log on every exit path
+        if agent is not None:
+            agent.close()
 
 
 if __name__ == "__main__":
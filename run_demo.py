@@ -5,12 +5,81 @@ Quick demo script for showcasing the Taco Bell Voice Agent
 
 import sys
 import os
+import time
+import asyncio
+import argparse
+import logging
+from datetime import datetime
 from colorama import init, Fore
-from main import TacoBellVoiceAgent
+from main import TacoBellVoiceAgent, Turn, ConversationState
 
 init(autoreset=True)
 
-def run_demo():
+
+def record_scenario(agent: TacoBellVoiceAgent, conversation, turns: list, duration: float):
+    """Add a finished scenario to the agent's session stats and log, as run_conversation does"""
+    # The scripts stop once the order is confirmed, i.e. at payment rather than goodbye
+    success = bool(turns) and turns[-1].state in (ConversationState.PAYMENT.value, ConversationState.GOODBYE.value)
+    agent.record_conversation({
+        "timestamp": datetime.now().isoformat(),
+        "turns": turns,
+        "final_order": agent._get_order_summary(conversation.order) if success else None,
+        "total": 0.0,
+        "success": success,
+        "duration": duration,
+        "turn_count": len(turns)
+    })
+
+
+async def play_scenario(agent: TacoBellVoiceAgent, conversation, scenario: dict) -> list:
+    """
+    Run one scenario's turns without pausing
+    
+    Returns:
+        Transcript lines to print once the scenario is done
+    """
+    lines = []
+    turns = []
+    start = time.perf_counter()
+    for user_input in scenario['conversation']:
+        response, state = await conversation.aprocess_input(user_input, 1.0)
+        turns.append(Turn(agent=response, customer=user_input, confidence=1.0, state=state.value))
+        lines.append(f"{Fore.CYAN}👤 Customer: {user_input}")
+        lines.append(f"{Fore.GREEN}🤖 Agent: {response}")
+        lines.append(f"{Fore.WHITE}[State: {state.value}]\n")
+    
+    # The scenarios share the agent's stats, but all run on this one event loop
+    record_scenario(agent, conversation, turns, time.perf_counter() - start)
+    
+    if conversation.order.items:
+        lines.append(f"\n{Fore.GREEN}Final Order:")
+        lines.append(conversation.order.get_summary())
+    return lines
+
+
+async def run_scenarios_concurrently(agent: TacoBellVoiceAgent, scenarios: list) -> list:
+    """
+    Run all scenarios at once so their LLM calls overlap
+    
+    Each scenario gets its own conversation (sharing the loaded models),
+    and their intent calls are awaited on the async OpenAI client,
+    micro-batched when several are in flight together.
+    """
+    await agent.conversation.warmup()
+    conversations = [agent.conversation.fork() for _ in scenarios]
+    for conversation in conversations:
+        conversation.batch_intent_calls = True
+    try:
+        return await asyncio.gather(*(
+            play_scenario(agent, conversation, scenario)
+            for conversation, scenario in zip(conversations, scenarios)
+        ))
+    finally:
+        # Pooled connections belong to this event loop, which asyncio.run closes
+        await agent.conversation.aclose()
+
+
+def run_demo(pause: bool = True, quiet: bool = False):
     """Run a quick demo of the system"""
     
     print(f"{Fore.MAGENTA}{'='*70}")
@@ -24,13 +93,15 @@ def run_demo():
     print(f"  • Error handling")
     print(f"  • Brand voice\n")
     
-    input(f"{Fore.GREEN}Press Enter to start demo...")
+    if pause:
+        input(f"{Fore.GREEN}Press Enter to start demo...")
     
     # Initialize agent in text mode
     agent = TacoBellVoiceAgent(
         enable_voice=False,
         enable_logging=True,
-        log_dir="logs/demo"
+        log_dir="logs/demo",
+        quiet=quiet
     )
     
     # Demo scenarios
@@ -69,32 +140,74 @@ def run_demo():
         }
     ]
     
-    for i, scenario in enumerate(scenarios, 1):
-        print(f"\n{Fore.CYAN}{'='*70}")
-        print(f"{Fore.CYAN}SCENARIO {i}: {scenario['name']}")
-        print(f"{Fore.CYAN}{'='*70}\n")
-        
-        agent.conversation.reset()
-        agent.greet_customer()
-        
-        for user_input in scenario['conversation']:
-            print(f"{Fore.CYAN}👤 Customer: {user_input}")
-            response, state = agent.process_customer_input(user_input, 1.0)
-            print(f"{Fore.GREEN}🤖 Agent: {response}")
-            print(f"{Fore.WHITE}[State: {state.value}]\n")
+    try:
+        if not pause:
+            # Nothing to wait for between turns - run the scenarios in parallel
+            transcripts = asyncio.run(run_scenarios_concurrently(agent, scenarios))
+            
+            for i, (scenario, lines) in enumerate(zip(scenarios, transcripts), 1):
+                print(f"\n{Fore.CYAN}{'='*70}")
+                print(f"{Fore.CYAN}SCENARIO {i}: {scenario['name']}")
+                print(f"{Fore.CYAN}{'='*70}\n")
+                for line in lines:
+                    print(line)
+        else:
+            for i, scenario in enumerate(scenarios, 1):
+                print(f"\n{Fore.CYAN}{'='*70}")
+                print(f"{Fore.CYAN}SCENARIO {i}: {scenario['name']}")
+                print(f"{Fore.CYAN}{'='*70}\n")
             
-            input(f"{Fore.YELLOW}Press Enter to continue...")
+                agent.conversation.reset()
+                agent.greet_customer()
+                turns = []
+                start = time.perf_counter()
+            
+                for user_input in scenario['conversation']:
+                    print(f"{Fore.CYAN}👤 Customer: {user_input}")
+                    response, state = agent.process_customer_input(user_input, 1.0)
+                    turns.append(Turn(agent=response, customer=user_input, confidence=1.0, state=state.value))
+                    print(f"{Fore.GREEN}🤖 Agent: {response}")
+                    print(f"{Fore.WHITE}[State: {state.value}]\n")
+                
+                    input(f"{Fore.YELLOW}Press Enter to continue...")
+                
+                record_scenario(agent, agent.conversation, turns, time.perf_counter() - start)
+            
+                # Show final order
+                if agent.conversation.order.items:
+                    print(f"\n{Fore.GREEN}Final Order:")
+                    print(agent.conversation.order.get_summary())
         
-        # Show final order
-        if agent.conversation.order.items:
-            print(f"\n{Fore.GREEN}Final Order:")
-            print(agent.conversation.order.get_summary())
-    
-    # Show statistics
-    print(f"\n{Fore.MAGENTA}{'='*70}")
-    agent.print_statistics()
+        # Show statistics
+        print(f"\n{Fore.MAGENTA}{'='*70}")
+        agent.print_statistics()
+    finally:
+        # Flush the demo log and release connections even if a scenario fails
+        agent.close()
     
     print(f"\n{Fore.GREEN}Demo complete! Logs saved to logs/demo/")
 
 if __name__ == "__main__":
-    run_demo()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Taco Bell Voice Agent demo")
+    parser.add_argument(
+        "--no-pause",
+        action="store_true",
+        help="Don't wait for Enter between turns (runs scenarios in parallel)"
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Suppress the agent's startup banners"
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Show debug logging"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    
+    run_demo(pause=not args.no_pause, quiet=args.quiet)
\ No newline at end of file
@@ -3,9 +3,42 @@ Brand Voice Configuration for Taco Bell Drive-Thru Agent
 Defines tone, personality, and response templates
 """
 
-from typing import List, Dict, Callable
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import MappingProxyType
+from typing import List, Dict, Callable, FrozenSet, Mapping, Tuple
 from enum import Enum
 
+# Order-item category bits used by the upsell checks
+DRINK = 1 << 0
+SIDE = 1 << 1
+DESSERT = 1 << 2
+COMBO = 1 << 3
+
+# Keyword -> category bits (a keyword can flag more than one category)
+_CATEGORY_KEYWORDS = {
+    "drink": DRINK, "baja": DRINK, "blast": DRINK,
+    "soda": DRINK, "pepsi": DRINK, "dew": DRINK,
+    "fries": SIDE, "nachos": SIDE, "chips": SIDE,
+    "twist": SIDE | DESSERT, "cinnamon": DESSERT,
+    "box": COMBO, "combo": COMBO,
+}
+
+# All keywords compiled into one alternation, so each item is scanned once
+_CATEGORY_PATTERN = re.compile(
+    "|".join(sorted(map(re.escape, _CATEGORY_KEYWORDS), key=len, reverse=True)),
+    re.IGNORECASE
+)
+
+@lru_cache(maxsize=512)
+def _item_categories(item: str) -> int:
+    """Category bits for one order item (computed once per distinct name)"""
+    mask = 0
+    for match in _CATEGORY_PATTERN.finditer(item):
+        mask |= _CATEGORY_KEYWORDS[match.group().lower()]
+    return mask
+
 class BrandTone(Enum):
     """Different tones for different situations"""
     FRIENDLY = "friendly"
@@ -14,109 +47,136 @@ class BrandTone(Enum):
     PROFESSIONAL = "professional"
     CASUAL = "casual"
 
+# Brand data - built once at import, shared by every config instance
+
+# Core personality traits
+PERSONALITY_TRAITS = (
+    "friendly and casual",
+    "enthusiastic about food",
+    "helpful and patient",
+    "uses positive language",
+    "conversational, not robotic"
+)
+
+# Voice guidelines
+VOICE_GUIDELINES = MappingProxyType({
+    "do_use": (
+        "Casual phrases like 'awesome', 'sounds good', 'perfect'",
+        "Food enthusiasm: 'delicious', 'crave-worthy', 'loaded'",
+        "Confirmation: 'got it', 'you got it', 'coming right up'",
+        "Friendly transitions: 'anything else?', 'what else can I get you?'",
+        "Natural contractions: I'll, you're, we've"
+    ),
+    "dont_use": (
+        "Overly formal language: 'certainly', 'indeed', 'shall'",
+        "Corporate jargon",
+        "Negative framing: 'we don't have' → use 'how about' instead",
+        "Robotic phrases: 'I am processing your request'",
+        "Apologizing excessively"
+    )
+})
+
+# Signature phrases
+SIGNATURE_PHRASES = MappingProxyType({
+    "greeting": (
+        "Welcome to Taco Bell! What can I get started for you?",
+        "Hey there! Welcome to Taco Bell. What sounds good today?",
+        "Hi! What can I make for you today?",
+    ),
+    "confirmation": (
+        "Awesome! I've got {items}.",
+        "Perfect! So that's {items}.",
+        "You got it! {items} coming up.",
+    ),
+    "upsell": (
+        "Would you like to add {item} for just ${price}?",
+        "Want to make that a combo with a drink and {side} for ${price}?",
+        "How about trying our {item}? It's {description}!",
+    ),
+    "clarification": (
+        "Just to make sure - did you say {item}?",
+        "Want to double-check - that's {quantity} {item}, right?",
+        "Quick question - {clarification}?",
+    ),
+    "error_recovery": (
+        "Hmm, I didn't quite catch that. Could you repeat?",
+        "Sorry about that! What did you want to add?",
+        "My bad - let's try that again. What would you like?",
+    ),
+    "closing": (
+        "Your total is ${total}. Please pull forward!",
+        "All set! That'll be ${total}. See you at the window!",
+        "Perfect! ${total} total. Drive up to the first window!",
+    )
+})
+
+# Context-aware responses
+TIME_BASED_GREETINGS = MappingProxyType({
+    "morning": "Good morning! Welcome to Taco Bell.",
+    "afternoon": "Hey! Welcome to Taco Bell.",
+    "evening": "Evening! Welcome to Taco Bell.",
+    "late_night": "What's up! Late night cravings? We got you."
+})
+
+def _greeting_bucket(hour: int) -> str:
+    if 5 <= hour < 11:
+        return "morning"
+    elif 11 <= hour < 17:
+        return "afternoon"
+    elif 17 <= hour < 22:
+        return "evening"
+    return "late_night"
+
+# Greeting for each hour of the day, rendered once
+GREETING_BY_HOUR = tuple(TIME_BASED_GREETINGS[_greeting_bucket(hour)] for hour in range(24))
+
+# Modification language
+MODIFICATION_PHRASES = MappingProxyType({
+    "add": frozenset({"extra", "add", "with"}),
+    "remove": frozenset({"no", "without", "hold the"}),
+    "substitute": frozenset({"swap", "instead of", "replace"})
+})
+
+@dataclass(frozen=True, slots=True)
 class BrandVoiceConfig:
     """Configuration for Taco Bell brand voice"""
     
-    def __init__(self):
-        # Core personality traits
-        self.personality_traits = [
-            "friendly and casual",
-            "enthusiastic about food",
-            "helpful and patient",
-            "uses positive language",
-            "conversational, not robotic"
-        ]
-        
-        # Voice guidelines
-        self.voice_guidelines = {
-            "do_use": [
-                "Casual phrases like 'awesome', 'sounds good', 'perfect'",
-                "Food enthusiasm: 'delicious', 'crave-worthy', 'loaded'",
-                "Confirmation: 'got it', 'you got it', 'coming right up'",
-                "Friendly transitions: 'anything else?', 'what else can I get you?'",
-                "Natural contractions: I'll, you're, we've"
-            ],
-            "dont_use": [
-                "Overly formal language: 'certainly', 'indeed', 'shall'",
-                "Corporate jargon",
-                "Negative framing: 'we don't have' → use 'how about' instead",
-                "Robotic phrases: 'I am processing your request'",
-                "Apologizing excessively"
-            ]
-        }
-        
-        # Signature phrases
-        self.signature_phrases = {
-            "greeting": [
-                "Welcome to Taco Bell! What can I get started for you?",
-                "Hey there! Welcome to Taco Bell. What sounds good today?",
-                "Hi! What can I make for you today?",
-            ],
-            "confirmation": [
-                "Awesome! I've got {items}.",
-                "Perfect! So that's {items}.",
-                "You got it! {items} coming up.",
-            ],
-            "upsell": [
-                "Would you like to add {item} for just ${price}?",
-                "Want to make that a combo with a drink and {side} for ${price}?",
-                "How about trying our {item}? It's {description}!",
-            ],
-            "clarification": [
-                "Just to make sure - did you say {item}?",
-                "Want to double-check - that's {quantity} {item}, right?",
-                "Quick question - {clarification}?",
-            ],
-            "error_recovery": [
-                "Hmm, I didn't quite catch that. Could you repeat?",
-                "Sorry about that! What did you want to add?",
-                "My bad - let's try that again. What would you like?",
-            ],
-            "closing": [
-                "Your total is ${total}. Please pull forward!",
-                "All set! That'll be ${total}. See you at the window!",
-                "Perfect! ${total} total. Drive up to the first window!",
-            ]
-        }
-        
-        # Context-aware responses
-        self.time_based_greetings = {
-            "morning": "Good morning! Welcome to Taco Bell.",
-            "afternoon": "Hey! Welcome to Taco Bell.",
-            "evening": "Evening! Welcome to Taco Bell.",
-            "late_night": "What's up! Late night cravings? We got you."
-        }
-        
-        # Modification language
-        self.modification_phrases = {
-            "add": ["extra", "add", "with"],
-            "remove": ["no", "without", "hold the"],
-            "substitute": ["swap", "instead of", "replace"]
-        }
+    personality_traits: Tuple[str, ...] = PERSONALITY_TRAITS
+    voice_guidelines: Mapping[str, Tuple[str, ...]] = field(default_factory=lambda: VOICE_GUIDELINES)
+    signature_phrases: Mapping[str, Tuple[str, ...]] = field(default_factory=lambda: SIGNATURE_PHRASES)
+    time_based_greetings: Mapping[str, str] = field(default_factory=lambda: TIME_BASED_GREETINGS)
+    modification_phrases: Mapping[str, FrozenSet[str]] = field(default_factory=lambda: MODIFICATION_PHRASES)
+    
+    def greeting_for_hour(self, hour: int) -> str:
+        """Get the pre-rendered greeting for an hour of the day (0-23)"""
+        return GREETING_BY_HOUR[hour]
+    
+    def categorize(self, order_items: List[str]) -> int:
+        """
+        Scan order items once and return a bitmask of matched categories
+        (DRINK, SIDE, DESSERT, COMBO)
+        """
+        mask = 0
+        for item in order_items:
+            mask |= _item_categories(item)
+        return mask
     
     def check_no_drink(self, order_items: List[str]) -> bool:
         """Check if order has no drink"""
-        return not any("drink" in item.lower() or "baja" in item.lower() or 
-                      "blast" in item.lower() or "soda" in item.lower() or
-                      "pepsi" in item.lower() or "dew" in item.lower()
-                      for item in order_items)
+        return not self.categorize(order_items) & DRINK
     
     def check_no_side(self, order_items: List[str]) -> bool:
         """Check if order has no side"""
-        return not any("fries" in item.lower() or "nachos" in item.lower() or 
-                      "twist" in item.lower() or "chips" in item.lower()
-                      for item in order_items)
+        return not self.categorize(order_items) & SIDE
     
     def check_dessert_opportunity(self, order_items: List[str]) -> bool:
         """Check if we should suggest dessert"""
-        has_dessert = any("twist" in item.lower() or "cinnamon" in item.lower() 
-                         for item in order_items)
+        has_dessert = self.categorize(order_items) & DESSERT
         return len(order_items) >= 2 and not has_dessert
     
     def check_combo_upgrade(self, order_items: List[str], total: float) -> bool:
         """Check if combo upgrade makes sense"""
-        has_combo = any("box" in item.lower() or "combo" in item.lower() 
-                       for item in order_items)
+        has_combo = self.categorize(order_items) & COMBO
         return total < 5.0 and len(order_items) >= 2 and not has_combo
 
 # Global instance
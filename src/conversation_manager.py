@@ -1,17 +1,42 @@
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Sequence, Tuple, Callable, FrozenSet, Iterable
 from enum import Enum
 from datetime import datetime
+from collections import deque, defaultdict, OrderedDict
+from functools import lru_cache
 import json
+import logging
+import sys
+import time
 from colorama import Fore, init
 
 from src.intent_detector_llm import TacoBellIntentDetector, OrderIntent, IntentResult
-from src.menu_rag import TacoBellMenuRAG, MenuItem
+from src.menu_rag import TacoBellMenuRAG, MenuItem, SearchResult
 from src.response_generator import TacoBellResponseGenerator, ResponseContext
 from src.brand_voice import BrandTone
 
 init(autoreset=True)
 
+log = logging.getLogger(__name__)
+
+
+# Heavy, stateless components are loaded once per process and shared by
+# every ConversationManager, so starting a new session is cheap
+@lru_cache(maxsize=1)
+def _intent_detector() -> TacoBellIntentDetector:
+    return TacoBellIntentDetector()
+
+
+@lru_cache(maxsize=1)
+def _menu_rag() -> TacoBellMenuRAG:
+    return TacoBellMenuRAG()
+
+
+@lru_cache(maxsize=1)
+def _response_generator() -> TacoBellResponseGenerator:
+    return TacoBellResponseGenerator()
+
+
 class ConversationState(Enum):
     """States of the drive-thru conversation"""
     GREETING = "greeting"
@@ -21,104 +46,311 @@ class ConversationState(Enum):
     ORDER_COMPLETE = "order_complete"
     PAYMENT = "payment"
     GOODBYE = "goodbye"
+    
+    def __new__(cls, value: str):
+        # Keep the string value for display/serialization, but also number
+        # members in definition order so handlers can live in a plain list
+        member = object.__new__(cls)
+        member._value_ = value
+        member.index = len(cls.__members__)
+        return member
 
-@dataclass
+def _format_cents(cents: int) -> str:
+    """Format integer cents as dollars without going through float"""
+    return f"${cents // 100}.{cents % 100:02d}"
+
+# Assigning any of these invalidates an OrderItem's memoized price/string
+_ORDER_ITEM_CACHE_INPUTS = frozenset({'name', 'quantity', 'price', 'price_cents', 'modifications'})
+
+@dataclass(slots=True)
 class OrderItem:
     """Represents an item in the order"""
     name: str
     quantity: int
     price: float
-    modifications: List[str] = field(default_factory=list)
+    # Stored as a tuple so it can't change in place behind the Order index
+    modifications: Sequence[str] = ()
     confirmed: bool = False
+    price_cents: int = field(init=False, repr=False)
+    
+    # Memoized get_total_price()/to_string(), cleared when their inputs change
+    _total_cached: Optional[float] = field(default=None, init=False, repr=False, compare=False)
+    _str_cached: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    # Order this item is a line of; told when its total or key inputs change
+    _order: Optional['Order'] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # Names and modifications repeat across orders; interned copies make
+        # the Order index hashes/compares cheap
+        self.name = sys.intern(self.name)
+        self.modifications = [sys.intern(m) for m in self.modifications]
+    
+    def __setattr__(self, name, value):
+        if name == 'modifications':
+            value = tuple(value)
+        # Unset during __init__
+        order = getattr(self, '_order', None) if name in _ORDER_ITEM_CACHE_INPUTS else None
+        if order is not None:
+            old_cents = self.price_cents * self.quantity
+        object.__setattr__(self, name, value)
+        # price and price_cents are two views of one value; keep them in step
+        if name == 'price':
+            object.__setattr__(self, 'price_cents', round(value * 100))
+        elif name == 'price_cents':
+            object.__setattr__(self, 'price', value / 100)
+        if name in _ORDER_ITEM_CACHE_INPUTS:
+            object.__setattr__(self, '_total_cached', None)
+            object.__setattr__(self, '_str_cached', None)
+        if order is not None:
+            order._line_changed(self, name, old_cents)
     
     def get_total_price(self) -> float:
-        return self.price * self.quantity
+        if self._total_cached is None:
+            self._total_cached = self.price_cents * self.quantity / 100
+        return self._total_cached
     
     def to_string(self) -> str:
         """Convert to readable string"""
-        mods = f" ({', '.join(self.modifications)})" if self.modifications else ""
-        return f"{self.quantity}x {self.name}{mods}"
+        if self._str_cached is None:
+            mods = f" ({', '.join(self.modifications)})" if self.modifications else ""
+            self._str_cached = f"{self.quantity}x {self.name}{mods}"
+        return self._str_cached
+
+class OrderLines(list):
+    """Read-only list of an Order's line items; change them through the Order"""
+    
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Order.items is read-only; use add_item(), remove_item() or discard()")
+    
+    append = extend = insert = remove = pop = clear = sort = reverse = _read_only
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    
+    def __reduce__(self):
+        # Default list pickling/copying rebuilds through extend()
+        return OrderLines, (list(self),)
 
-@dataclass
+@dataclass(slots=True)
 class Order:
     """Represents the complete order"""
     items: List[OrderItem] = field(default_factory=list)
     status: str = "active"
-    created_at: datetime = field(default_factory=datetime.now)
+    created_at_ns: int = field(default_factory=time.monotonic_ns)
     special_requests: List[str] = field(default_factory=list)
     
+    # Lookup indices into self.items, kept in sync by the methods below
+    _index: Dict[Tuple[str, Tuple[str, ...]], int] = field(default_factory=dict, init=False, repr=False)
+    _name_index: Dict[str, List[int]] = field(default_factory=lambda: defaultdict(list), init=False, repr=False)
+    # Running total in integer cents, so get_total() is O(1) and exact
+    _total_cents: int = field(default=0, init=False, repr=False)
+    # Formatted get_summary() text, cleared by every mutating method
+    _summary_cache: Optional[str] = field(default=None, init=False, repr=False)
+    
+    @property
+    def created_at(self) -> datetime:
+        """Wall-clock creation time, derived from the monotonic stamp on demand"""
+        age_ns = time.monotonic_ns() - self.created_at_ns
+        return datetime.fromtimestamp((time.time_ns() - age_ns) / 1e9)
+    
+    def __post_init__(self):
+        self._rebuild()
+    
+    def __setattr__(self, name, value):
+        if name == 'items':
+            for item in getattr(self, 'items', ()):
+                item._order = None
+            value = OrderLines(value)
+        object.__setattr__(self, name, value)
+        # The indices are only set once __init__ is past items
+        if name == 'items' and hasattr(self, '_summary_cache'):
+            self._rebuild()
+    
+    def _rebuild(self):
+        """Re-own the lines and recompute the total and indices from items"""
+        self._total_cents = sum(item.price_cents * item.quantity for item in self.items)
+        for item in self.items:
+            item._order = self
+        self._reindex()
+    
+    @staticmethod
+    def _key(item: OrderItem) -> Tuple[str, Tuple[str, ...]]:
+        return item.name.lower(), tuple(item.modifications)
+    
+    def _reindex(self):
+        """Rebuild both indices after positions shift"""
+        self._summary_cache = None
+        self._index.clear()
+        self._name_index.clear()
+        for i, item in enumerate(self.items):
+            self._index.setdefault(self._key(item), i)
+            self._name_index[item.name.lower()].append(i)
+    
+    def _line_changed(self, item: OrderItem, attr: str, old_cents: int):
+        """Called by OrderItem after quantity, price, name or modifications is reassigned"""
+        self._total_cents += item.price_cents * item.quantity - old_cents
+        self._summary_cache = None
+        if attr in ('name', 'modifications'):
+            self._reindex()
+    
+    def _pop(self, position: int) -> OrderItem:
+        item = list.pop(self.items, position)
+        item._order = None
+        self._total_cents -= item.price_cents * item.quantity
+        self._reindex()
+        return item
+    
     def add_item(self, item: OrderItem):
         """Add or update item in order"""
-        # Check if item already exists
-        for existing in self.items:
-            if existing.name == item.name and existing.modifications == item.modifications:
-                existing.quantity += item.quantity
-                return
-        self.items.append(item)
+        # Merge into an existing line with the same name and modifications
+        self._summary_cache = None
+        key = self._key(item)
+        position = self._index.get(key)
+        if position is not None:
+            # The total follows via _line_changed
+            self.items[position].quantity += item.quantity
+            return
+        
+        self._total_cents += item.price_cents * item.quantity
+        self._index[key] = len(self.items)
+        self._name_index[key[0]].append(len(self.items))
+        list.append(self.items, item)
+        item._order = self
     
     def remove_item(self, item_name: str) -> bool:
         """Remove item from order"""
-        for i, item in enumerate(self.items):
-            if item.name.lower() == item_name.lower():
-                self.items.pop(i)
-                return True
-        return False
+        positions = self._name_index.get(item_name.lower())
+        if not positions:
+            return False
+        self._pop(positions[0])
+        return True
+    
+    def remove_items_batch(self, names: Iterable[str]) -> List[str]:
+        """
+        Remove the first line matching each name, in a single pass
+        
+        Returns:
+            Names of the removed lines, in order
+        """
+        wanted = {name.lower() for name in names}
+        positions = {self._name_index[name][0] for name in wanted if self._name_index.get(name)}
+        if not positions:
+            return []
+        
+        removed = [self.items[i].name for i in sorted(positions)]
+        # Reassigning items recomputes the total and indices
+        self.items = [item for i, item in enumerate(self.items) if i not in positions]
+        return removed
+    
+    def discard(self, item: OrderItem):
+        """Remove a specific line item from the order"""
+        for i, existing in enumerate(self.items):
+            if existing is item:
+                self._pop(i)
+                return
+    
+    def reduce_quantity(self, item: OrderItem, quantity: int):
+        """Take quantity off a line item that has more than that many"""
+        # The total and summary follow via _line_changed
+        item.quantity -= quantity
+    
+    def add_modifications(self, item: OrderItem, modifications: List[str]):
+        """Append modifications to a line item, re-keying it in the index"""
+        # Re-keyed via _line_changed
+        item.modifications = (*item.modifications, *(sys.intern(m) for m in modifications))
     
     def get_total(self) -> float:
         """Calculate total price"""
-        return sum(item.get_total_price() for item in self.items)
+        return self._total_cents / 100
     
     def get_summary(self) -> str:
         """Get order summary"""
         if not self.items:
             return "No items in order"
         
-        summary = "Your order:\n"
-        for item in self.items:
-            summary += f"  • {item.to_string()} - ${item.get_total_price():.2f}\n"
-        summary += f"Total: ${self.get_total():.2f}"
-        return summary
+        if self._summary_cache is None:
+            lines = ["Your order:"]
+            lines.extend(
+                f"  • {item.to_string()} - {_format_cents(item.price_cents * item.quantity)}"
+                for item in self.items
+            )
+            lines.append(f"Total: {_format_cents(self._total_cents)}")
+            self._summary_cache = "\n".join(lines)
+        return self._summary_cache
 
 class ConversationManager:
     """Manages the drive-thru conversation flow"""
     
+    # State transition rules (shared, immutable)
+    _TRANSITIONS: Dict[ConversationState, FrozenSet[ConversationState]] = {
+        ConversationState.GREETING: frozenset({ConversationState.TAKING_ORDER}),
+        ConversationState.TAKING_ORDER: frozenset({
+            ConversationState.CONFIRMING_ITEM,
+            ConversationState.MODIFYING_ORDER,
+            ConversationState.ORDER_COMPLETE
+        }),
+        ConversationState.CONFIRMING_ITEM: frozenset({
+            ConversationState.TAKING_ORDER,
+            ConversationState.MODIFYING_ORDER
+        }),
+        ConversationState.MODIFYING_ORDER: frozenset({
+            ConversationState.TAKING_ORDER,
+            ConversationState.ORDER_COMPLETE
+        }),
+        ConversationState.ORDER_COMPLETE: frozenset({
+            ConversationState.PAYMENT,
+            ConversationState.MODIFYING_ORDER
+        }),
+        ConversationState.PAYMENT: frozenset({ConversationState.GOODBYE}),
+        ConversationState.GOODBYE: frozenset()
+    }
+    
+    # Intent -> handler method name while in TAKING_ORDER
+    _TAKING_ORDER_HANDLERS: Dict[OrderIntent, str] = {
+        OrderIntent.ORDER_ITEM: '_process_order_item',
+        OrderIntent.ASK_MENU: '_handle_ask_menu',
+        OrderIntent.ASK_PRICE: '_handle_price_inquiry',
+        OrderIntent.CONFIRM_ORDER: '_handle_confirm_in_taking',
+        OrderIntent.REMOVE_ITEM: '_handle_remove_in_taking',
+        OrderIntent.MODIFY_ITEM: '_handle_modify_in_taking'
+    }
+    
     def __init__(self):
         """Initialize conversation manager"""
         self.state = ConversationState.GREETING
         self.order = Order()
-        self.conversation_history = []
         self.context_window = 5  # Keep last 5 exchanges
+        self.conversation_history = deque(maxlen=self.context_window)
+        self._archive: List[str] = []  # Entries that slid out of the window
+        
+        # Shared components (built on first use)
+        self.intent_detector = _intent_detector()
+        self.menu_rag = _menu_rag()
+        self.response_generator = _response_generator()
+        
+        # LRU memo over the best menu match for a spoken item name;
+        # the menu doesn't change at runtime so entries never go stale
+        self._menu_match_cache: OrderedDict = OrderedDict()
+        self._menu_match_cache_size = 512
+        
+        # The ASK_MENU reply only depends on the (static) menu, so build it once
+        tacos = self.menu_rag.get_category_items("Tacos")[:3]
+        menu_str = ", ".join(f"{item.name} (${item.price:.2f})" for item in tacos)
+        self._menu_sample_reply = f"We have {menu_str}, and much more! What sounds good?"
         
-        # Initialize components
-        self.intent_detector = TacoBellIntentDetector()
-        self.menu_rag = TacoBellMenuRAG()
-        self.response_generator = TacoBellResponseGenerator()
-
-        # State transition rules
-        self.transitions = {
-            ConversationState.GREETING: [ConversationState.TAKING_ORDER],
-            ConversationState.TAKING_ORDER: [
-                ConversationState.CONFIRMING_ITEM,
-                ConversationState.MODIFYING_ORDER,
-                ConversationState.ORDER_COMPLETE
-            ],
-            ConversationState.CONFIRMING_ITEM: [
-                ConversationState.TAKING_ORDER,
-                ConversationState.MODIFYING_ORDER
-            ],
-            ConversationState.MODIFYING_ORDER: [
-                ConversationState.TAKING_ORDER,
-                ConversationState.ORDER_COMPLETE
-            ],
-            ConversationState.ORDER_COMPLETE: [
-                ConversationState.PAYMENT,
-                ConversationState.MODIFYING_ORDER
-            ],
-            ConversationState.PAYMENT: [ConversationState.GOODBYE],
-            ConversationState.GOODBYE: []
+        # Jump table for _handle_state_intent, indexed by ConversationState.index
+        handlers = {
+            ConversationState.GREETING: self._handle_greeting,
+            ConversationState.TAKING_ORDER: self._handle_taking_order,
+            ConversationState.CONFIRMING_ITEM: self._handle_confirming,
+            ConversationState.MODIFYING_ORDER: self._handle_modification,
+            ConversationState.ORDER_COMPLETE: self._handle_order_complete,
+            ConversationState.PAYMENT: self._handle_payment,
+            ConversationState.GOODBYE: self._handle_goodbye
         }
+        self._state_handlers: List[Callable[[IntentResult], str]] = [
+            handlers[state] for state in ConversationState
+        ]
         
-        print(f"{Fore.GREEN}✓ Conversation Manager initialized")
+        log.info("Conversation Manager initialized")
     
     def process_input(self, user_input: str) -> Tuple[str, ConversationState]:
         """
@@ -131,51 +363,45 @@ class ConversationManager:
             Tuple of (response, new_state)
         """
         # Add to history
-        self.conversation_history.append(f"Customer: {user_input}")
+        self._add_to_history(f"Customer: {user_input}")
 
         # Get intent
         intent_result = self.intent_detector.detect_intent(
             user_input,
-            self.conversation_history[-self.context_window:]
+            list(self.conversation_history)
         )
 
         # Process based on current state and intent
         response = self._handle_state_intent(intent_result)
 
         # Add response to history
-        self.conversation_history.append(f"Agent: {response}")
+        self._add_to_history(f"Agent: {response}")
 
         # Log actual agent response
-        print(f"{Fore.GREEN}Agent response: '{response}'")
+        log.debug("Agent response: %r", response)
 
         # Log state
         self._log_state()
 
         return response, self.state
     
+    def _add_to_history(self, entry: str):
+        """Append to the prompt window, archiving whatever it pushes out"""
+        if len(self.conversation_history) == self.context_window:
+            self._archive.append(self.conversation_history[0])
+        self.conversation_history.append(entry)
+    
+    def get_archive(self) -> List[str]:
+        """Entries older than the prompt window, oldest first"""
+        return list(self._archive)
+    
     def _handle_state_intent(self, intent_result: IntentResult) -> str:
         """Handle intent based on current state"""
-        
-        if self.state == ConversationState.GREETING:
-            return self._handle_greeting(intent_result)
-        
-        elif self.state == ConversationState.TAKING_ORDER:
-            return self._handle_taking_order(intent_result)
-        
-        elif self.state == ConversationState.CONFIRMING_ITEM:
-            return self._handle_confirming(intent_result)
-        
-        elif self.state == ConversationState.MODIFYING_ORDER:
-            return self._handle_modification(intent_result)
-        
-        elif self.state == ConversationState.ORDER_COMPLETE:
-            return self._handle_order_complete(intent_result)
-        
-        elif self.state == ConversationState.PAYMENT:
-            return self._handle_payment(intent_result)
-        
-        else:
-            return "Thank you for choosing Taco Bell!"
+        return self._state_handlers[self.state.index](intent_result)
+    
+    def _handle_goodbye(self, intent: IntentResult) -> str:
+        """Handle anything said after the conversation is over"""
+        return "Thank you for choosing Taco Bell!"
     
     def _handle_greeting(self, intent: IntentResult) -> str:
         """Handle greeting state"""
@@ -190,47 +416,44 @@ class ConversationManager:
     
     def _handle_taking_order(self, intent: IntentResult) -> str:
         """Handle order-taking state"""
-        
-        if intent.intent == OrderIntent.ORDER_ITEM:
-            return self._process_order_item(intent)
-        
-        elif intent.intent == OrderIntent.ASK_MENU:
-            items = self.menu_rag.get_category_items("Tacos")[:3]
-            menu_str = ", ".join([f"{item.name} (${item.price:.2f})" for item in items])
-            return f"We have {menu_str}, and much more! What sounds good?"
-        
-        elif intent.intent == OrderIntent.ASK_PRICE:
-            return self._handle_price_inquiry(intent)
-        
-        elif intent.intent == OrderIntent.CONFIRM_ORDER:
-            if self.order.items:
-                self.state = ConversationState.ORDER_COMPLETE
-                return f"{self.order.get_summary()}\n\nIs that correct?"
-            else:
-                return "You haven't ordered anything yet. What would you like?"
-        
-        elif intent.intent == OrderIntent.REMOVE_ITEM:
-            # Check if it's a quantity reduction or full removal
-            quantities = intent.entities.get('quantities', {})
-            if quantities:
-                # Handle "remove one taco" type requests
-                for item_name, qty in quantities.items():
-                    for order_item in self.order.items:
-                        if item_name.lower() in order_item.name.lower():
-                            if order_item.quantity > qty:
-                                order_item.quantity -= qty
-                                return f"Removed {qty} {order_item.name}. You now have {order_item.quantity}."
-                            else:
-                                self.order.items.remove(order_item)
-                                return f"Removed all {order_item.name} from your order."
-            return self._handle_remove_item(intent)
-        
-        elif intent.intent == OrderIntent.MODIFY_ITEM:
-            self.state = ConversationState.MODIFYING_ORDER
-            return self._handle_modification(intent)
-        
-        else:
+        handler_name = self._TAKING_ORDER_HANDLERS.get(intent.intent)
+        if handler_name is None:
             return "What would you like to order?"
+        return getattr(self, handler_name)(intent)
+    
+    def _handle_ask_menu(self, intent: IntentResult) -> str:
+        """Handle a general menu question"""
+        return self._menu_sample_reply
+    
+    def _handle_confirm_in_taking(self, intent: IntentResult) -> str:
+        """Handle the customer saying they're done ordering"""
+        if self.order.items:
+            self.state = ConversationState.ORDER_COMPLETE
+            return f"{self.order.get_summary()}\n\nIs that correct?"
+        else:
+            return "You haven't ordered anything yet. What would you like?"
+    
+    def _handle_remove_in_taking(self, intent: IntentResult) -> str:
+        """Handle a removal while taking the order"""
+        # Check if it's a quantity reduction or full removal
+        quantities = intent.entities.get('quantities', {})
+        if quantities:
+            # Handle "remove one taco" type requests
+            for item_name, qty in quantities.items():
+                for order_item in self.order.items:
+                    if item_name.lower() in order_item.name.lower():
+                        if order_item.quantity > qty:
+                            self.order.reduce_quantity(order_item, qty)
+                            return f"Removed {qty} {order_item.name}. You now have {order_item.quantity}."
+                        else:
+                            self.order.discard(order_item)
+                            return f"Removed all {order_item.name} from your order."
+        return self._handle_remove_item(intent)
+    
+    def _handle_modify_in_taking(self, intent: IntentResult) -> str:
+        """Handle a modification while taking the order"""
+        self.state = ConversationState.MODIFYING_ORDER
+        return self._handle_modification(intent)
     
     def _process_order_item(self, intent: IntentResult) -> str:
         """Process an order item request"""
@@ -241,12 +464,12 @@ class ConversationManager:
         mentioned_items = intent.entities.get('items', [])
         quantities = intent.entities.get('quantities', {})
         
-        for item_name in mentioned_items:
-            # Search for item in menu
-            search_results = self.menu_rag.search_menu(item_name, top_k=1)
-            
-            if search_results and search_results[0].score > 0.5:
-                menu_item = search_results[0].item
+        # Search for all items in the menu at once
+        matches = self._lookup_menu_items(mentioned_items)
+        
+        for item_name, match in zip(mentioned_items, matches):
+            if match and match.score > 0.5:
+                menu_item = match.item
                 
                 # Get quantity
                 qty = quantities.get(item_name, 1)
@@ -288,6 +511,29 @@ class ConversationManager:
         
         return response
     
+    def _lookup_menu_items(self, item_names: List[str]) -> List[Optional[SearchResult]]:
+        """
+        Best menu match for each item name
+        
+        Names are normalized and served from the LRU cache where possible;
+        misses go to the menu in a single batched search.
+        """
+        cache = self._menu_match_cache
+        keys = [name.lower().strip() for name in item_names]
+        
+        misses = [key for key in dict.fromkeys(keys) if key not in cache]
+        if misses:
+            for key, results in zip(misses, self.menu_rag.search_menu_batch(misses, top_k=1)):
+                cache[key] = results[0] if results else None
+            while len(cache) > self._menu_match_cache_size:
+                cache.popitem(last=False)
+        
+        matches = []
+        for key in keys:
+            cache.move_to_end(key)
+            matches.append(cache[key])
+        return matches
+    
     def _handle_modification(self, intent: IntentResult) -> str:
         """Handle order modifications"""
         modifications = intent.entities.get('modifications', [])
@@ -298,12 +544,8 @@ class ConversationManager:
         # Apply modifications to last item
         last_item = self.order.items[-1]
         
-        for mod in modifications:
-            if isinstance(mod, dict):
-                mod_text = f"{mod.get('type', '')} {mod.get('item', '')}"
-            else:
-                mod_text = str(mod)
-            last_item.modifications.append(mod_text)
+        # Modifications arrive as plain strings from the intent detector
+        self.order.add_modifications(last_item, modifications)
         
         self.state = ConversationState.TAKING_ORDER
         return f"Got it, {', '.join(last_item.modifications)} for your {last_item.name}. Anything else?"
@@ -318,8 +560,17 @@ class ConversationManager:
         if not items:
             return "What would you like to remove?"
 
-        removed = []
+        quantities = intent.entities.get('quantities', {})
+
+        # Whole lines named exactly are removed through the order index in one pass
+        removed = self.order.remove_items_batch(
+            item_name for item_name in items if not quantities.get(item_name, 0)
+        )
+        handled = {name.lower() for name in removed}
+
         for item_name in items:
+            if item_name.lower() in handled:
+                continue
             found = False
             # Try to find matching items in order
             for order_item in self.order.items[:]:  # Copy list for safe iteration
@@ -328,16 +579,15 @@ class ConversationManager:
                     order_item.name.lower() in item_name.lower()):
 
                     # Check for quantity reduction
-                    quantities = intent.entities.get('quantities', {})
                     reduce_by = quantities.get(item_name, 0)
 
                     if reduce_by and order_item.quantity > reduce_by:
                         # Reduce quantity
-                        order_item.quantity -= reduce_by
+                        self.order.reduce_quantity(order_item, reduce_by)
                         removed.append(f"{reduce_by} {order_item.name}")
                     else:
                         # Remove entire item
-                        self.order.items.remove(order_item)
+                        self.order.discard(order_item)
                         removed.append(order_item.name)
                     found = True
                     break
@@ -349,7 +599,7 @@ class ConversationManager:
                     menu_item_name = search_results[0].item.name
                     for order_item in self.order.items[:]:
                         if order_item.name == menu_item_name:
-                            self.order.items.remove(order_item)
+                            self.order.discard(order_item)
                             removed.append(order_item.name)
                             found = True
                             break
@@ -363,9 +613,9 @@ class ConversationManager:
         items = intent.entities.get('items', [])
         
         if items:
-            search_results = self.menu_rag.search_menu(items[0], top_k=1)
-            if search_results:
-                item = search_results[0].item
+            match = self._lookup_menu_items(items[:1])[0]
+            if match:
+                item = match.item
                 return f"Our {item.name} is ${item.price:.2f}. Would you like to add it?"
         
         return "Which item would you like to know the price for?"
@@ -403,7 +653,7 @@ class ConversationManager:
         context = ResponseContext(
             intent=intent_result.intent,
             entities=intent_result.entities,
-            conversation_history=self.conversation_history[-4:],
+            conversation_history=list(self.conversation_history)[-4:],
             current_order=order_items,
             order_total=self.order.get_total(),
             tone=self._determine_tone(intent_result),
@@ -429,25 +679,25 @@ class ConversationManager:
             return BrandTone.FRIENDLY
 
     def _log_state(self):
-        """Log current conversation state"""
-        print(f"{Fore.CYAN}State: {self.state.value}")
-        print(f"{Fore.YELLOW}Order items: {len(self.order.items)}")
-        if self.order.items:
-            print(f"{Fore.MAGENTA}Current order:")
-            for item in self.order.items:
-                mods = f" ({', '.join(item.modifications)})" if item.modifications else ""
-                print(f"  • {item.quantity}x {item.name}{mods} - ${item.get_total_price():.2f}")
-            print(f"{Fore.GREEN}Total: ${self.order.get_total():.2f}")
+        """Log current conversation state (DEBUG only; free when disabled)"""
+        if not log.isEnabledFor(logging.DEBUG):
+            return
+        log.debug("State=%s items=%d total=%.2f",
+                  self.state.value, len(self.order.items), self.order.get_total())
+        for item in self.order.items:
+            log.debug("  • %s - $%.2f", item.to_string(), item.get_total_price())
     
     def reset(self):
         """Reset conversation for new customer"""
         self.state = ConversationState.GREETING
         self.order = Order()
-        self.conversation_history = []
-        print(f"{Fore.MAGENTA}Conversation reset for new customer")
+        self.conversation_history = deque(maxlen=self.context_window)
+        self._archive = []
+        log.info("Conversation reset for new customer")
 
 # Test the conversation manager
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG, format="%(message)s")
     print(f"{Fore.MAGENTA}Testing Conversation Manager\n")
     
     manager = ConversationManager()
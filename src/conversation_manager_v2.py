@@ -3,17 +3,28 @@ Enhanced Conversation Manager with Error Handling
 Adds robust error handling to the conversation flow
 """
 
-from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Tuple
+from dataclasses import dataclass, field, replace
+from typing import List, Dict, Optional, Sequence, Tuple, FrozenSet
 from enum import Enum
 from datetime import datetime
 import json  # ADD THIS
+import re
+import copy
+import uuid
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, deque
+from itertools import islice
+import numpy as np
 from colorama import Fore, init
 
-from src.intent_detector_llm import TacoBellIntentDetector, OrderIntent, IntentResult
-from src.menu_rag import TacoBellMenuRAG, MenuItem
+from src.intent_detector_llm import TacoBellIntentDetector, OrderIntent, IntentResult, fast_intent, AFFIRMATION_PATTERN
+from src.menu_rag import TacoBellMenuRAG, MenuItem, SearchResult
 from src.response_generator import TacoBellResponseGenerator, ResponseContext
 from src.brand_voice import BrandTone
+from src.semantic_cache import SemanticCache
+from src.local_intent import LocalIntentClassifier
 from src.error_handler import (
     ErrorHandler, 
     ErrorContext, 
@@ -23,9 +34,28 @@ from src.error_handler import (
 )
 
 init(autoreset=True)
+log = logging.getLogger(__name__)
 
 # ... rest of the code remains the same ...
 
+# Phrase boundaries and leading filler used to guess item phrases from raw
+# text, so the menu search can start before the LLM has extracted them
+ITEM_SEPARATOR_PATTERN = re.compile(r"\s*(?:,|\band\b|\bplus\b|\balso\b)\s*", re.IGNORECASE)
+ITEM_FILLER_PATTERN = re.compile(
+    r"^(?:(?:can|could|may) i (?:get|have|order)|i(?:'d| would) like|i want|i'll (?:have|take)|"
+    r"give me|let me (?:get|have)|(?:and|also|plus|then|um|uh)\b|a|an|one|two|three|four|five|\d+)\s+",
+    re.IGNORECASE
+)
+
+# Words that change an order without moving its embedding much; the
+# semantic intent cache only replays a result if these match exactly
+QUANTITY_WORDS = {
+    'one': '1', 'two': '2', 'three': '3', 'four': '4', 'five': '5', 'six': '6',
+    'seven': '7', 'eight': '8', 'nine': '9', 'ten': '10', 'dozen': '12'
+}
+MODIFIER_WORDS = frozenset({'no', 'without', 'extra', 'light', 'double', 'add', 'remove'})
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
 class ConversationState(Enum):
     """States of the drive-thru conversation"""
     GREETING = "greeting"
@@ -38,25 +68,71 @@ class ConversationState(Enum):
     PAYMENT = "payment"
     GOODBYE = "goodbye"
 
-@dataclass
+# Assigning any of these invalidates an OrderItem's memoized string
+_ORDER_ITEM_STR_INPUTS = frozenset({'name', 'quantity', 'modifications'})
+# Assigning any of these changes the owning Order's total or line key
+_ORDER_LINE_INPUTS = frozenset({'name', 'quantity', 'price', 'modifications'})
+
+@dataclass(slots=True)
 class OrderItem:
     """Represents an item in the order"""
     name: str
     quantity: int
     price: float
-    modifications: List[str] = field(default_factory=list)
+    # Stored as a tuple: in-place edits would bypass __setattr__ and leave
+    # the owning order's line key stale, so reassign instead
+    modifications: Sequence[str] = ()
     confirmed: bool = False
     confidence: float = 1.0  # NEW: Track confidence
+    # Lowercased name for case-insensitive matching, computed once
+    _name_lower: str = field(default="", init=False, repr=False, compare=False)
+    # Memoized to_string(), cleared when any of its inputs is reassigned
+    _str_cached: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    # Order this item is a line of, told about quantity/price/key changes
+    _order: Optional['Order'] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        self._name_lower = self.name.lower()
+    
+    def __setattr__(self, name, value):
+        if name == 'modifications':
+            value = tuple(value)
+        # Unset during __init__
+        order = getattr(self, '_order', None) if name in _ORDER_LINE_INPUTS else None
+        if order is not None:
+            old_cents = Order._cents(self)
+        object.__setattr__(self, name, value)
+        if name == 'name':
+            object.__setattr__(self, '_name_lower', value.lower())
+        if name in _ORDER_ITEM_STR_INPUTS:
+            object.__setattr__(self, '_str_cached', None)
+        if order is not None:
+            order._line_changed(self, name, old_cents)
     
     def get_total_price(self) -> float:
         return self.price * self.quantity
     
     def to_string(self) -> str:
         """Convert to readable string"""
-        mods = f" ({', '.join(self.modifications)})" if self.modifications else ""
-        return f"{self.quantity}x {self.name}{mods}"
+        if self._str_cached is None:
+            mods = f" ({', '.join(self.modifications)})" if self.modifications else ""
+            self._str_cached = f"{self.quantity}x {self.name}{mods}"
+        return self._str_cached
 
-@dataclass
+class OrderLines(list):
+    """Read-only list of an Order's line items; change them through the Order"""
+    
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Order.items is read-only; use add_item(), remove_item() or discard()")
+    
+    append = extend = insert = remove = pop = clear = sort = reverse = _read_only
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    
+    def __reduce__(self):
+        # Default list pickling/copying rebuilds through extend()
+        return OrderLines, (list(self),)
+
+@dataclass(slots=True)
 class Order:
     """Represents the complete order"""
     items: List[OrderItem] = field(default_factory=list)
@@ -65,36 +141,99 @@ class Order:
     special_requests: List[str] = field(default_factory=list)
     pending_clarification: Optional[str] = None  # NEW: Track what needs clarification
     
+    # First line per (name, modification set), so add_item merges in O(1)
+    _index: Dict[Tuple[str, FrozenSet[str]], OrderItem] = field(default_factory=dict, init=False, repr=False, compare=False)
+    # Running total in integer cents, kept in step with the lines so get_total() is O(1)
+    _total_cents: int = field(default=0, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        self._reindex()
+    
+    def __setattr__(self, name, value):
+        if name == 'items':
+            for item in getattr(self, 'items', ()):
+                item._order = None
+            value = OrderLines(value)
+        object.__setattr__(self, name, value)
+        # _index is only set once __init__ is past items
+        if name == 'items' and hasattr(self, '_index'):
+            self._reindex()
+    
+    @staticmethod
+    def _key(item: OrderItem) -> Tuple[str, FrozenSet[str]]:
+        return item.name, frozenset(item.modifications)
+    
+    @staticmethod
+    def _cents(item: OrderItem) -> int:
+        return round(item.price * 100) * item.quantity
+    
+    def _reindex(self):
+        """Rebuild the key index and total from items"""
+        self._index = {}
+        self._total_cents = 0
+        for item in self.items:
+            item._order = self
+            self._index.setdefault(self._key(item), item)
+            self._total_cents += self._cents(item)
+    
+    def _line_changed(self, item: OrderItem, attr: str, old_cents: int):
+        """Called by OrderItem after one of its _ORDER_LINE_INPUTS is reassigned"""
+        self._total_cents += self._cents(item) - old_cents
+        if attr in ('name', 'modifications'):
+            self._reindex()
+    
     def add_item(self, item: OrderItem):
         """Add or update item in order"""
-        for existing in self.items:
-            if existing.name == item.name and existing.modifications == item.modifications:
-                existing.quantity += item.quantity
-                return
-        self.items.append(item)
+        key = self._key(item)
+        existing = self._index.get(key)
+        if existing is not None:
+            # The total follows via _line_changed
+            existing.quantity += item.quantity
+        else:
+            list.append(self.items, item)
+            item._order = self
+            self._index[key] = item
+            self._total_cents += self._cents(item)
     
     def remove_item(self, item_name: str) -> bool:
         """Remove item from order"""
-        for i, item in enumerate(self.items):
-            if item.name.lower() == item_name.lower():
-                self.items.pop(i)
+        item_name = item_name.lower()
+        for item in self.items:
+            if item._name_lower == item_name:
+                self.discard(item)
                 return True
         return False
     
+    def find(self, name_fragment: str) -> Optional[OrderItem]:
+        """First line item whose name contains name_fragment (case-insensitive)"""
+        name_fragment = name_fragment.lower()
+        for item in self.items:
+            if name_fragment in item._name_lower:
+                return item
+        return None
+    
+    def discard(self, item: OrderItem):
+        """Remove a specific line item (by identity) from the order"""
+        for i, line in enumerate(self.items):
+            if line is item:
+                list.__delitem__(self.items, i)
+                item._order = None
+                self._reindex()
+                return
+    
     def get_total(self) -> float:
         """Calculate total price"""
-        return sum(item.get_total_price() for item in self.items)
+        return self._total_cents / 100
     
     def get_summary(self) -> str:
         """Get order summary"""
         if not self.items:
             return "No items in order"
         
-        summary = "Your order:\n"
-        for item in self.items:
-            summary += f"  • {item.to_string()} - ${item.get_total_price():.2f}\n"
-        summary += f"Total: ${self.get_total():.2f}"
-        return summary
+        lines = ["Your order:"]
+        lines.extend(f"  • {item.to_string()} - ${item.get_total_price():.2f}" for item in self.items)
+        lines.append(f"Total: ${self.get_total():.2f}")
+        return "\n".join(lines)
     
     def has_low_confidence_items(self) -> bool:
         """Check if any items have low confidence"""
@@ -103,12 +242,34 @@ class Order:
 class EnhancedConversationManager:
     """Enhanced conversation manager with error handling"""
     
+    # State -> handler method name (names rather than bound methods so
+    # fork()ed copies dispatch to themselves)
+    _STATE_HANDLERS: Dict[ConversationState, str] = {
+        ConversationState.GREETING: '_handle_greeting',
+        ConversationState.TAKING_ORDER: '_handle_taking_order',
+        ConversationState.CLARIFYING: '_handle_clarifying',
+        ConversationState.ERROR_RECOVERY: '_handle_error_recovery_state',
+        ConversationState.ORDER_COMPLETE: '_handle_order_complete',
+        ConversationState.PAYMENT: '_handle_payment'
+    }
+    
     def __init__(self):
         """Initialize enhanced conversation manager"""
         self.state = ConversationState.GREETING
         self.order = Order()
-        self.conversation_history = []
         self.context_window = 5
+        # Bounded so a long shift doesn't grow it forever; must cover the
+        # stable prompt block plus the context window
+        self.conversation_history: deque = deque(maxlen=max(self.context_window * 4, 64))
+        self._history_total = 0  # Entries ever added, for absolute positions
+        
+        # Turns older than the context window are sent as an append-only
+        # block so the prompt prefix stays cacheable; it restarts once it
+        # grows past stable_history_max
+        self._cache_boundary_idx = 0
+        self.stable_history_max = 20
+        # Sent as the prompt cache key so one conversation's turns hit the same cache
+        self.session_id = uuid.uuid4().hex
         
         # Initialize components
         self.intent_detector = TacoBellIntentDetector()
@@ -117,9 +278,50 @@ class EnhancedConversationManager:
         self.error_handler = ErrorHandler()  # NEW
         self.conversation_repair = ConversationRepair()  # NEW
         
+        # Cache intents of repeated utterances (skips the LLM round trip):
+        # an exact LRU on (normalized text, recent history), then a semantic
+        # cache for near-identical phrasings
+        self.exact_intent_cache: OrderedDict = OrderedDict()
+        self.exact_intent_cache_size = 512
+        self.intent_cache = SemanticCache(
+            dim=self.menu_rag.encoder.get_sentence_embedding_dimension()
+        )
+        # Entity-free intents (menu questions, wrap-ups) from the same
+        # utterance embedding, before falling back to the LLM
+        self.local_intent = LocalIntentClassifier(self.menu_rag.encoder)
+        
         # Error tracking
         self.consecutive_errors = 0
         self.max_consecutive_errors = 3
+        self.max_intent_retries = 3
+        self.intent_timeout = 10.0  # Seconds before an async LLM call counts as timed out
+        # Share LLM calls with other conversations on the same event loop
+        # (adetect_intent_batched); worth it when many lanes run at once
+        self.batch_intent_calls = False
+        
+        # Words that appear in menu names/aliases; an utterance with none of
+        # them doesn't get a speculative menu search
+        self._menu_vocabulary = frozenset(
+            word
+            for item in self.menu_rag.menu_items
+            for phrase in [item.name, *item.aliases]
+            for word in phrase.lower().split()
+            if len(word) > 2
+        )
+        # Menu search results prefetched for the current turn, keyed by phrase
+        self._menu_hints: Dict[str, List[SearchResult]] = {}
+        # Item the agent just offered ("Would you like to add a ...?"), so a
+        # bare "yes" adds it instead of confirming the order
+        self._pending_upsell: Optional[str] = None
+        
+        # Intent detection started early from ASR partials (see on_partial)
+        self._speculative_intent: Optional[Tuple[str, asyncio.Task]] = None
+        self.partial_debounce = 0.12  # Seconds a partial must hold before we call the LLM
+        # Event loop for sync callers (ASR callback thread, main loop), started
+        # on first use; see on_partial_threadsafe / process_input_threadsafe
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
         self.last_successful_state = ConversationState.GREETING
         
         print(f"{Fore.GREEN}✓ Enhanced Conversation Manager initialized")
@@ -139,74 +341,461 @@ class EnhancedConversationManager:
         Returns:
             Tuple of (response, new_state)
         """
-        # Check for empty or low-quality input
-        if not user_input or not user_input.strip():
-            return self._handle_empty_input()
-        
-        # Check if confidence is too low
-        if confidence < 0.5:
-            return self._handle_low_confidence_input(user_input, confidence)
-        
-        # Check for confusion signals
-        if self.conversation_repair.detect_confusion_signals(user_input):
-            return self._handle_customer_confusion(user_input)
+        early_response = self._screen_input(user_input, confidence)
+        if early_response:
+            return early_response
         
         try:
             # Add to history
-            self.conversation_history.append(f"Customer: {user_input}")
+            self._add_to_history(f"Customer: {user_input}")
             
             # Get intent with error handling
             intent_result = self._get_intent_with_retry(user_input)
             
-            if not intent_result:
-                return self._handle_intent_failure()
-            
-            # Process based on current state and intent
-            response = self._handle_state_intent(intent_result)
+            return self._complete_turn(intent_result)
             
-            # Add response to history
-            self.conversation_history.append(f"Agent: {response}")
-            
-            # Reset error counter on success
-            self.consecutive_errors = 0
-            self.last_successful_state = self.state
-            
-            # Log state
-            self._log_state()
+        except Exception as e:
+            return self._handle_unexpected_error(e)
+    
+    async def aprocess_input(
+        self, 
+        user_input: str, 
+        confidence: float = 1.0
+    ) -> Tuple[str, ConversationState]:
+        """
+        Async version of process_input
+        
+        The LLM call is awaited, so many conversations (e.g. one per lane)
+        can share one event loop with their API round trips overlapping.
+        """
+        early_response = await self._ascreen_input(user_input, confidence)
+        if early_response:
+            return early_response
+        
+        try:
+            self._add_to_history(f"Customer: {user_input}")
             
-            return response, self.state
+            # Search the menu for likely item phrases while the LLM works
+            prefetch = self._prefetch_menu_search(user_input)
+            intent_result = await self._aget_intent_with_retry(user_input)
+            if prefetch is not None:
+                self._menu_hints = await self._collect_menu_prefetch(prefetch, intent_result)
+            return self._complete_turn(intent_result)
             
         except Exception as e:
             return self._handle_unexpected_error(e)
+        finally:
+            self._menu_hints = {}
+    
+    def process_input_threadsafe(
+        self, 
+        user_input: str, 
+        confidence: float = 1.0
+    ) -> Tuple[str, ConversationState]:
+        """
+        Blocking aprocess_input for sync callers
+        
+        Runs the turn on the manager's own event loop, where detections
+        started by on_partial_threadsafe are waiting, so a matching partial
+        saves the LLM round trip.
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self.aprocess_input(user_input, confidence), self._background_loop()
+        )
+        return future.result()
+    
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        """The manager's event loop, running in a daemon thread (started on first use)"""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever, name="conversation-loop", daemon=True
+                )
+                self._loop_thread.start()
+            return self._loop
+    
+    def _fast_menu_prescan(self, user_input: str) -> List[str]:
+        """Guess the item phrases in an utterance without the LLM"""
+        phrases = []
+        for chunk in ITEM_SEPARATOR_PATTERN.split(user_input.lower()):
+            chunk = chunk.strip(" .!?")
+            # Strip "can i get", "two", "and" etc. until a fixed point
+            stripped = ITEM_FILLER_PATTERN.sub("", chunk)
+            while stripped != chunk:
+                chunk, stripped = stripped, ITEM_FILLER_PATTERN.sub("", stripped)
+            
+            words = chunk.split()
+            if any(word in self._menu_vocabulary or word.rstrip("s") in self._menu_vocabulary for word in words):
+                phrases.append(" ".join(words))
+        return phrases
+    
+    def _prefetch_menu_search(self, user_input: str) -> Optional[Tuple[List[str], asyncio.Task]]:
+        """Start a menu search for the utterance's likely items in a worker thread"""
+        phrases = self._fast_menu_prescan(user_input)
+        if not phrases:
+            return None
+        task = asyncio.create_task(asyncio.to_thread(self.menu_rag.search_menu_batch, phrases, 3))
+        return phrases, task
+    
+    async def _collect_menu_prefetch(
+        self,
+        prefetch: Tuple[List[str], asyncio.Task],
+        intent_result: Optional[IntentResult]
+    ) -> Dict[str, List[SearchResult]]:
+        """Wait for the prefetched search if this turn will use it"""
+        phrases, task = prefetch
+        if intent_result is None or intent_result.intent != OrderIntent.ORDER_ITEM:
+            # Let it finish in the background (it still warms the embedding cache)
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            return {}
+        
+        try:
+            return dict(zip(phrases, await task))
+        except Exception as e:
+            log.warning("Menu prefetch failed: %r", e)
+            return {}
+    
+    def _screen_input(
+        self, 
+        user_input: str, 
+        confidence: float
+    ) -> Optional[Tuple[str, ConversationState]]:
+        """Handle input that never reaches intent detection (None if it should)"""
+        # Check for empty or low-quality input
+        if not user_input or not user_input.strip():
+            return self._handle_empty_input()
+        
+        # Check if confidence is too low
+        if confidence < 0.5:
+            return self._handle_low_confidence_input(user_input, confidence)
+        
+        # Check for confusion signals
+        if self.conversation_repair.detect_confusion_signals(user_input):
+            return self._handle_customer_confusion(user_input)
+        
+        return None
+    
+    async def _ascreen_input(
+        self, 
+        user_input: str, 
+        confidence: float
+    ) -> Optional[Tuple[str, ConversationState]]:
+        """Async _screen_input: the low-confidence check awaits its intent call"""
+        if user_input and user_input.strip() and confidence < 0.5:
+            return await self._ahandle_low_confidence_input(user_input, confidence)
+        return self._screen_input(user_input, confidence)
+    
+    def _complete_turn(self, intent_result: Optional[IntentResult]) -> Tuple[str, ConversationState]:
+        """Respond to a detected intent and update history/error tracking"""
+        if not intent_result:
+            return self._handle_intent_failure()
+        
+        # The offer only stands for the turn right after it
+        self._pending_upsell = None
+        
+        # Process based on current state and intent
+        response = self._handle_state_intent(intent_result)
+        
+        # Add response to history
+        self._add_to_history(f"Agent: {response}")
+        
+        # Reset error counter on success
+        self.consecutive_errors = 0
+        self.last_successful_state = self.state
+        
+        # Log state
+        self._log_state()
+        
+        return response, self.state
     
     def _get_intent_with_retry(self, user_input: str) -> Optional[IntentResult]:
         """Get intent with retry logic"""
-        max_retries = 3
+        cached, embedding = self._lookup_intent(user_input)
+        if cached:
+            return cached
         
-        for attempt in range(max_retries):
+        for attempt in range(self.max_intent_retries):
             try:
+                stable, recent = self._history_for_prompt(self.context_window)
                 intent_result = self.intent_detector.detect_intent(
-                    user_input,
-                    self.conversation_history[-self.context_window:]
+                    user_input, recent, stable, cache_key=self.session_id
                 )
+                self._remember_intent(user_input, embedding, intent_result)
                 return intent_result
                 
             except Exception as e:
-                print(f"{Fore.YELLOW}Intent detection attempt {attempt + 1} failed: {e}")
-                
-                if attempt < max_retries - 1:
-                    error_context = ErrorContext(
-                        error_type=ErrorType.API_TIMEOUT,
-                        severity=ErrorSeverity.MEDIUM,
-                        message=str(e),
-                        retry_count=attempt
-                    )
-                    self.error_handler.handle_error(error_context)
+                error_context = self._intent_attempt_failed(e, attempt)
+                if error_context is None:
+                    return None
+                self.error_handler.handle_error(error_context)
+        
+        return None
+    
+    async def _aget_intent_with_retry(self, user_input: str) -> Optional[IntentResult]:
+        """Async _get_intent_with_retry; hung calls time out after intent_timeout"""
+        speculative = self._take_speculative_intent(user_input)
+        
+        cached, embedding = self._lookup_intent(user_input)
+        if cached:
+            if speculative is not None:
+                speculative.cancel()
+            return cached
+        
+        # A detection started from a matching partial may already be done
+        if speculative is not None:
+            try:
+                intent_result = await asyncio.wait_for(speculative, timeout=self.intent_timeout)
+                self._remember_intent(user_input, embedding, intent_result)
+                return intent_result
+            except Exception as e:
+                log.warning("Speculative intent detection failed: %r", e)
+        
+        for attempt in range(self.max_intent_retries):
+            try:
+                stable, recent = self._history_for_prompt(self.context_window)
+                if self.batch_intent_calls:
+                    detection = self.intent_detector.adetect_intent_batched(user_input, recent)
                 else:
+                    detection = self.intent_detector.adetect_intent(
+                        user_input, recent, stable, cache_key=self.session_id
+                    )
+                intent_result = await asyncio.wait_for(detection, timeout=self.intent_timeout)
+                self._remember_intent(user_input, embedding, intent_result)
+                return intent_result
+                
+            except Exception as e:
+                error_context = self._intent_attempt_failed(e, attempt)
+                if error_context is None:
                     return None
+                await self.error_handler.ahandle_error(error_context)
+        
+        return None
+    
+    async def on_partial(self, partial_text: str):
+        """
+        Start intent detection on a partial ASR hypothesis
+        
+        Each new partial replaces the previous guess. If the final transcript
+        matches, aprocess_input awaits this call instead of starting a new
+        one, so the LLM round trip overlaps with the end of the utterance.
+        
+        Args:
+            partial_text: Transcript so far
+        """
+        self._cancel_speculative_intent()
         
+        normalized = " ".join(partial_text.lower().split())
+        if not normalized:
+            return
+        
+        # Same context the final call would see
+        stable, recent = self._history_for_prompt(self.context_window - 1)
+        history = recent + [f"Customer: {partial_text}"]
+        task = asyncio.create_task(self._speculate_intent(partial_text, history, stable))
+        self._speculative_intent = (normalized, task)
+    
+    def on_partial_threadsafe(self, partial_text: str):
+        """
+        Synchronous, thread-safe on_partial for ASR callbacks
+        
+        Schedules on_partial on the manager's event loop and returns at
+        once; finish the turn with process_input_threadsafe so it can use
+        the result.
+        
+        Args:
+            partial_text: Transcript so far
+        """
+        asyncio.run_coroutine_threadsafe(self.on_partial(partial_text), self._background_loop())
+    
+    async def _speculate_intent(self, text: str, history: List[str], stable: List[str]) -> IntentResult:
+        # Debounce so we don't fire on every word
+        await asyncio.sleep(self.partial_debounce)
+        return await self.intent_detector.adetect_intent(
+            text, history, stable, cache_key=self.session_id
+        )
+    
+    def _take_speculative_intent(self, user_input: str) -> Optional[asyncio.Task]:
+        """Claim the speculative detection if it was for this exact utterance"""
+        if self._speculative_intent is None:
+            return None
+        
+        normalized, task = self._speculative_intent
+        self._speculative_intent = None
+        if normalized == " ".join(user_input.lower().split()):
+            return task
+        
+        task.cancel()
         return None
     
+    def _cancel_speculative_intent(self):
+        if self._speculative_intent is not None:
+            task = self._speculative_intent[1]
+            self._speculative_intent = None
+            # May be called from outside the loop the task runs on (reset/close)
+            loop = task.get_loop()
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(task.cancel)
+    
+    def _add_to_history(self, entry: str):
+        self.conversation_history.append(entry)
+        self._history_total += 1
+    
+    def _history_for_prompt(self, recent_len: int) -> Tuple[List[str], List[str]]:
+        """
+        Split history into the stable prompt block and the recent turns
+        
+        Args:
+            recent_len: Number of newest entries sent with the current turn
+            
+        Returns:
+            Tuple of (stable older turns, recent turns)
+        """
+        # Positions are absolute turn numbers; the deque only holds the newest
+        first = self._history_total - len(self.conversation_history)
+        recent_start = max(0, self._history_total - recent_len)
+        if (recent_start - self._cache_boundary_idx > self.stable_history_max
+                or self._cache_boundary_idx < first):
+            self._cache_boundary_idx = recent_start
+        
+        stable = list(islice(self.conversation_history, self._cache_boundary_idx - first, recent_start - first))
+        recent = list(islice(self.conversation_history, recent_start - first, None))
+        return stable, recent
+    
+    def _lookup_intent(self, user_input: str) -> Tuple[Optional[IntentResult], Optional[np.ndarray]]:
+        """
+        Resolve an intent without the LLM if possible
+        
+        Returns:
+            Tuple of (intent or None, utterance embedding for caching)
+        """
+        # Fast path: trivial confirmations/greetings never touch the LLM or the embedder
+        fast = self._fast_intent(user_input)
+        if fast:
+            return fast, None
+        
+        # Exact repeat of an utterance in the same context
+        key = self._exact_intent_key(user_input)
+        exact = self.exact_intent_cache.get(key)
+        if exact:
+            self.exact_intent_cache.move_to_end(key)
+            return replace(exact, raw_text=user_input, entities=dict(exact.entities)), None
+        
+        # Check the semantic cache first
+        embedding = self.menu_rag.encoder.encode([user_input])[0]
+        semantic_key = self._semantic_intent_key(user_input)
+        cached = self.intent_cache.get(embedding, key=semantic_key) if semantic_key else None
+        if cached:
+            return replace(cached, raw_text=user_input, entities=dict(cached.entities)), embedding
+        
+        local = self.local_intent.classify(user_input, embedding)
+        if local and self._local_intent_allowed(local):
+            return local, embedding
+        
+        return None, embedding
+    
+    def _fast_intent(self, user_input: str) -> Optional[IntentResult]:
+        """
+        fast_intent, reading a bare "yes" as the answer to the agent's last question
+        
+        After an upsell offer it adds the offered item; it only confirms the
+        order while the agent is waiting on "Is that correct?" (or a recap);
+        anything else goes to the LLM.
+        """
+        if AFFIRMATION_PATTERN.match(user_input):
+            if self._pending_upsell and self.state == ConversationState.TAKING_ORDER:
+                return IntentResult(
+                    intent=OrderIntent.ORDER_ITEM,
+                    confidence=1.0,
+                    entities={
+                        'items': [self._pending_upsell],
+                        'quantities': {self._pending_upsell: 1},
+                        'modifications': [],
+                        'tone': 'confirming'
+                    },
+                    raw_text=user_input
+                )
+            if self.state not in (ConversationState.ORDER_COMPLETE, ConversationState.CLARIFYING):
+                return None
+        return fast_intent(user_input, self.conversation_history)
+    
+    def _local_intent_allowed(self, result: IntentResult) -> bool:
+        """
+        Gate local classifier hits like _fast_intent gates a bare "yes"
+        
+        Right after an upsell offer, "yes that sounds right" is accepting the
+        offered item, not confirming the order, so the LLM (which sees the
+        offer in the history) decides.
+        """
+        return not (result.intent == OrderIntent.CONFIRM_ORDER and self._pending_upsell
+                    and self.state == ConversationState.TAKING_ORDER)
+    
+    def _exact_intent_key(self, user_input: str) -> Tuple[str, Tuple[str, ...]]:
+        """Key for the exact intent cache: normalized text + recent history"""
+        normalized = " ".join(user_input.lower().split())
+        # The newest history entry is this utterance itself (un-normalized)
+        history = self.conversation_history
+        return normalized, tuple(islice(history, max(0, len(history) - self.context_window), max(0, len(history) - 1)))
+    
+    def _semantic_intent_key(self, user_input: str) -> Optional[Tuple[Tuple[str, ...], ...]]:
+        """
+        Exact part of the semantic cache key: quantities, modifiers, menu words
+        
+        Returns:
+            Key tuple, or None if the utterance names no menu item - then its
+            meaning ("yes please") hangs on context the cache doesn't see
+        """
+        words = WORD_PATTERN.findall(user_input.lower())
+        # "tacos" and "taco" are the same item; "and"/"five" come from names
+        # like "Beefy 5-Layer" but say nothing about which item was meant
+        singular = [word.rstrip("s") if word.rstrip("s") in self._menu_vocabulary else word for word in words]
+        menu_words = tuple(
+            word for word in singular
+            if word in self._menu_vocabulary and word not in QUANTITY_WORDS and word != "and"
+        )
+        if not menu_words:
+            return None
+        quantities = tuple(QUANTITY_WORDS.get(word, word) for word in words if word in QUANTITY_WORDS or word.isdigit())
+        modifiers = tuple(word for word in words if word in MODIFIER_WORDS)
+        return quantities, modifiers, menu_words
+    
+    def _remember_intent(self, user_input: str, embedding: np.ndarray, intent_result: IntentResult):
+        """Cache an LLM result"""
+        # Any parsed answer is safe to replay for the exact same context,
+        # including 'unclear' for garbled speech - but not an API failure,
+        # which comes back without entities (or marked degraded)
+        if intent_result.entities and not intent_result.entities.get('degraded'):
+            key = self._exact_intent_key(user_input)
+            self.exact_intent_cache[key] = intent_result
+            self.exact_intent_cache.move_to_end(key)
+            if len(self.exact_intent_cache) > self.exact_intent_cache_size:
+                self.exact_intent_cache.popitem(last=False)
+        
+        # Only share results the LLM was sure about with similar phrasings
+        if intent_result.intent != OrderIntent.UNCLEAR and intent_result.confidence > 0.7:
+            semantic_key = self._semantic_intent_key(user_input)
+            if semantic_key:
+                self.intent_cache.set(embedding, intent_result, key=semantic_key)
+    
+    def _intent_attempt_failed(self, exception: Exception, attempt: int) -> Optional[ErrorContext]:
+        """
+        Report a failed detection attempt
+        
+        Returns:
+            Error context to handle before retrying, or None if out of retries
+        """
+        print(f"{Fore.YELLOW}Intent detection attempt {attempt + 1} failed: {exception!r}")
+        
+        if attempt >= self.max_intent_retries - 1:
+            return None
+        
+        return ErrorContext(
+            error_type=ErrorType.API_TIMEOUT,
+            severity=ErrorSeverity.MEDIUM,
+            message=str(exception) or type(exception).__name__,
+            retry_count=attempt
+        )
+    
     def _handle_empty_input(self) -> Tuple[str, ConversationState]:
         """Handle empty or silent input"""
         self.consecutive_errors += 1
@@ -233,31 +822,60 @@ class EnhancedConversationManager:
         """Handle low confidence ASR"""
         print(f"{Fore.YELLOW}Low confidence input: {confidence:.2f}")
         
-        error_context = ErrorContext(
-            error_type=ErrorType.ASR_LOW_CONFIDENCE,
-            severity=ErrorSeverity.LOW,
-            message=f"Low confidence: {confidence}",
-            retry_count=0
-        )
-        
         # Still try to process but ask for confirmation
         try:
             intent_result = self.intent_detector.detect_intent(user_input)
-            
-            if intent_result and intent_result.entities.get('items'):
-                items = intent_result.entities['items']
-                clarification = self.conversation_repair.generate_clarification(
-                    "unclear_item",
-                    {"item": items[0]}
-                )
-                self.state = ConversationState.CLARIFYING
-                return clarification, self.state
         except:
-            pass
+            intent_result = None
         
-        _, message = self.error_handler.handle_error(error_context)
+        clarification = self._clarify_low_confidence(intent_result)
+        if clarification:
+            return clarification
+        
+        _, message = self.error_handler.handle_error(self._low_confidence_error(confidence))
         return message, self.state
     
+    async def _ahandle_low_confidence_input(
+        self, 
+        user_input: str, 
+        confidence: float
+    ) -> Tuple[str, ConversationState]:
+        """Async _handle_low_confidence_input (nothing blocks the event loop)"""
+        print(f"{Fore.YELLOW}Low confidence input: {confidence:.2f}")
+        
+        try:
+            intent_result = await self.intent_detector.adetect_intent(user_input)
+        except:
+            intent_result = None
+        
+        clarification = self._clarify_low_confidence(intent_result)
+        if clarification:
+            return clarification
+        
+        _, message = await self.error_handler.ahandle_error(self._low_confidence_error(confidence))
+        return message, self.state
+    
+    def _clarify_low_confidence(self, intent_result: Optional[IntentResult]) -> Optional[Tuple[str, ConversationState]]:
+        """Ask about the item heard in a low-confidence utterance (None if none was heard)"""
+        if intent_result and intent_result.entities.get('items'):
+            items = intent_result.entities['items']
+            clarification = self.conversation_repair.generate_clarification(
+                "unclear_item",
+                {"item": items[0]}
+            )
+            self.state = ConversationState.CLARIFYING
+            return clarification, self.state
+        return None
+    
+    @staticmethod
+    def _low_confidence_error(confidence: float) -> ErrorContext:
+        return ErrorContext(
+            error_type=ErrorType.ASR_LOW_CONFIDENCE,
+            severity=ErrorSeverity.LOW,
+            message=f"Low confidence: {confidence}",
+            retry_count=0
+        )
+    
     def _handle_customer_confusion(self, user_input: str) -> Tuple[str, ConversationState]:
         """Handle customer confusion"""
         print(f"{Fore.CYAN}Customer appears confused")
@@ -281,26 +899,30 @@ class EnhancedConversationManager:
             retry_count=self.consecutive_errors
         )
         
-        _, message = self.error_handler.handle_error(error_context)
+        # Retries are already exhausted, so there is nothing to back off for
+        _, message = self.error_handler.handle_error(error_context, wait=False)
         
         return message, self.state
     
     def _handle_unexpected_error(self, exception: Exception) -> Tuple[str, ConversationState]:
         """Handle unexpected errors"""
-        print(f"{Fore.RED}Unexpected error: {exception}")
-        import traceback
-        traceback.print_exc()
-        
         self.consecutive_errors += 1
         
-        error_context = ErrorContext(
-            error_type=ErrorType.UNKNOWN_ERROR,
-            severity=ErrorSeverity.HIGH,
-            message=str(exception),
-            retry_count=self.consecutive_errors
-        )
-        
-        _, message = self.error_handler.handle_error(error_context)
+        # Past the cap the same error is usually repeating every turn: keep
+        # the log to one line and skip the error handler entirely
+        if self.consecutive_errors > self.max_consecutive_errors:
+            log.warning("Unexpected error (%d in a row): %r", self.consecutive_errors, exception)
+        else:
+            log.exception("Unexpected error in conversation manager", exc_info=exception)
+            
+            error_context = ErrorContext(
+                error_type=ErrorType.UNKNOWN_ERROR,
+                severity=ErrorSeverity.HIGH,
+                message=str(exception),
+                retry_count=self.consecutive_errors
+            )
+            
+            _, message = self.error_handler.handle_error(error_context)
         
         # Attempt to recover to last known good state
         if self.consecutive_errors >= self.max_consecutive_errors:
@@ -312,28 +934,12 @@ class EnhancedConversationManager:
     def _handle_state_intent(self, intent_result: IntentResult) -> str:
         """Handle intent based on current state (with error handling)"""
         
+        handler_name = self._STATE_HANDLERS.get(self.state)
+        if handler_name is None:
+            return "Thank you for choosing Taco Bell!"
+        
         try:
-            if self.state == ConversationState.GREETING:
-                return self._handle_greeting(intent_result)
-            
-            elif self.state == ConversationState.TAKING_ORDER:
-                return self._handle_taking_order(intent_result)
-            
-            elif self.state == ConversationState.CLARIFYING:
-                return self._handle_clarifying(intent_result)
-            
-            elif self.state == ConversationState.ERROR_RECOVERY:
-                return self._handle_error_recovery_state(intent_result)
-            
-            elif self.state == ConversationState.ORDER_COMPLETE:
-                return self._handle_order_complete(intent_result)
-            
-            elif self.state == ConversationState.PAYMENT:
-                return self._handle_payment(intent_result)
-            
-            else:
-                return "Thank you for choosing Taco Bell!"
-                
+            return getattr(self, handler_name)(intent_result)
         except Exception as e:
             print(f"{Fore.RED}Error in state handler: {e}")
             return "Let me help you with that. What would you like?"
@@ -400,10 +1006,24 @@ class EnhancedConversationManager:
         mentioned_items = intent.entities.get('items', [])
         quantities = intent.entities.get('quantities', {})
         
-        for item_name in mentioned_items:
+        # One batched search for every item not already prefetched; top 3 so
+        # the same results also serve the "did you mean" suggestions below
+        keys = [" ".join(name.lower().split()) for name in mentioned_items]
+        to_search = [name for name, key in zip(mentioned_items, keys) if key not in self._menu_hints]
+        try:
+            searched = self.menu_rag.search_menu_batch(to_search, top_k=3) if to_search else []
+        except Exception as e:
+            log.warning("Error searching menu for %s: %s", to_search, e)
+            searched = [[] for _ in to_search]
+        
+        searched = iter(searched)
+        batch_results = [
+            self._menu_hints[key] if key in self._menu_hints else next(searched)
+            for key in keys
+        ]
+        
+        for item_name, search_results in zip(mentioned_items, batch_results):
             try:
-                search_results = self.menu_rag.search_menu(item_name, top_k=1)
-                
                 if search_results and search_results[0].score > 0.5:
                     menu_item = search_results[0].item
                     qty = quantities.get(item_name, 1)
@@ -427,9 +1047,9 @@ class EnhancedConversationManager:
                 print(f"{Fore.RED}Error processing item {item_name}: {e}")
                 items_not_found.append(item_name)
         
-        # Build response
+        # Build response (each branch formats the full reply once)
         if items_added:
-            response = f"I've added {', '.join(items_added)} to your order."
+            added = ", ".join(items_added)
             
             # Add recommendation
             current_item_names = [item.name for item in self.order.items]
@@ -437,9 +1057,13 @@ class EnhancedConversationManager:
             
             if recommendations:
                 rec = recommendations[0]
-                response += f" Would you like to add a {rec.name} for ${rec.price:.2f}?"
+                self._pending_upsell = rec.name
+                response = (
+                    f"I've added {added} to your order. "
+                    f"Would you like to add a {rec.name} for ${rec.price:.2f}?"
+                )
             else:
-                response += " Anything else?"
+                response = f"I've added {added} to your order. Anything else?"
         else:
             # Handle menu item not found
             error_context = ErrorContext(
@@ -449,13 +1073,11 @@ class EnhancedConversationManager:
             )
             _, error_msg = self.error_handler.handle_error(error_context)
             
-            response = error_msg
-            
-            if mentioned_items:
-                search_results = self.menu_rag.search_menu(mentioned_items[0], top_k=3)
-                if search_results:
-                    suggestions = [r.item.name for r in search_results]
-                    response += f" Did you mean {', '.join(suggestions)}?"
+            if batch_results and batch_results[0]:
+                suggestions = ", ".join(r.item.name for r in batch_results[0])
+                response = f"{error_msg} Did you mean {suggestions}?"
+            else:
+                response = error_msg
         
         return response
     
@@ -468,11 +1090,10 @@ class EnhancedConversationManager:
         
         removed = []
         for item_name in items:
-            for order_item in self.order.items[:]:
-                if item_name.lower() in order_item.name.lower():
-                    self.order.items.remove(order_item)
-                    removed.append(order_item.name)
-                    break
+            order_item = self.order.find(item_name)
+            if order_item is not None:
+                self.order.discard(order_item)
+                removed.append(order_item.name)
         
         if removed:
             return f"I've removed {', '.join(removed)} from your order. Anything else?"
@@ -495,12 +1116,15 @@ class EnhancedConversationManager:
         print(f"{Fore.YELLOW}Order items: {len(self.order.items)}")
         print(f"{Fore.WHITE}Consecutive errors: {self.consecutive_errors}")
         
-        if self.order.items:
-            print(f"{Fore.MAGENTA}Current order:")
-            for item in self.order.items:
-                conf_indicator = "✓" if item.confidence > 0.7 else "?"
-                print(f"  {conf_indicator} {item.to_string()} - ${item.get_total_price():.2f}")
-            print(f"{Fore.GREEN}Total: ${self.order.get_total():.2f}")
+        items = self.order.items
+        if items:
+            lines = [f"{Fore.MAGENTA}Current order:"]
+            lines.extend(
+                f"  {'✓' if item.confidence > 0.7 else '?'} {item.to_string()} - ${item.get_total_price():.2f}"
+                for item in items
+            )
+            lines.append(f"{Fore.GREEN}Total: ${self.order.get_total():.2f}")
+            print("\n".join(lines))
     
     def get_diagnostics(self) -> dict:
         """Get diagnostic information"""
@@ -509,13 +1133,62 @@ class EnhancedConversationManager:
             "order_items": len(self.order.items),
             "consecutive_errors": self.consecutive_errors,
             "error_stats": self.error_handler.get_error_stats(),
-            "conversation_length": len(self.conversation_history)
+            "intent_cache": self.intent_cache.get_stats(),
+            "exact_intent_cache_entries": len(self.exact_intent_cache),
+            "local_intent_hits": self.local_intent.hits,
+            "conversation_length": self._history_total
         }
     
+    async def warmup(self):
+        """Warm the LLM connection so the first turn doesn't pay the handshake"""
+        await self.intent_detector.warmup()
+    
+    def close(self):
+        """Release the LLM client's pooled connections (shared with fork()s)"""
+        with self._loop_lock:
+            loop, thread = self._loop, self._loop_thread
+            self._loop = self._loop_thread = None
+        
+        if loop is not None:
+            # The async client was used on the background loop - close it there
+            asyncio.run_coroutine_threadsafe(self.aclose(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+        else:
+            self._cancel_speculative_intent()
+        self.intent_detector.close()
+    
+    async def aclose(self):
+        """
+        Release async resources before the event loop shuts down
+        
+        The LLM client is shared with fork()ed conversations, so call this
+        once, when the last of them is done.
+        """
+        self._cancel_speculative_intent()
+        await self.intent_detector.aclose()
+    
+    def fork(self) -> "EnhancedConversationManager":
+        """
+        Start an independent conversation that shares this manager's
+        loaded components (LLM clients, menu RAG, caches)
+        """
+        conversation = copy.copy(self)
+        conversation._speculative_intent = None  # Don't cancel ours on reset
+        conversation.reset()
+        conversation.last_successful_state = ConversationState.GREETING
+        return conversation
+    
     def reset(self):
         """Reset conversation for new customer"""
         self.state = ConversationState.GREETING
         self.order = Order()
-        self.conversation_history = []
+        self.conversation_history = deque(maxlen=self.conversation_history.maxlen)
+        self._history_total = 0
+        self._cache_boundary_idx = 0
+        self.session_id = uuid.uuid4().hex
         self.consecutive_errors = 0
+        self._pending_upsell = None
+        self._cancel_speculative_intent()
         print(f"{Fore.MAGENTA}Conversation reset for new customer")
\ No newline at end of file
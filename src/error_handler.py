@@ -3,14 +3,30 @@ Error Handling and Recovery System
 Handles failures gracefully and implements retry logic
 """
 
+import re
 import time
-from typing import Optional, Callable, Any, Tuple
+import random
+import asyncio
+import logging
+import numpy as np
+from itertools import cycle
+from typing import Optional, Callable, Any, Dict, Tuple, Type
 from enum import Enum
 from dataclasses import dataclass
 from colorama import Fore, init
 
 init(autoreset=True)
 
+log = logging.getLogger(__name__)
+
+# Phrases that suggest the customer is confused, matched as whole words
+# ("medium" and "whatever" are not confusion); one compiled alternation
+# scans the text once
+CONFUSION_PATTERN = re.compile(
+    r"\b(?:what|huh|wait|uh|um|confused|don'?t understand|not sure|i don'?t know)\b",
+    re.IGNORECASE
+)
+
 class ErrorType(Enum):
     """Types of errors the system can encounter"""
     ASR_FAILURE = "asr_failure"              # Speech recognition failed
@@ -24,6 +40,12 @@ class ErrorType(Enum):
     INVALID_STATE = "invalid_state"           # Conversation state error
     UNKNOWN_ERROR = "unknown_error"           # Catch-all
 
+class CircuitState(Enum):
+    """Circuit breaker states"""
+    CLOSED = "closed"        # Calls go through
+    OPEN = "open"            # Calls short-circuit to a fallback
+    HALF_OPEN = "half_open"  # One probe call allowed through
+
 class ErrorSeverity(Enum):
     """Severity levels for errors"""
     LOW = "low"          # Minor issue, can continue
@@ -31,7 +53,7 @@ class ErrorSeverity(Enum):
     HIGH = "high"        # Serious issue, may need restart
     CRITICAL = "critical"  # System failure
 
-@dataclass
+@dataclass(slots=True)
 class ErrorContext:
     """Context information about an error"""
     error_type: ErrorType
@@ -47,8 +69,11 @@ class ErrorHandler:
     
     def __init__(self):
         """Initialize error handler"""
-        self.error_counts = {}  # Track error frequency
-        self.last_error_time = {}  # Track when errors occurred
+        # Per-type error frequency and last occurrence, indexed by enum position
+        self._type_to_idx = {error_type: i for i, error_type in enumerate(ErrorType)}
+        self._type_values = [error_type.value for error_type in ErrorType]
+        self._counts = np.zeros(len(ErrorType), dtype=np.int64)
+        self._last_ts = np.full(len(ErrorType), np.nan)
         
         # Recovery strategies for each error type
         self.recovery_strategies = {
@@ -62,6 +87,13 @@ class ErrorHandler:
             ErrorType.EMPTY_ORDER: self._recover_empty_order,
         }
         
+        # Seconds to back off before the caller retries (rate limits back off
+        # exponentially instead, see _backoff_delay)
+        self.retry_delays = {
+            ErrorType.API_TIMEOUT: 1.0,
+            ErrorType.NETWORK_ERROR: 2.0,
+        }
+        
         # User-facing messages for each error type
         self.user_messages = {
             ErrorType.ASR_FAILURE: "I didn't catch that. Could you repeat?",
@@ -76,16 +108,41 @@ class ErrorHandler:
         
         print(f"{Fore.GREEN}✓ Error Handler initialized")
     
-    def handle_error(self, error_context: ErrorContext) -> Tuple[bool, str]:
+    def handle_error(self, error_context: ErrorContext, wait: bool = True) -> Tuple[bool, str]:
         """
         Handle an error and attempt recovery
         
         Args:
             error_context: Context about the error
+            wait: Block for the retry backoff before returning
             
         Returns:
             Tuple of (success, user_message)
         """
+        success, user_message, delay = self._recover(error_context)
+        if wait and delay:
+            time.sleep(delay)
+        return success, user_message
+    
+    async def ahandle_error(self, error_context: ErrorContext) -> Tuple[bool, str]:
+        """
+        Async version of handle_error
+        
+        The retry backoff is awaited, so other conversations on the event
+        loop keep running while this one waits.
+        """
+        success, user_message, delay = self._recover(error_context)
+        if delay:
+            await asyncio.sleep(delay)
+        return success, user_message
+    
+    def _recover(self, error_context: ErrorContext) -> Tuple[bool, str, float]:
+        """
+        Log, track and run the recovery strategy for an error
+        
+        Returns:
+            Tuple of (success, user_message, seconds to wait before retrying)
+        """
         # Log the error
         self._log_error(error_context)
         
@@ -102,44 +159,45 @@ class ErrorHandler:
         
         if recovery_strategy and error_context.retry_count < error_context.max_retries:
             success = recovery_strategy(error_context)
-            return success, user_message
+            return success, user_message, self._backoff_delay(error_context)
         
         # If no recovery or max retries reached
         if error_context.retry_count >= error_context.max_retries:
-            print(f"{Fore.RED}Max retries reached for {error_context.error_type.value}")
-            return False, "I'm having trouble processing that. Let's try something else."
+            log.warning("Max retries reached for %s", error_context.error_type.value)
+            return False, "I'm having trouble processing that. Let's try something else.", 0.0
         
-        return False, user_message
+        return False, user_message, 0.0
+    
+    def _backoff_delay(self, context: ErrorContext) -> float:
+        """Jittered wait before a retry, so concurrent lanes don't retry in lockstep"""
+        if context.error_type == ErrorType.API_RATE_LIMIT:
+            delay = min(2 ** context.retry_count, 10)  # Exponential backoff
+        else:
+            delay = self.retry_delays.get(context.error_type, 0.0)
+        return delay * random.uniform(0.5, 1.5)
     
     def _track_error(self, error_type: ErrorType):
         """Track error occurrence for monitoring"""
-        if error_type not in self.error_counts:
-            self.error_counts[error_type] = 0
-        
-        self.error_counts[error_type] += 1
-        self.last_error_time[error_type] = time.time()
+        i = self._type_to_idx[error_type]
+        self._counts[i] += 1
+        self._last_ts[i] = time.monotonic()
     
     def _log_error(self, context: ErrorContext):
         """Log error details"""
-        severity_colors = {
-            ErrorSeverity.LOW: Fore.YELLOW,
-            ErrorSeverity.MEDIUM: Fore.YELLOW,
-            ErrorSeverity.HIGH: Fore.RED,
-            ErrorSeverity.CRITICAL: Fore.RED
-        }
+        # Low/medium errors are routine recoveries; only high/critical are warnings
+        level = logging.WARNING if context.severity in (ErrorSeverity.HIGH, ErrorSeverity.CRITICAL) else logging.INFO
+        if not log.isEnabledFor(level):
+            return
         
-        color = severity_colors.get(context.severity, Fore.YELLOW)
-        print(f"{color}[ERROR] {context.error_type.value}")
-        print(f"{color}  Severity: {context.severity.value}")
-        print(f"{color}  Message: {context.message}")
-        if context.retry_count > 0:
-            print(f"{color}  Retry: {context.retry_count}/{context.max_retries}")
+        log.log(level, "[ERROR] %s severity=%s retry=%d/%d: %s",
+                context.error_type.value, context.severity.value,
+                context.retry_count, context.max_retries, context.message)
     
     # Recovery strategies
     
     def _recover_asr_failure(self, context: ErrorContext) -> bool:
         """Recover from ASR failure"""
-        print(f"{Fore.CYAN}Attempting ASR recovery...")
+        log.debug("Attempting ASR recovery")
         # In real implementation, might try:
         # - Adjusting microphone gain
         # - Increasing silence threshold
@@ -148,67 +206,77 @@ class ErrorHandler:
     
     def _recover_low_confidence(self, context: ErrorContext) -> bool:
         """Recover from low confidence transcription"""
-        print(f"{Fore.CYAN}Handling low confidence transcription...")
+        log.debug("Handling low confidence transcription")
         # Strategy: Ask for clarification rather than acting on uncertain input
         return True
     
     def _recover_api_timeout(self, context: ErrorContext) -> bool:
         """Recover from API timeout"""
-        print(f"{Fore.CYAN}Recovering from API timeout...")
-        time.sleep(1)  # Brief delay before retry
+        log.debug("Recovering from API timeout")
         return True
     
     def _recover_rate_limit(self, context: ErrorContext) -> bool:
         """Recover from rate limit"""
-        print(f"{Fore.CYAN}Handling rate limit...")
-        wait_time = min(2 ** context.retry_count, 10)  # Exponential backoff
-        time.sleep(wait_time)
+        log.debug("Handling rate limit")
         return True
     
     def _recover_network_error(self, context: ErrorContext) -> bool:
         """Recover from network error"""
-        print(f"{Fore.CYAN}Recovering from network error...")
-        time.sleep(2)  # Wait before retry
+        log.debug("Recovering from network error")
         return True
     
     def _recover_menu_not_found(self, context: ErrorContext) -> bool:
         """Recover from menu item not found"""
-        print(f"{Fore.CYAN}Handling menu item not found...")
+        log.debug("Handling menu item not found")
         # Strategy: Suggest similar items or ask for clarification
         return True
     
     def _recover_ambiguous_order(self, context: ErrorContext) -> bool:
         """Recover from ambiguous order"""
-        print(f"{Fore.CYAN}Clarifying ambiguous order...")
+        log.debug("Clarifying ambiguous order")
         # Strategy: Ask clarifying questions
         return True
     
     def _recover_empty_order(self, context: ErrorContext) -> bool:
         """Recover from empty order"""
-        print(f"{Fore.CYAN}Handling empty order...")
+        log.debug("Handling empty order")
         return True
     
+    @property
+    def error_counts(self) -> Dict[ErrorType, int]:
+        """Errors seen per type, as {ErrorType: count} (a snapshot; read-only)"""
+        seen = np.nonzero(self._counts)[0]
+        error_types = list(ErrorType)
+        return {error_types[i]: int(self._counts[i]) for i in seen}
+    
+    @property
+    def last_error_time(self) -> Dict[ErrorType, float]:
+        """Last occurrence per type as a time.time() timestamp (a snapshot; read-only)"""
+        seen = np.nonzero(self._counts)[0]
+        error_types = list(ErrorType)
+        # Stored as monotonic stamps; shift them onto the wall clock
+        offset = time.time() - time.monotonic()
+        return {error_types[i]: float(self._last_ts[i] + offset) for i in seen}
+    
     def get_error_stats(self) -> dict:
         """Get error statistics for monitoring"""
+        seen = np.nonzero(self._counts)[0]
+        counts = self._counts[seen].tolist()
+        ages = (time.monotonic() - self._last_ts[seen]).tolist()
+        names = [self._type_values[i] for i in seen]
         return {
-            "total_errors": sum(self.error_counts.values()),
-            "by_type": {
-                error_type.value: count  # Convert ErrorType enum to string
-                for error_type, count in self.error_counts.items()
-            },
-            "last_errors": {
-                error_type.value: time.time() - timestamp
-                for error_type, timestamp in self.last_error_time.items()
-            }
+            "total_errors": int(self._counts.sum()),
+            "by_type": dict(zip(names, counts)),
+            "last_errors": dict(zip(names, ages))
         }
     
     def should_escalate(self, error_type: ErrorType) -> bool:
         """Determine if error should be escalated to human"""
         # Escalate if same error occurs too frequently
-        count = self.error_counts.get(error_type, 0)
+        count = self._counts[self._type_to_idx[error_type]]
         
         if count >= 5:  # 5 of same error type
-            print(f"{Fore.RED}Escalating: Too many {error_type.value} errors")
+            log.warning("Escalating: too many %s errors", error_type.value)
             return True
         
         # Escalate critical errors immediately
@@ -227,38 +295,106 @@ class RetryHandler:
         max_retries: int = 3,
         initial_delay: float = 1.0,
         backoff_factor: float = 2.0,
-        max_delay: float = 10.0
+        max_delay: float = 10.0,
+        total_budget: Optional[float] = None,
+        retryable: Tuple[Type[BaseException], ...] = (Exception,)
     ) -> Any:
         """
-        Retry a function with exponential backoff
+        Retry a function with full-jitter exponential backoff
+        
+        Each wait is drawn uniformly from [0, cap], where the cap grows by
+        backoff_factor per attempt, so callers that failed together don't
+        retry together.
         
         Args:
             func: Function to retry
-            max_retries: Maximum number of retries
-            initial_delay: Initial delay in seconds
-            backoff_factor: Multiplier for each retry
+            max_retries: Maximum number of attempts
+            initial_delay: Backoff cap for the first retry in seconds
+            backoff_factor: Multiplier for the cap on each retry
             max_delay: Maximum delay between retries
+            total_budget: Wall-clock seconds for all attempts and waits (None for no limit)
+            retryable: Exception types worth retrying; anything else fails immediately
             
         Returns:
             Result from function or None if all retries failed
         """
-        delay = initial_delay
+        deadline = time.monotonic() + total_budget if total_budget is not None else None
         
         for attempt in range(max_retries):
             try:
                 return func()
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    print(f"{Fore.RED}All retries failed: {e}")
+            except retryable as e:
+                cap = min(initial_delay * (backoff_factor ** attempt), max_delay)
+                delay = random.uniform(0, cap)
+                
+                out_of_time = deadline is not None and time.monotonic() + delay >= deadline
+                if attempt == max_retries - 1 or out_of_time:
+                    log.warning("All retries failed: %s", e)
                     return None
                 
-                print(f"{Fore.YELLOW}Attempt {attempt + 1} failed, retrying in {delay}s...")
+                log.info("Attempt %d failed, retrying in %.2fs", attempt + 1, delay)
                 time.sleep(delay)
-                delay = min(delay * backoff_factor, max_delay)
+            except Exception as e:
+                log.warning("Not retrying %s: %s", type(e).__name__, e)
+                return None
         
         return None
 
 
+class CircuitBreaker:
+    """Stops calling a failing dependency until a cool-down has passed"""
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Initialize the breaker (closed)
+        
+        Args:
+            failure_threshold: Consecutive failures before the breaker opens
+            reset_timeout: Seconds open before a probe call is let through
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+    
+    def allow(self) -> bool:
+        """
+        Whether a call may go through now
+        
+        Once the cool-down has passed a single probe is allowed; if it
+        never reports back, another is allowed after the next cool-down.
+        """
+        if self.state == CircuitState.CLOSED:
+            return True
+        
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return False
+        
+        self.state = CircuitState.HALF_OPEN
+        self.opened_at = time.monotonic()
+        return True
+    
+    def record_success(self):
+        """Close the breaker after a call succeeds"""
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+    
+    def record_failure(self):
+        """Count a failed call; open the breaker at the threshold or on a failed probe"""
+        self.failures += 1
+        if self.state == CircuitState.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != CircuitState.OPEN:
+                log.warning("Circuit breaker open after %d failures", self.failures)
+            self.state = CircuitState.OPEN
+            self.opened_at = time.monotonic()
+
+
+class _KeepMissing(dict):
+    """format_map context that leaves unknown placeholders as written"""
+    def __missing__(self, key):
+        return "{" + key + "}"
+
 class ConversationRepair:
     """Strategies for repairing broken conversations"""
     
@@ -281,6 +417,17 @@ class ConversationRepair:
                 "How would you like to modify that?"
             ]
         }
+        self.default_clarifications = [
+            "Could you repeat that?",
+            "I didn't quite catch that. What did you say?"
+        ]
+        
+        # Rotate through each type's templates so repeats vary predictably
+        self._template_cycles = {
+            issue_type: cycle(templates)
+            for issue_type, templates in self.clarification_templates.items()
+        }
+        self._default_cycle = cycle(self.default_clarifications)
     
     def generate_clarification(self, issue_type: str, context: dict) -> str:
         """
@@ -293,29 +440,16 @@ class ConversationRepair:
         Returns:
             Clarification question
         """
-        templates = self.clarification_templates.get(issue_type, [
-            "Could you repeat that?",
-            "I didn't quite catch that. What did you say?"
-        ])
-        
-        import random
-        template = random.choice(templates)
+        template = next(self._template_cycles.get(issue_type, self._default_cycle))
         
         # Fill in context variables
-        try:
-            return template.format(**context)
-        except KeyError:
+        if "{" not in template:
             return template
+        return template.format_map(_KeepMissing(context))
     
     def detect_confusion_signals(self, text: str) -> bool:
         """Detect if customer seems confused"""
-        confusion_signals = [
-            "what", "huh", "wait", "uh", "um", "confused",
-            "don't understand", "not sure", "i don't know"
-        ]
-        
-        text_lower = text.lower()
-        return any(signal in text_lower for signal in confusion_signals)
+        return CONFUSION_PATTERN.search(text) is not None
     
     def suggest_recovery_path(self, conversation_state: str) -> str:
         """Suggest how to recover based on conversation state"""
@@ -332,6 +466,7 @@ class ConversationRepair:
 
 # Test the error handler
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG, format="%(message)s")
     print(f"{Fore.MAGENTA}Testing Error Handler\n")
     
     handler = ErrorHandler()
@@ -1,16 +1,56 @@
 import os
-import json
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+import re
+import copy
+import hashlib
+import orjson
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from dataclasses import dataclass, replace
 from enum import Enum
-from openai import OpenAI
-from pydantic import BaseModel, Field
-from dotenv import load_dotenv
+import httpx
 from colorama import Fore, init
 import time
 
+from src.error_handler import CircuitBreaker
+
 init(autoreset=True)
-load_dotenv()
+
+log = logging.getLogger(__name__)
+
+# HTTP/2 for the API clients needs the optional h2 package
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Connection pool settings shared by the sync and async API clients: keep
+# idle connections (and their TLS sessions) around between turns
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=600)
+HTTP_TIMEOUT = httpx.Timeout(10.0, connect=2.0)
+
+# Exact prompt token counts need the optional tiktoken package; without it
+# counts are estimated at ~4 characters per token
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Context window per model, in tokens, for trimming history to fit
+MODEL_CONTEXT_TOKENS = {
+    "gpt-3.5-turbo-1106": 16385,
+    "gpt-3.5-turbo": 16385,
+    "gpt-4o-mini": 128000,
+    "gpt-4o": 128000
+}
+DEFAULT_CONTEXT_TOKENS = 16385
+# Completion tokens reserved for one intent's JSON reply
+MAX_COMPLETION_TOKENS = 300
+# Slack for the per-message framing tokens the chat format adds
+PROMPT_OVERHEAD_TOKENS = 50
 
 class OrderIntent(Enum):
     """Types of customer intents"""
@@ -25,16 +65,10 @@ class OrderIntent(Enum):
     GREETING = "greeting"
     UNCLEAR = "unclear"
 
-class IntentOutput(BaseModel):
-    """Structured output from LLM"""
-    intent: str = Field(description="Primary intent")
-    confidence: float = Field(description="Confidence 0-1")
-    items: List[str] = Field(default_factory=list, description="Menu items")
-    quantities: Dict[str, int] = Field(default_factory=dict, description="Item quantities")
-    modifications: List[Dict[str, str]] = Field(default_factory=list, description="Modifications")
-    response_tone: str = Field(default="friendly", description="Suggested response tone")
+# Intent value -> enum, so unknown labels are a dict miss rather than a ValueError
+_INTENT_LOOKUP = {intent.value: intent for intent in OrderIntent}
 
-@dataclass
+@dataclass(slots=True)
 class IntentResult:
     """Result of intent classification"""
     intent: OrderIntent
@@ -43,21 +77,167 @@ class IntentResult:
     raw_text: str
     suggested_response: Optional[str] = None
 
+# Wrap-ups - the customer is done ordering, whatever was asked
+WRAP_UP_PATTERN = re.compile(
+    r"^\s*(?:(?:no|nope|nah),?\s+)?"
+    r"(that'?s (all|it|everything)|that(?: will|'ll) be (all|it)|nothing else|i'?m (good|done))[\s.!]*$",
+    re.IGNORECASE
+)
+# Bare affirmations - what they agree to depends on the agent's last question
+AFFIRMATION_PATTERN = re.compile(
+    r"^\s*(yes|yeah|yep|yup|sure|correct|perfect|sounds good|that'?s (right|correct))[\s.!]*$",
+    re.IGNORECASE
+)
+# Agent turns asking the customer to confirm the whole order
+ORDER_CONFIRMATION_PROMPT = re.compile(r"\bis that (?:correct|right)\?|\bgot everything right\b", re.IGNORECASE)
+# Bare hellos
+GREETING_PATTERN = re.compile(
+    r"^\s*(hi|hello|hey|hey there|hi there|good (morning|afternoon|evening))[\s.!,]*$",
+    re.IGNORECASE
+)
+# Utterances classified without the LLM: (pattern, intent, response tone)
+FAST_INTENTS = [
+    (WRAP_UP_PATTERN, OrderIntent.CONFIRM_ORDER, 'confirming'),
+    (GREETING_PATTERN, OrderIntent.GREETING, 'friendly')
+]
+
+# "- Crunchy Taco ($1.49)" lines in the menu context
+MENU_ITEM_LINE = re.compile(r"^\s*-\s*([^:(\n]+?)\s*\(\$", re.MULTILINE)
+
+# Count directly before an item name in the local fallback ("two crunchy tacos")
+QUANTITY_BEFORE_ITEM = re.compile(
+    r"(?:^|\s)(\d+|a|an|one|two|three|four|five|six|seven|eight|nine|ten|dozen)\s+$"
+)
+QUANTITY_WORDS = {
+    'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'dozen': 12
+}
+
+# End of every per-turn user message, after the utterance
+USER_MESSAGE_TAIL = '"\n\nAnalyze intent and extract all relevant information.'
+
+def compact_prompt(text: str) -> str:
+    """Strip source indentation and repeated blank lines from a prompt (they cost tokens)"""
+    lines = [line.strip() for line in text.strip().splitlines()]
+    return "\n".join(
+        line for i, line in enumerate(lines)
+        if line or (i > 0 and lines[i - 1])
+    )
+
+def last_agent_turn(conversation_history: Optional[Iterable[str]]) -> Optional[str]:
+    """The newest "Agent: ..." entry in the history, without its prefix"""
+    for entry in reversed(conversation_history or ()):
+        if entry.startswith("Agent: "):
+            return entry[len("Agent: "):]
+    return None
+
+def fast_intent(text: str, conversation_history: Optional[Iterable[str]] = None) -> Optional[IntentResult]:
+    """
+    Classify trivial utterances (yes / that's it / hi / silence) locally
+    
+    A bare "yes" only confirms the order when the agent's last turn asked
+    for that; after anything else ("Would you like to add a Baja Blast?")
+    it goes to the LLM, which sees the question in the history.
+    
+    Args:
+        text: Customer's speech
+        conversation_history: Recent "Agent: ..." / "Customer: ..." entries, oldest first
+    
+    Returns:
+        IntentResult, or None if the LLM is needed
+    """
+    if not text or not text.strip():
+        return IntentResult(
+            intent=OrderIntent.UNCLEAR,
+            confidence=1.0,
+            entities={'items': [], 'quantities': {}, 'modifications': [], 'tone': 'clarifying'},
+            raw_text=text,
+            suggested_response="I'm sorry, could you please repeat that?"
+        )
+    
+    for pattern, intent, tone in FAST_INTENTS:
+        if pattern.match(text):
+            return IntentResult(
+                intent=intent,
+                confidence=1.0,
+                entities={'items': [], 'quantities': {}, 'modifications': [], 'tone': tone},
+                raw_text=text
+            )
+    
+    if AFFIRMATION_PATTERN.match(text):
+        prompt = last_agent_turn(conversation_history)
+        if prompt is not None and ORDER_CONFIRMATION_PROMPT.search(prompt):
+            return IntentResult(
+                intent=OrderIntent.CONFIRM_ORDER,
+                confidence=1.0,
+                entities={'items': [], 'quantities': {}, 'modifications': [], 'tone': 'confirming'},
+                raw_text=text
+            )
+    return None
+
 class TacoBellIntentDetector:
     """GPT-based intent detection for Taco Bell drive-thru"""
     
+    # Replies that don't depend on the extracted entities
+    FIXED_RESPONSES = {
+        OrderIntent.CONFIRM_ORDER: "Perfect! Your total will be displayed on the screen. Please pull forward to the window.",
+        OrderIntent.ASK_MENU: "We have tacos, burritos, crunchwraps, nachos, and drinks. What sounds good today?",
+        OrderIntent.GREETING: "Welcome to Taco Bell! What can I get started for you today?",
+        OrderIntent.CANCEL_ORDER: "No problem, let's start over. What would you like today?",
+        OrderIntent.REPEAT_ORDER: "Let me repeat your order back to you..."
+    }
+    DEFAULT_RESPONSE = "I'm sorry, could you please repeat that?"
+    
     def __init__(self, model: str = "gpt-3.5-turbo-1106"):
         """
         Initialize GPT-based intent detector
         Using gpt-3.5-turbo-1106 for JSON mode support
         """
+        # Imported here: the SDK alone takes ~0.3 s to import, which modules
+        # that only need OrderIntent / fast_intent shouldn't pay
+        from openai import OpenAI, AsyncOpenAI
+        from dotenv import load_dotenv
+        load_dotenv()
+        
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("No OpenAI API key found in .env file")
 
-        self.client = OpenAI(api_key=api_key)
+        # Pooled keep-alive clients, so turns after the first skip the
+        # TCP/TLS handshake (OPENAI_BASE_URL still applies for proxies)
+        self.client = OpenAI(
+            api_key=api_key,
+            http_client=httpx.Client(http2=HTTP2_AVAILABLE, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+        )
+        self.async_client = AsyncOpenAI(
+            api_key=api_key,
+            http_client=httpx.AsyncClient(http2=HTTP2_AVAILABLE, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+        )
         self.model = model
         
+        # Parsed results of recent calls, keyed on (normalized text, the
+        # history that went into the prompt) - repeated phrasings skip the API
+        self.response_cache: OrderedDict = OrderedDict()
+        self.response_cache_size = 1024
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
+        # Micro-batching for adetect_intent_batched: requests arriving within
+        # batch_window seconds of each other share one API call
+        self.batch_max = 8
+        self.batch_window = 0.03
+        self._batch_queue: Optional[asyncio.Queue] = None
+        self._batch_loop = None
+        self._batch_tasks = set()
+        
+        # adetect_intent calls waiting on the API, keyed like response_cache;
+        # an identical request arriving meanwhile awaits the same answer
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        
+        # Per-thread message lists reused by the sync detect_intent (the
+        # request body is serialized before the call returns)
+        self._thread_local = threading.local()
+        
         # Taco Bell menu for context
         self.menu_context = """
         TACO BELL MENU:
@@ -91,57 +271,89 @@ class TacoBellIntentDetector:
         - Combo meals include: Main item + drink + side ($6.99-$8.99)
         """
         
+        # Item names for keyword matching while the API is unavailable,
+        # longest first so "crunchy taco supreme" wins over "crunchy taco"
+        self.menu_item_names = sorted(
+            (name.lower() for name in MENU_ITEM_LINE.findall(self.menu_context)),
+            key=len, reverse=True
+        )
+        
+        # Replies built from the extracted entities, by intent
+        self._response_dispatch = {
+            OrderIntent.ORDER_ITEM: self._respond_order_item,
+            OrderIntent.MODIFY_ITEM: self._respond_modify_item,
+            OrderIntent.REMOVE_ITEM: self._respond_remove_item,
+            OrderIntent.ASK_PRICE: self._respond_ask_price
+        }
+        
+        # Skip the API (and its timeout) after repeated failures
+        self.breaker = CircuitBreaker()
+        
+        # Built once so every request starts with the same bytes - the
+        # provider caches matching prompt prefixes
+        self.system_message = {
+            "role": "system",
+            "content": compact_prompt(f"""You are an AI assistant for a Taco Bell drive-thru. 
+            Analyze customer speech and extract their intent.
+            
+            {self.menu_context}
+            
+            Respond with JSON containing:
+            - intent: one of [order_item, modify_item, remove_item, confirm_order, cancel_order, ask_menu, ask_price, repeat_order, greeting, unclear]
+            - confidence: 0.0 to 1.0
+            - items: list of menu items mentioned
+            - quantities: dict of item:quantity
+            - modifications: list of modifications (e.g., no lettuce, extra cheese)
+            - response_tone: friendly, clarifying, or confirming
+            
+            Be very careful with quantities - if they say "two tacos", quantities should be {{"taco": 2}}
+            Extract specific menu items when possible.
+            """)
+        }
+        
+        # Measured once: what the system prompt costs, what's left of the
+        # context window for history, and a stable id for the prompt
+        self._encoding = self._load_encoding(model)
+        self.system_tokens = self.count_tokens(self.system_message["content"])
+        self.history_token_budget = (
+            MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS)
+            - self.system_tokens - MAX_COMPLETION_TOKENS - PROMPT_OVERHEAD_TOKENS
+        )
+        self.system_prompt_hash = hashlib.blake2b(
+            self.system_message["content"].encode(), digest_size=8
+        ).hexdigest()
+        
         print(f"{Fore.GREEN}✓ Taco Bell Intent Detector initialized")
         print(f"{Fore.CYAN}  Model: {model}")
         print(f"{Fore.CYAN}  API Key: ...{api_key[-4:]}")
     
-    def detect_intent(self, text: str, conversation_history: List[str] = None) -> IntentResult:
+    def detect_intent(
+        self,
+        text: str,
+        conversation_history: List[str] = None,
+        stable_history: List[str] = None,
+        cache_key: Optional[str] = None
+    ) -> IntentResult:
         """
         Detect intent using GPT
         
         Args:
             text: Customer's speech
             conversation_history: Previous conversation context
+            stable_history: Older turns that only ever grow between calls,
+                sent ahead of the per-turn message so they stay in the cached prefix
+            cache_key: Stable per-conversation id; requests sharing it are routed
+                to the same prompt cache so earlier turns aren't recomputed
         """
-        start_time = time.time()
+        result = self._cached_or_fast(text, conversation_history, stable_history)
+        if result:
+            return result
         
-        # Build context from history
-        history_context = ""
-        if conversation_history:
-            history_context = "\n".join([f"Previous: {h}" for h in conversation_history[-3:]])
+        if not self.breaker.allow():
+            return self._local_fallback(text)
         
-        # Create the prompt
-        messages = [
-            {
-                "role": "system",
-                "content": f"""You are an AI assistant for a Taco Bell drive-thru. 
-                Analyze customer speech and extract their intent.
-                
-                {self.menu_context}
-                
-                Respond with JSON containing:
-                - intent: one of [order_item, modify_item, remove_item, confirm_order, cancel_order, ask_menu, ask_price, repeat_order, greeting, unclear]
-                - confidence: 0.0 to 1.0
-                - items: list of menu items mentioned
-                - quantities: dict of item:quantity
-                - modifications: list of modifications (e.g., no lettuce, extra cheese)
-                - response_tone: friendly, clarifying, or confirming
-                
-                Be very careful with quantities - if they say "two tacos", quantities should be {{"taco": 2}}
-                Extract specific menu items when possible.
-                """
-            },
-            {
-                "role": "user",
-                "content": f"""
-                {history_context}
-                
-                Customer just said: "{text}"
-                
-                Analyze intent and extract all relevant information.
-                """
-            }
-        ]
+        start_time = time.perf_counter()
+        messages = self._build_messages(text, conversation_history, stable_history, reuse=True)
         
         try:
             # Call GPT with JSON mode
@@ -150,134 +362,565 @@ class TacoBellIntentDetector:
                 messages=messages,
                 response_format={ "type": "json_object" },
                 temperature=0.1,  # Low for consistency
-                max_tokens=300
+                max_tokens=MAX_COMPLETION_TOKENS,
+                extra_body=self._cache_body(cache_key)
             )
-            
-            # Parse response
-            result_json = json.loads(response.choices[0].message.content)
-            
-            # Map to enum
+        except Exception as e:
+            self.breaker.record_failure()
+            log.warning("GPT error: %s", e)
+            return self._local_fallback(text)
+        
+        return self._finish_response(response, text, conversation_history, stable_history, start_time)
+    
+    async def adetect_intent(
+        self,
+        text: str,
+        conversation_history: List[str] = None,
+        stable_history: List[str] = None,
+        cache_key: Optional[str] = None
+    ) -> IntentResult:
+        """
+        Async version of detect_intent
+        
+        Uses the async client so several conversations can wait on the
+        API at the same time. A request identical to one already in flight
+        shares its answer instead of making a second call.
+        """
+        result = self._cached_or_fast(text, conversation_history, stable_history)
+        if result:
+            return result
+        
+        key = self._response_cache_key(text, conversation_history, stable_history)
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight.get_loop() is loop:
+            # Shielded: this caller timing out mustn't cancel the other one
+            result = await asyncio.shield(inflight)
+            if result is not None:
+                return replace(result, raw_text=text, entities=copy.deepcopy(result.entities))
+        
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._arequest_intent(text, conversation_history, stable_history, cache_key)
+            future.set_result(result)
+            return result
+        finally:
+            # None tells waiters the call was cancelled and to make their own
+            if not future.done():
+                future.set_result(None)
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+    
+    async def _arequest_intent(
+        self,
+        text: str,
+        conversation_history: Optional[List[str]],
+        stable_history: Optional[List[str]],
+        cache_key: Optional[str]
+    ) -> IntentResult:
+        """One async API call for adetect_intent (caches the parsed result)"""
+        if not self.breaker.allow():
+            return self._local_fallback(text)
+        
+        start_time = time.perf_counter()
+        messages = self._build_messages(text, conversation_history, stable_history)
+        
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                response_format={ "type": "json_object" },
+                temperature=0.1,
+                max_tokens=MAX_COMPLETION_TOKENS,
+                extra_body=self._cache_body(cache_key)
+            )
+        except Exception as e:
+            self.breaker.record_failure()
+            log.warning("GPT error: %s", e)
+            return self._local_fallback(text)
+        
+        return self._finish_response(response, text, conversation_history, stable_history, start_time)
+    
+    async def adetect_intent_batched(
+        self,
+        text: str,
+        conversation_history: List[str] = None
+    ) -> IntentResult:
+        """
+        adetect_intent, coalesced with other concurrent callers
+        
+        Requests queued within batch_window of each other (up to batch_max)
+        go out as one completion that classifies every utterance, sharing
+        the system prompt and the HTTP round trip.
+        """
+        result = self._cached_or_fast(text, conversation_history, None)
+        if result:
+            return result
+        
+        loop = asyncio.get_running_loop()
+        if self._batch_loop is not loop:
+            # First use on this event loop - start its worker
+            self._batch_loop = loop
+            self._batch_queue = asyncio.Queue()
+            self._spawn(self._batch_worker(self._batch_queue))
+        
+        future = loop.create_future()
+        await self._batch_queue.put((text, conversation_history, future))
+        return await future
+    
+    def _spawn(self, coro):
+        # Hold a reference so the task isn't garbage collected mid-flight
+        task = asyncio.create_task(coro)
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+    
+    async def _batch_worker(self, queue: asyncio.Queue):
+        """Collect queued requests into batches and dispatch them"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.batch_max:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            self._spawn(self._run_batch(batch))
+    
+    async def _run_batch(self, batch: list):
+        """Classify a batch in one call; fall back to one call each if that fails"""
+        if len(batch) == 1:
+            text, history, future = batch[0]
+            results = [await self.adetect_intent(text, history)]
+        else:
             try:
-                intent_enum = OrderIntent(result_json['intent'])
-            except:
-                intent_enum = OrderIntent.UNCLEAR
-            
-            # Create suggested response based on intent
-            suggested_response = self._generate_response(intent_enum, result_json)
-            
-            # Build result
-            entities = {
-                'items': result_json.get('items', []),
-                'quantities': result_json.get('quantities', {}),
-                'modifications': result_json.get('modifications', []),
-                'tone': result_json.get('response_tone', 'friendly')
+                results = await self._detect_intents_together(batch)
+            except Exception as e:
+                log.warning("Batched intent call failed, retrying individually: %s", e)
+                results = await asyncio.gather(*(
+                    self.adetect_intent(text, history) for text, history, _ in batch
+                ))
+        
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+    
+    async def _detect_intents_together(self, batch: list) -> List[IntentResult]:
+        if not self.breaker.allow():
+            return [self._local_fallback(text) for text, _, _ in batch]
+        
+        start_time = time.perf_counter()
+        
+        blocks = []
+        for i, (text, history, _) in enumerate(batch, 1):
+            lines = [f"Utterance {i}:"]
+            if history:
+                lines.extend(f"Previous: {h}" for h in history[-3:])
+            lines.append(f'Customer just said: "{text}"')
+            blocks.append("\n".join(lines))
+        
+        messages = [
+            self.system_message,
+            {
+                "role": "user",
+                "content": (
+                    "These utterances come from separate customers. Classify each one "
+                    "independently and respond with JSON {\"results\": [...]} holding one "
+                    "object per utterance, in order, with the fields described above.\n\n"
+                    + "\n\n".join(blocks)
+                )
             }
-            
-            result = IntentResult(
-                intent=intent_enum,
-                confidence=result_json.get('confidence', 0.5),
-                entities=entities,
-                raw_text=text,
-                suggested_response=suggested_response
+        ]
+        
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                response_format={ "type": "json_object" },
+                temperature=0.1,
+                max_tokens=MAX_COMPLETION_TOKENS * len(batch)
             )
-            
-            # Log the detection
-            elapsed = time.time() - start_time
-            self._log_detection(result, elapsed)
-            
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        
+        # A malformed reply raises from here without touching the breaker;
+        # _run_batch then retries each utterance on its own
+        objects = orjson.loads(response.choices[0].message.content)["results"]
+        if len(objects) != len(batch):
+            raise ValueError(f"expected {len(batch)} results, got {len(objects)}")
+        
+        results = [
+            self._parse_json(result_json, text, start_time)
+            for (text, _, _), result_json in zip(batch, objects)
+        ]
+        self.breaker.record_success()
+        return [
+            self._cache_result(text, history, None, result)
+            for (text, history, _), result in zip(batch, results)
+        ]
+    
+    @staticmethod
+    def _response_cache_key(
+        text: str,
+        conversation_history: Optional[List[str]],
+        stable_history: Optional[List[str]]
+    ) -> Tuple[str, Tuple[str, ...], Tuple[str, ...]]:
+        # Same slices _build_messages puts in the prompt
+        return (
+            " ".join(text.lower().split()),
+            tuple((conversation_history or [])[-3:]),
+            tuple(stable_history or ())
+        )
+    
+    def _cached_or_fast(
+        self,
+        text: str,
+        conversation_history: Optional[List[str]],
+        stable_history: Optional[List[str]]
+    ) -> Optional[IntentResult]:
+        """Answer without the API if possible (trivial utterance or cache hit)"""
+        result = fast_intent(text, conversation_history)
+        if result:
             return result
-            
+        
+        key = self._response_cache_key(text, conversation_history, stable_history)
+        cached = self.response_cache.get(key)
+        if cached is None:
+            self.cache_misses += 1
+            return None
+        
+        self.cache_hits += 1
+        self.response_cache.move_to_end(key)
+        # Callers edit entities in place; hand out a copy
+        return replace(cached, raw_text=text, entities=copy.deepcopy(cached.entities))
+    
+    def _cache_result(
+        self,
+        text: str,
+        conversation_history: Optional[List[str]],
+        stable_history: Optional[List[str]],
+        result: IntentResult
+    ) -> IntentResult:
+        """Remember a parsed API result and return it"""
+        key = self._response_cache_key(text, conversation_history, stable_history)
+        self.response_cache[key] = replace(result, entities=copy.deepcopy(result.entities))
+        if len(self.response_cache) > self.response_cache_size:
+            self.response_cache.popitem(last=False)
+        return result
+    
+    async def warmup(self):
+        """Open a pooled connection (DNS, TCP, TLS) before the first real request"""
+        try:
+            # Metadata request - no tokens billed
+            await self.async_client.models.retrieve(self.model)
         except Exception as e:
-            print(f"{Fore.RED}GPT Error: {e}")
-            return IntentResult(
-                intent=OrderIntent.UNCLEAR,
-                confidence=0.0,
-                entities={},
-                raw_text=text,
-                suggested_response="I'm sorry, could you please repeat that?"
+            log.warning("LLM warmup failed: %s", e)
+    
+    def close(self):
+        """Close the sync client's connection pool"""
+        self.client.close()
+    
+    async def aclose(self):
+        """Close the async client's connection pool"""
+        await self.async_client.close()
+    
+    def _cache_body(self, cache_key: Optional[str]) -> dict:
+        """
+        Extra request fields for prompt-cache routing (the pinned SDK predates the parameter)
+        
+        Without a conversation id, requests are routed by the system prompt
+        they all share.
+        """
+        return {"prompt_cache_key": cache_key or self.system_prompt_hash}
+    
+    @staticmethod
+    def _load_encoding(model: str):
+        """tiktoken encoding for the model, or None to estimate counts"""
+        if tiktoken is None:
+            return None
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    
+    def count_tokens(self, text: str) -> int:
+        """Prompt tokens in text (estimated if tiktoken is unavailable)"""
+        if self._encoding is None:
+            return len(text) // 4 + 1
+        return len(self._encoding.encode(text))
+    
+    def _fit_history(
+        self,
+        text: str,
+        stable_history: List[str],
+        recent_history: List[str]
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Drop the oldest history lines that don't fit the context window
+        
+        Lines are kept newest first until the budget runs out, so the
+        recent turns survive and the stable block only loses its start.
+        
+        Returns:
+            Tuple of (stable_history, recent_history) that fit
+        """
+        budget = self.history_token_budget - self.count_tokens(text)
+        # A token covers at least one byte, so history that fits in bytes
+        # fits in tokens - the usual case, decided without tokenizing
+        if sum(len(line.encode()) for line in stable_history + recent_history) <= budget:
+            return stable_history, recent_history
+        
+        kept = []
+        for line in reversed(stable_history + recent_history):
+            budget -= self.count_tokens(line)
+            if budget < 0:
+                break
+            kept.append(line)
+        kept.reverse()
+        
+        split = max(0, len(kept) - len(recent_history))
+        return kept[:split], kept[split:]
+    
+    def _build_messages(
+        self,
+        text: str,
+        conversation_history: Optional[List[str]],
+        stable_history: Optional[List[str]] = None,
+        reuse: bool = False
+    ) -> List[dict]:
+        """
+        Build the chat messages for one detection
+        
+        Args:
+            reuse: Fill this thread's preallocated message list instead of
+                building a new one (only safe if the caller is done with it
+                before its next call)
+        """
+        stable_history, recent_history = self._fit_history(
+            text, list(stable_history or []), list(conversation_history[-3:]) if conversation_history else []
+        )
+        
+        # Recent history, then the utterance
+        user_content = "".join((
+            "".join([f"Previous: {h}\n" for h in recent_history]),
+            '\nCustomer just said: "' if recent_history else 'Customer just said: "',
+            text,
+            USER_MESSAGE_TAIL
+        ))
+        stable_content = "Earlier in this conversation:\n" + "\n".join(stable_history) if stable_history else None
+        
+        # Static system prompt first, then the append-only earlier history,
+        # then everything that changes per turn - keeps the cacheable
+        # prompt prefix byte-identical across turns
+        if reuse:
+            return self._fill_message_buffer(stable_content, user_content)
+        
+        messages = [self.system_message]
+        if stable_content:
+            messages.append({"role": "user", "content": stable_content})
+        messages.append({"role": "user", "content": user_content})
+        return messages
+    
+    def _fill_message_buffer(self, stable_content: Optional[str], user_content: str) -> List[dict]:
+        """This thread's reusable message list, with the per-turn slots filled in"""
+        buffers = getattr(self._thread_local, "messages", None)
+        if buffers is None:
+            # One list without the earlier-history message, one with it
+            buffers = self._thread_local.messages = (
+                [self.system_message, {"role": "user", "content": ""}],
+                [self.system_message, {"role": "user", "content": ""}, {"role": "user", "content": ""}]
             )
+        
+        messages = buffers[stable_content is not None]
+        if stable_content is not None:
+            messages[1]["content"] = stable_content
+        messages[-1]["content"] = user_content
+        return messages
+    
+    def _finish_response(
+        self,
+        response,
+        text: str,
+        conversation_history: Optional[List[str]],
+        stable_history: Optional[List[str]],
+        start_time: float
+    ) -> IntentResult:
+        """
+        Parse and cache a completion, then count it as a success
+        
+        A reply that doesn't parse gets the local fallback but isn't
+        counted as a failure: the API is up, it just answered badly.
+        """
+        try:
+            result = self._parse_response(response, text, start_time)
+        except Exception as e:
+            log.warning("Unparseable GPT response: %s", e)
+            return self._local_fallback(text)
+        
+        self.breaker.record_success()
+        return self._cache_result(text, conversation_history, stable_history, result)
+    
+    def _parse_response(self, response, text: str, start_time: float) -> IntentResult:
+        """Turn a JSON-mode completion into an IntentResult"""
+        return self._parse_json(orjson.loads(response.choices[0].message.content), text, start_time)
+    
+    def _parse_json(self, result_json: dict, text: str, start_time: float) -> IntentResult:
+        """Turn one parsed intent object into an IntentResult"""
+        # Map to enum
+        intent = result_json.get('intent')
+        intent_enum = _INTENT_LOOKUP.get(intent, OrderIntent.UNCLEAR) if isinstance(intent, str) else OrderIntent.UNCLEAR
+        
+        # Create suggested response based on intent
+        suggested_response = self._generate_response(intent_enum, result_json)
+        
+        # Build result
+        entities = {
+            'items': result_json.get('items', []),
+            'quantities': result_json.get('quantities', {}),
+            'modifications': self._normalize_modifications(result_json.get('modifications', [])),
+            'tone': result_json.get('response_tone', 'friendly')
+        }
+        
+        result = IntentResult(
+            intent=intent_enum,
+            confidence=result_json.get('confidence', 0.5),
+            entities=entities,
+            raw_text=text,
+            suggested_response=suggested_response
+        )
+        
+        # Log the detection
+        elapsed = time.perf_counter() - start_time
+        self._log_detection(result, elapsed)
+        
+        return result
+    
+    def _local_fallback(self, text: str) -> IntentResult:
+        """
+        Degraded result used while the API is failing
+        
+        Menu item names in the text are taken as an order so the customer
+        can keep ordering; anything else gets the plain fallback.
+        """
+        lowered = text.lower()
+        items = []
+        quantities = {}
+        for name in self.menu_item_names:
+            index = lowered.find(name)
+            if index < 0:
+                continue
+            items.append(name)
+            count = QUANTITY_BEFORE_ITEM.search(lowered, 0, index)
+            if count:
+                word = count.group(1)
+                quantities[name] = int(word) if word.isdigit() else QUANTITY_WORDS[word]
+            lowered = lowered.replace(name, "|")
+        if not items:
+            return self._fallback_result(text)
+        
+        data = {'items': items, 'quantities': quantities}
+        return IntentResult(
+            intent=OrderIntent.ORDER_ITEM,
+            confidence=0.5,
+            # 'degraded' keeps callers from caching this guess
+            entities={'items': items, 'quantities': quantities, 'modifications': [], 'tone': 'confirming', 'degraded': True},
+            raw_text=text,
+            suggested_response=self._generate_response(OrderIntent.ORDER_ITEM, data)
+        )
+    
+    def _fallback_result(self, text: str) -> IntentResult:
+        """Result used when the API call fails"""
+        return IntentResult(
+            intent=OrderIntent.UNCLEAR,
+            confidence=0.0,
+            entities={},
+            raw_text=text,
+            suggested_response="I'm sorry, could you please repeat that?"
+        )
+    
+    @staticmethod
+    def _normalize_modifications(mods: list) -> List[str]:
+        """Flatten modifications to plain strings (the LLM sometimes returns dicts)"""
+        normalized = []
+        for mod in mods:
+            if isinstance(mod, dict):
+                mod = f"{mod.get('type', '')} {mod.get('item', '')}".strip()
+            normalized.append(str(mod))
+        return normalized
     
     def _generate_response(self, intent: OrderIntent, data: dict) -> str:
         """Generate appropriate response based on intent"""
-
-        if intent == OrderIntent.ORDER_ITEM:
-            items = data.get('items', [])
-            quantities = data.get('quantities', {})
-
-            if items:
-                # Build order confirmation
-                order_parts = []
-                for item in items:
-                    qty = quantities.get(item, 1)
-                    if qty > 1:
-                        order_parts.append(f"{qty} {item}s")
-                    else:
-                        order_parts.append(f"a {item}")
-
-                return f"Alright, I've got {', '.join(order_parts)}. Would you like anything else?"
+        builder = self._response_dispatch.get(intent)
+        if builder:
+            return builder(data)
+        return self.FIXED_RESPONSES.get(intent, self.DEFAULT_RESPONSE)
+    
+    @staticmethod
+    def _respond_order_item(data: dict) -> str:
+        items = data.get('items', [])
+        if not items:
+            return "Sure! What would you like to order today?"
+        
+        # Build order confirmation
+        quantities = data.get('quantities', {})
+        order_parts = ", ".join([
+            f"{quantities[item]} {item}s" if quantities.get(item, 1) > 1 else f"a {item}"
+            for item in items
+        ])
+        return f"Alright, I've got {order_parts}. Would you like anything else?"
+    
+    @staticmethod
+    def _respond_modify_item(data: dict) -> str:
+        mods = data.get('modifications', [])
+        if mods and isinstance(mods, list):
+            if isinstance(mods[0], dict):
+                mod_text = mods[0].get('description', 'that modification')
             else:
-                return "Sure! What would you like to order today?"
-
-        elif intent == OrderIntent.MODIFY_ITEM:
-            mods = data.get('modifications', [])
-            if mods and isinstance(mods, list) and len(mods) > 0:
-                if isinstance(mods[0], dict):
-                    mod_text = mods[0].get('description', 'that modification')
-                else:
-                    mod_text = str(mods[0])
-                return f"Got it, {mod_text}. Anything else?"
-            return "No problem, I'll make that change. Anything else?"
-
-        elif intent == OrderIntent.REMOVE_ITEM:
-            items = data.get('items', [])
-            quantities = data.get('quantities', {})
-            if items:
-                item_name = items[0]
-                qty = quantities.get(item_name, 1)
-                if qty > 0:
-                    return f"Removing {qty} {item_name}{'s' if qty > 1 else ''} from your order."
-                else:
-                    return f"Removing {item_name} from your order."
+                mod_text = str(mods[0])
+            return f"Got it, {mod_text}. Anything else?"
+        return "No problem, I'll make that change. Anything else?"
+    
+    @staticmethod
+    def _respond_remove_item(data: dict) -> str:
+        items = data.get('items', [])
+        if not items:
             return "What would you like to remove?"
-
-        elif intent == OrderIntent.CONFIRM_ORDER:
-            return "Perfect! Your total will be displayed on the screen. Please pull forward to the window."
-
-        elif intent == OrderIntent.ASK_MENU:
-            return "We have tacos, burritos, crunchwraps, nachos, and drinks. What sounds good today?"
-
-        elif intent == OrderIntent.ASK_PRICE:
-            items = data.get('items', [])
-            if items:
-                return f"Let me check the price for {items[0]} for you."
-            return "Which item would you like to know the price for?"
-
-        elif intent == OrderIntent.GREETING:
-            return "Welcome to Taco Bell! What can I get started for you today?"
-
-        elif intent == OrderIntent.CANCEL_ORDER:
-            return "No problem, let's start over. What would you like today?"
-
-        elif intent == OrderIntent.REPEAT_ORDER:
-            return "Let me repeat your order back to you..."
-
-        else:
-            return "I'm sorry, could you please repeat that?"
+        
+        item_name = items[0]
+        qty = data.get('quantities', {}).get(item_name, 1)
+        if qty > 0:
+            return f"Removing {qty} {item_name}{'s' if qty > 1 else ''} from your order."
+        return f"Removing {item_name} from your order."
+    
+    @staticmethod
+    def _respond_ask_price(data: dict) -> str:
+        items = data.get('items', [])
+        if items:
+            return f"Let me check the price for {items[0]} for you."
+        return "Which item would you like to know the price for?"
     
     def _log_detection(self, result: IntentResult, elapsed_time: float):
         """Log detection results"""
-        color = Fore.GREEN if result.confidence > 0.7 else Fore.YELLOW
-        
-        print(f"\n{Fore.CYAN}═══ Intent Detection ═══")
-        print(f"Input: '{result.raw_text}'")
-        print(f"{color}Intent: {result.intent.value} ({result.confidence:.1%} confidence)")
+        if not log.isEnabledFor(logging.DEBUG):
+            return
         
+        lines = [
+            "═══ Intent Detection ═══",
+            f"Input: '{result.raw_text}'",
+            f"Intent: {result.intent.value} ({result.confidence:.1%} confidence)"
+        ]
         if result.entities.get('items'):
-            print(f"{Fore.MAGENTA}Items: {result.entities['items']}")
+            lines.append(f"Items: {result.entities['items']}")
         if result.entities.get('quantities'):
-            print(f"{Fore.MAGENTA}Quantities: {result.entities['quantities']}")
+            lines.append(f"Quantities: {result.entities['quantities']}")
         if result.entities.get('modifications'):
-            print(f"{Fore.MAGENTA}Mods: {result.entities['modifications']}")
+            lines.append(f"Mods: {result.entities['modifications']}")
+        lines.append(f"Response: '{result.suggested_response}'")
+        lines.append(f"Time: {elapsed_time:.2f}s")
         
-        print(f"{Fore.BLUE}Response: '{result.suggested_response}'")
-        print(f"{Fore.WHITE}Time: {elapsed_time:.2f}s")
\ No newline at end of file
+        log.debug("\n".join(lines))
\ No newline at end of file
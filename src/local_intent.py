@@ -0,0 +1,148 @@
+"""
+Local Intent Classifier
+Nearest-neighbour match of an utterance embedding against example phrasings,
+so intents that need no entity extraction ("what's on the menu", "read my
+order back") are answered without the LLM
+"""
+
+import numpy as np
+from typing import Dict, List, Optional
+
+from src.intent_detector_llm import OrderIntent, IntentResult
+
+# Example phrasings per intent. ORDER_ITEM / MODIFY_ITEM / REMOVE_ITEM /
+# ASK_PRICE examples are here only so utterances close to them are handed
+# to the LLM, which extracts the items
+EXAMPLE_PHRASES: Dict[OrderIntent, List[str]] = {
+    OrderIntent.CONFIRM_ORDER: [
+        "that's all for me",
+        "that's everything thanks",
+        "no that will be all",
+        "i'm done ordering",
+        "yes that order is correct",
+        "that looks right to me"
+    ],
+    OrderIntent.ASK_MENU: [
+        "what's on the menu",
+        "what do you have",
+        "what do you recommend",
+        "what kind of burritos do you have",
+        "can you tell me about your specials",
+        "do you have any vegetarian options"
+    ],
+    OrderIntent.GREETING: [
+        "hi there how are you",
+        "hello good evening",
+        "hey how's it going"
+    ],
+    OrderIntent.REPEAT_ORDER: [
+        "can you repeat my order",
+        "read my order back to me",
+        "what's in my order so far",
+        "what did i order"
+    ],
+    OrderIntent.CANCEL_ORDER: [
+        "cancel my order",
+        "never mind forget the whole thing",
+        "i want to start over"
+    ],
+    OrderIntent.ORDER_ITEM: [
+        "can i get two crunchy tacos",
+        "i want a bean burrito",
+        "give me a large baja blast and nacho fries",
+        "i'll have a chalupa supreme"
+    ],
+    OrderIntent.MODIFY_ITEM: [
+        "no lettuce on the tacos",
+        "add extra cheese to the burrito",
+        "make that a large drink"
+    ],
+    OrderIntent.REMOVE_ITEM: [
+        "take off the nacho fries",
+        "remove the burrito from my order"
+    ],
+    OrderIntent.ASK_PRICE: [
+        "how much is a crunchy taco",
+        "what does the cravings box cost"
+    ]
+}
+
+# Intents that are safe to answer without entities
+LOCAL_INTENTS = frozenset({
+    OrderIntent.CONFIRM_ORDER,
+    OrderIntent.ASK_MENU,
+    OrderIntent.GREETING,
+    OrderIntent.REPEAT_ORDER,
+    OrderIntent.CANCEL_ORDER
+})
+
+TONES = {
+    OrderIntent.CONFIRM_ORDER: 'confirming',
+    OrderIntent.REPEAT_ORDER: 'confirming'
+}
+
+
+class LocalIntentClassifier:
+    """1-nearest-neighbour intent classifier over sentence embeddings"""
+
+    def __init__(self, encoder, threshold: float = 0.8, margin: float = 0.05):
+        """
+        Embed the example phrases
+
+        Args:
+            encoder: SentenceTransformer shared with the menu RAG
+            threshold: Minimum cosine similarity to the best example
+            margin: How far the best intent must beat the runner-up
+        """
+        self.threshold = threshold
+        self.margin = margin
+
+        phrases = []
+        self.labels: List[OrderIntent] = []
+        for intent, examples in EXAMPLE_PHRASES.items():
+            phrases.extend(examples)
+            self.labels.extend([intent] * len(examples))
+
+        # Example row -> position in self.intents, for per-intent maxima
+        self.intents: List[OrderIntent] = list(EXAMPLE_PHRASES)
+        self._label_ids = np.array([self.intents.index(label) for label in self.labels])
+
+        embeddings = encoder.encode(phrases, batch_size=len(phrases), convert_to_numpy=True)
+        self.examples = self._normalize(embeddings)
+        self.hits = 0
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float32))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def classify(self, text: str, embedding: np.ndarray) -> Optional[IntentResult]:
+        """
+        Classify an utterance from its embedding
+
+        Returns:
+            IntentResult for a confident entity-free intent, or None to use the LLM
+        """
+        scores = self.examples @ self._normalize(embedding)[0]
+
+        # Best score per intent, then the top two intents (partial select)
+        best = np.full(len(self.intents), -1.0, dtype=np.float32)
+        np.maximum.at(best, self._label_ids, scores)
+
+        top = np.argpartition(-best, 1)[:2]
+        if best[top[1]] > best[top[0]]:
+            top = top[::-1]
+        intent, score = self.intents[top[0]], float(best[top[0]])
+        runner_up = float(best[top[1]])
+
+        if intent not in LOCAL_INTENTS or score < self.threshold or score - runner_up < self.margin:
+            return None
+
+        self.hits += 1
+        return IntentResult(
+            intent=intent,
+            confidence=score,
+            entities={'items': [], 'quantities': {}, 'modifications': [], 'tone': TONES.get(intent, 'friendly')},
+            raw_text=text
+        )
@@ -1,15 +1,63 @@
 import json
+import logging
+import re
+import hashlib
 import numpy as np
-from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass
+from typing import Any, FrozenSet, List, Dict, Tuple, Optional
+from dataclasses import dataclass, field
 import os
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 from colorama import Fore, init
-import pickle
 from pathlib import Path
+from collections import OrderedDict
+import threading
+
+# FAISS is optional - fall back to brute-force cosine search without it
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+# Model2Vec is optional - static token embeddings, no transformer pass per query
+try:
+    from model2vec import StaticModel
+except ImportError:
+    StaticModel = None
 
 init(autoreset=True)
+log = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+# Model2Vec distillation of a MiniLM-class encoder. Opt-in: the similarity
+# thresholds downstream (menu search, LocalIntentClassifier, SemanticCache)
+# are calibrated on MiniLM cosines, and static embeddings score differently
+STATIC_EMBEDDING_MODEL = 'minishlab/potion-base-8M'
+
+# Bumped whenever the cached embedding layout changes
+EMBEDDING_CACHE_VERSION = 4
+
+# Special queries (plain substrings, like "hot" in "hot sauce"); one scan
+# finds them all, and the first kind in SPECIAL_QUERY_PRIORITY wins
+SPECIAL_QUERY_PATTERN = re.compile(
+    r"(?P<cheapest>cheapest|lowest price)|(?P<expensive>most expensive|premium)|"
+    r"(?P<vegetarian>vegetarian|veggie|no meat)|(?P<spicy>spicy|hot)|(?P<crunchy>crunchy|crispy)"
+)
+SPECIAL_QUERY_PRIORITY = ('cheapest', 'expensive', 'vegetarian', 'spicy', 'crunchy')
+# Special queries whose answer is cut to top_k (price rankings always list three)
+TOP_K_SPECIAL_QUERIES = frozenset({'vegetarian', 'crunchy'})
+
+class StaticEncoder:
+    """SentenceTransformer-style wrapper around a Model2Vec StaticModel"""
+    
+    def __init__(self, model):
+        self.model = model
+    
+    def encode(self, sentences, batch_size: int = 1024, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        """Embed sentences as a float32 matrix (extra SentenceTransformer options are ignored)"""
+        return np.asarray(self.model.encode(sentences, batch_size=batch_size), dtype=np.float32)
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.dim
 
 @dataclass
 class MenuItem:
@@ -22,8 +70,20 @@ class MenuItem:
     customizations: List[str]
     aliases: List[str]
     tags: List[str]  # Added tags for better search
+    
+    # Lowercased / set forms for match explanations, built once per item
+    tags_set: FrozenSet[str] = field(init=False, repr=False, compare=False)
+    name_lower: str = field(init=False, repr=False, compare=False)
+    description_lower: str = field(init=False, repr=False, compare=False)
+    aliases_lower: str = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        self.tags_set = frozenset(self.tags)
+        self.name_lower = self.name.lower()
+        self.description_lower = self.description.lower()
+        self.aliases_lower = ' '.join(self.aliases).lower()
 
-@dataclass
+@dataclass(frozen=True)
 class SearchResult:
     """Menu search result"""
     item: MenuItem
@@ -33,17 +93,43 @@ class SearchResult:
 class TacoBellMenuRAG:
     """Enhanced RAG system for Taco Bell menu knowledge"""
     
-    def __init__(self, embeddings_cache: str = "data/menu_embeddings_v2.pkl"):
-        """Initialize the RAG system with menu data and embeddings"""
+    def __init__(self, embeddings_cache: str = "data/menu_embeddings", static_embeddings: bool = False):
+        """
+        Initialize the RAG system with menu data and embeddings
+        
+        Args:
+            embeddings_cache: Path prefix for the embedding/index cache files
+            static_embeddings: Use Model2Vec instead of MiniLM (faster, but
+                the score thresholds are tuned for MiniLM)
+        """
         print(f"{Fore.YELLOW}Initializing Enhanced Menu RAG System...")
         
         # Initialize sentence transformer for embeddings
         print(f"{Fore.CYAN}Loading embedding model...")
-        self.encoder = SentenceTransformer('all-MiniLM-L6-v2')
+        self.encoder, self.encoder_backend = self._load_encoder(static_embeddings)
+        if self.encoder_backend != 'torch':
+            # Other backends embed differently - don't mix them with a PyTorch cache
+            cache_path = Path(embeddings_cache)
+            embeddings_cache = str(cache_path.with_name(f"{cache_path.stem}_{self.encoder_backend}{cache_path.suffix}"))
+        
+        # Query phrase -> embedding; drive-thru vocabulary is small, so most
+        # searches skip the encoder entirely
+        self._query_embeddings: OrderedDict = OrderedDict()
+        self.query_embedding_cache_size = 1024
+        # Searches may run in a worker thread (speculative prefetch)
+        self._query_lock = threading.Lock()
+        
+        # Recommendations depend only on the multiset of names in the order
+        self._recommendation_cache: OrderedDict = OrderedDict()
+        self.recommendation_cache_size = 256
         
         self.embeddings_cache = embeddings_cache
         self.menu_items = self._load_menu_data()
         self.item_embeddings = self._load_or_create_embeddings()
+        self.vector_index = self._build_vector_index()
+        # Without FAISS, normalize the (fixed) menu matrix once so each
+        # search is a single matmul
+        self.unit_embeddings = self._unit_rows(self.item_embeddings) if self.vector_index is None else None
         
         # Create lookup indices
         self._build_indices()
@@ -53,6 +139,25 @@ class TacoBellMenuRAG:
         
         print(f"{Fore.GREEN}✓ Enhanced Menu RAG initialized with {len(self.menu_items)} items")
     
+    @staticmethod
+    def _load_encoder(static_embeddings: bool = False) -> Tuple[Any, str]:
+        """
+        Load the MiniLM sentence-transformers encoder (or Model2Vec if asked)
+        
+        Args:
+            static_embeddings: Try Model2Vec static embeddings first
+        
+        Returns:
+            Tuple of (encoder, backend name)
+        """
+        if static_embeddings and StaticModel is not None:
+            try:
+                return StaticEncoder(StaticModel.from_pretrained(STATIC_EMBEDDING_MODEL)), 'model2vec'
+            except Exception as e:
+                log.warning("Static embedding model unavailable (%s)", type(e).__name__)
+        
+        return SentenceTransformer(EMBEDDING_MODEL), 'torch'
+    
     def _load_menu_data(self) -> List[MenuItem]:
         """Load comprehensive Taco Bell menu data with better tags"""
         menu_items = [
@@ -230,24 +335,20 @@ class TacoBellMenuRAG:
         return menu_items
     
     def _load_or_create_embeddings(self) -> np.ndarray:
-        """Load cached embeddings or create new ones"""
+        """
+        Load cached embeddings or create new ones
+        
+        Embeddings are cached as fp16 .npy and memory-mapped, so startup
+        doesn't deserialize anything and the OS page cache keeps the file
+        warm across runs. A JSON sidecar records, for the .npy and the
+        FAISS index alike, the cache version, encoder and a hash of the menu
+        text each was built from, so any menu or model change rebuilds both.
+        """
         cache_path = Path(self.embeddings_cache)
+        npy_path = cache_path.with_suffix('.fp16.npy')
+        meta_path = cache_path.with_suffix('.json')
         
-        # Try to load cached embeddings
-        if cache_path.exists():
-            try:
-                print(f"{Fore.CYAN}Loading cached embeddings...")
-                with open(cache_path, 'rb') as f:
-                    cached_data = pickle.load(f)
-                    if len(cached_data['embeddings']) == len(self.menu_items):
-                        return cached_data['embeddings']
-            except:
-                print(f"{Fore.YELLOW}Cache corrupted, regenerating...")
-        
-        # Create embeddings for each menu item
-        print(f"{Fore.CYAN}Creating embeddings for menu items...")
         texts_to_encode = []
-        
         for item in self.menu_items:
             # Enhanced text representation including tags
             combined_text = (
@@ -257,15 +358,96 @@ class TacoBellMenuRAG:
             )
             texts_to_encode.append(combined_text)
         
+        meta = {
+            'version': EMBEDDING_CACHE_VERSION,
+            'encoder': self.encoder_backend,
+            'dim': self.encoder.get_sentence_embedding_dimension(),
+            'n': len(texts_to_encode),
+            'menu_hash': hashlib.blake2b("\n".join(texts_to_encode).encode(), digest_size=8).hexdigest()
+        }
+        
+        # Sidecar maps each cached artefact ('embeddings', 'faiss') to the
+        # meta it was built for; _build_vector_index checks the same meta
+        self._meta_path = meta_path
+        self._cache_meta = meta
+        self._sidecar: Dict[str, dict] = {}
+        
+        # Fast path: memory-mapped fp16 cache
+        if npy_path.exists() and meta_path.exists():
+            try:
+                sidecar = json.loads(meta_path.read_text())
+                if sidecar.get('embeddings') == meta:
+                    embeddings = np.load(npy_path, mmap_mode='r')
+                    if len(embeddings) == len(self.menu_items):
+                        print(f"{Fore.CYAN}Loaded cached embeddings (mmap)")
+                        self._sidecar = sidecar
+                        return embeddings
+            except (OSError, ValueError):
+                print(f"{Fore.YELLOW}Embedding cache unreadable, regenerating...")
+        
         # Encode all at once
-        embeddings = self.encoder.encode(texts_to_encode)
+        print(f"{Fore.CYAN}Creating embeddings for menu items...")
+        embeddings = self.encoder.encode(texts_to_encode, batch_size=len(texts_to_encode))
+        
+        return self._save_fp16_cache(embeddings, npy_path, meta_path, meta)
+    
+    def _save_fp16_cache(self, embeddings: np.ndarray, npy_path: Path, meta_path: Path, meta: dict) -> np.ndarray:
+        """Write embeddings as fp16 .npy (plus sidecar) and return them memory-mapped"""
+        try:
+            npy_path.parent.mkdir(parents=True, exist_ok=True)
+            meta_path.unlink(missing_ok=True)
+            np.save(npy_path, np.asarray(embeddings, dtype=np.float16))
+            # Sidecar last: a cache is only trusted once both files are written.
+            # Any FAISS index on disk was built from the old embeddings
+            self._sidecar = {'embeddings': meta}
+            meta_path.write_text(json.dumps(self._sidecar))
+            return np.load(npy_path, mmap_mode='r')
+        except OSError as e:
+            log.warning("Could not write embedding cache: %s", e)
+            return embeddings
+    
+    def _build_vector_index(self):
+        """
+        Build an int8 scalar-quantized FAISS index over the item embeddings
         
-        # Cache the embeddings
-        cache_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(cache_path, 'wb') as f:
-            pickle.dump({'embeddings': embeddings, 'version': 2}, f)
+        Vectors are L2-normalized so inner product == cosine similarity.
+        The trained index is written next to the embedding cache and read
+        back on later runs, but only if the sidecar says it was built from
+        the current menu. Returns None when FAISS isn't installed.
+        """
+        if faiss is None:
+            return None
         
-        return embeddings
+        index_path = Path(self.embeddings_cache).with_suffix('.faiss')
+        if index_path.exists() and self._sidecar.get('faiss') == self._cache_meta:
+            try:
+                index = faiss.read_index(str(index_path))
+                if index.ntotal == len(self.menu_items):
+                    return index
+            except RuntimeError:
+                log.warning("FAISS index unreadable, rebuilding")
+        
+        # Up-cast from the fp16 cache for training
+        vectors = np.ascontiguousarray(self.item_embeddings, dtype=np.float32)
+        faiss.normalize_L2(vectors)
+        
+        index = faiss.IndexScalarQuantizer(
+            vectors.shape[1],
+            faiss.ScalarQuantizer.QT_8bit,
+            faiss.METRIC_INNER_PRODUCT
+        )
+        index.train(vectors)
+        index.add(vectors)
+        
+        try:
+            faiss.write_index(index, str(index_path))
+            # Stamp the sidecar last, once the index file is complete
+            self._sidecar = {**self._sidecar, 'faiss': self._cache_meta}
+            self._meta_path.write_text(json.dumps(self._sidecar))
+        except (RuntimeError, OSError) as e:
+            log.warning("Could not write FAISS index: %s", e)
+        
+        return index
     
     def _build_indices(self):
         """Build search indices for fast lookup"""
@@ -292,6 +474,11 @@ class TacoBellMenuRAG:
                 if tag not in self.tag_to_items:
                     self.tag_to_items[tag] = []
                 self.tag_to_items[tag].append(item)
+        
+        # Every tag as one whole-word alternation, longest first so
+        # multi-word tags win over their parts
+        tags = sorted(self.tag_to_items, key=len, reverse=True)
+        self._tag_pattern = re.compile(r"\b(" + "|".join(map(re.escape, tags)) + r")\b") if tags else None
     
     def _build_special_indices(self):
         """Build indices for special queries"""
@@ -305,38 +492,69 @@ class TacoBellMenuRAG:
         # Group by texture/style
         self.crunchy_items = [item for item in self.menu_items if 'crunchy' in item.tags]
         self.spicy_items = [item for item in self.menu_items if 'spicy' in item.tags or 'fiery' in ' '.join(item.customizations)]
+        
+        # Answers to special queries never change, so build them once
+        # (SearchResult is frozen; callers get their own list)
+        dlt = self.name_to_item.get('doritos locos tacos')
+        self._special_results = {
+            'cheapest': [SearchResult(item, 1.0 - i*0.1, "Price ranking") 
+                         for i, item in enumerate(self.items_by_price[:3])],
+            'expensive': [SearchResult(item, 1.0 - i*0.1, "Price ranking") 
+                          for i, item in enumerate(self.items_by_price[-3:][::-1])],
+            'vegetarian': [SearchResult(item, 0.9, "Vegetarian option") 
+                           for item in self.vegetarian_items],
+            # Doritos Locos with the Fiery option is the spicy answer
+            'spicy': [SearchResult(dlt, 0.9, "Has spicy option (Fiery)")] if dlt else [],
+            'crunchy': [SearchResult(item, 0.9, "Crunchy item") 
+                        for item in self.crunchy_items]
+        }
     
     def search_menu(self, query: str, top_k: int = 3) -> List[SearchResult]:
         """
         Enhanced search with special query handling
         """
+        results = self._keyword_search(query, top_k)
+        if results is not None:
+            return results
+        
+        # Fall back to semantic search
+        return self._semantic_search([query], top_k)[0]
+    
+    def search_menu_batch(self, queries: List[str], top_k: int = 1) -> List[List[SearchResult]]:
+        """
+        Search for several queries at once
+        
+        Keyword matches are resolved per query; everything left over is
+        embedded and searched in a single batch.
+        
+        Returns:
+            One result list per query, in order
+        """
+        results = [self._keyword_search(query, top_k) for query in queries]
+        
+        pending = [i for i, result in enumerate(results) if result is None]
+        if pending:
+            semantic = self._semantic_search([queries[i] for i in pending], top_k)
+            for i, result in zip(pending, semantic):
+                results[i] = result
+        
+        return results
+    
+    def _keyword_search(self, query: str, top_k: int) -> Optional[List[SearchResult]]:
+        """
+        Special-query, exact, alias and tag matching
+        
+        Returns:
+            Results, or None if the query needs semantic search
+        """
         query_lower = query.lower()
         
         # Handle special queries first
-        if 'cheapest' in query_lower or 'lowest price' in query_lower:
-            cheapest = self.items_by_price[:3]
-            return [SearchResult(item, 1.0 - i*0.1, "Price ranking") 
-                   for i, item in enumerate(cheapest)]
-        
-        if 'most expensive' in query_lower or 'premium' in query_lower:
-            expensive = self.items_by_price[-3:][::-1]
-            return [SearchResult(item, 1.0 - i*0.1, "Price ranking") 
-                   for i, item in enumerate(expensive)]
-        
-        if 'vegetarian' in query_lower or 'veggie' in query_lower or 'no meat' in query_lower:
-            return [SearchResult(item, 0.9, "Vegetarian option") 
-                   for item in self.vegetarian_items[:top_k]]
-        
-        if 'spicy' in query_lower or 'hot' in query_lower:
-            # Return Doritos Locos with Fiery option as top result
-            dlt = self.name_to_item.get('doritos locos tacos')
-            if dlt:
-                return [SearchResult(dlt, 0.9, "Has spicy option (Fiery)")]
-            return []
-        
-        if 'crunchy' in query_lower or 'crispy' in query_lower:
-            return [SearchResult(item, 0.9, "Crunchy item") 
-                   for item in self.crunchy_items[:top_k]]
+        kinds = {match.lastgroup for match in SPECIAL_QUERY_PATTERN.finditer(query_lower)}
+        if kinds:
+            kind = next(kind for kind in SPECIAL_QUERY_PRIORITY if kind in kinds)
+            results = self._special_results[kind]
+            return results[:top_k] if kind in TOP_K_SPECIAL_QUERIES else list(results)
         
         # Check exact matches
         if query_lower in self.name_to_item:
@@ -347,47 +565,110 @@ class TacoBellMenuRAG:
             item = self.alias_to_item[query_lower]
             return [SearchResult(item, 0.95, "Alias match")]
         
-        # Check tag matches
+        # Check tag matches (in query order, each item once)
         matching_items = []
-        for word in query_lower.split():
-            if word in self.tag_to_items:
-                for item in self.tag_to_items[word]:
-                    if item not in matching_items:
+        if self._tag_pattern is not None:
+            seen = set()
+            for tag in self._tag_pattern.findall(query_lower):
+                for item in self.tag_to_items[tag]:
+                    if id(item) not in seen:
+                        seen.add(id(item))
                         matching_items.append(item)
         
         if matching_items:
             return [SearchResult(item, 0.85, "Tag match") 
                    for item in matching_items[:top_k]]
         
-        # Fall back to semantic search
-        query_embedding = self.encoder.encode([query])
-        similarities = cosine_similarity(query_embedding, self.item_embeddings)[0]
-        
-        # Get top k results
-        top_indices = np.argsort(similarities)[-top_k:][::-1]
+        return None
+    
+    def _semantic_search(self, queries: List[str], top_k: int) -> List[List[SearchResult]]:
+        """Embed all queries in one batch and return the top_k matches for each"""
+        if top_k <= 0:
+            # FAISS asserts k > 0
+            return [[] for _ in queries]
+        
+        query_embeddings = self._embed_queries(queries)
+        
+        if self.vector_index is not None:
+            query_vectors = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+            faiss.normalize_L2(query_vectors)
+            scores, indices = self.vector_index.search(query_vectors, top_k)
+            candidate_rows = [zip(row_indices, row_scores) for row_indices, row_scores in zip(indices, scores)]
+        else:
+            # Both sides are already unit length: the matmul is the cosine
+            similarities = query_embeddings @ self.unit_embeddings.T
+            
+            # Get top k results per query (partial select, then sort just those k)
+            k = min(top_k, similarities.shape[1])
+            top_indices = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+            order = np.argsort(-np.take_along_axis(similarities, top_indices, axis=1), axis=1)
+            top_indices = np.take_along_axis(top_indices, order, axis=1)
+            candidate_rows = [
+                ((idx, row[idx]) for idx in row_top)
+                for row, row_top in zip(similarities, top_indices)
+            ]
+        
+        all_results = []
+        for query, candidates in zip(queries, candidate_rows):
+            results = []
+            for idx, similarity in candidates:
+                if idx >= 0 and similarity > 0.3:
+                    item = self.menu_items[idx]
+                    score = float(similarity)
+                    reason = self._get_match_reason(query, item, score)
+                    results.append(SearchResult(item, score, reason))
+            all_results.append(results)
+        
+        return all_results
+    
+    @staticmethod
+    def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+        """L2-normalize each row as float32"""
+        matrix = np.asarray(matrix, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+    
+    def _embed_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Embed queries, encoding only phrases not seen before (in one batch)
         
-        results = []
-        for idx in top_indices:
-            if similarities[idx] > 0.3:
-                item = self.menu_items[idx]
-                score = float(similarities[idx])
-                reason = self._get_match_reason(query, item, score)
-                results.append(SearchResult(item, score, reason))
+        Embeddings are L2-normalized float32 when cached, so repeat queries
+        skip the normalization as well as the encoder.
+        """
+        # The model's tokenizer is uncased, so case/spacing variants share an entry
+        keys = [" ".join(query.lower().split()) for query in queries]
         
-        return results
+        with self._query_lock:
+            missing = list(dict.fromkeys(key for key in keys if key not in self._query_embeddings))
+            
+            if missing:
+                encoded = self._unit_rows(
+                    self.encoder.encode(missing, batch_size=len(missing), convert_to_numpy=True)
+                )
+                for key, embedding in zip(missing, encoded):
+                    self._query_embeddings[key] = embedding
+            
+            embeddings = []
+            for key in keys:
+                self._query_embeddings.move_to_end(key)
+                embeddings.append(self._query_embeddings[key])
+            
+            while len(self._query_embeddings) > self.query_embedding_cache_size:
+                self._query_embeddings.popitem(last=False)
+        return np.stack(embeddings)
     
     def _get_match_reason(self, query: str, item: MenuItem, score: float) -> str:
         """Determine why an item was matched"""
         query_words = set(query.lower().split())
         
         # Check various matching criteria
-        if any(word in item.name.lower() for word in query_words):
+        if any(word in item.name_lower for word in query_words):
             return "Name similarity"
-        elif any(word in item.tags for word in query_words):
+        elif not item.tags_set.isdisjoint(query_words):
             return "Tag match"
-        elif any(word in item.description.lower() for word in query_words):
+        elif any(word in item.description_lower for word in query_words):
             return "Description match"
-        elif any(word in ' '.join(item.aliases).lower() for word in query_words):
+        elif any(word in item.aliases_lower for word in query_words):
             return "Alias match"
         elif score > 0.6:
             return "High semantic similarity"
@@ -404,6 +685,19 @@ class TacoBellMenuRAG:
     
     def get_recommendations(self, current_items: List[str]) -> List[MenuItem]:
         """Get recommendations based on current order"""
+        key = tuple(sorted(current_items))
+        cached = self._recommendation_cache.get(key)
+        if cached is not None:
+            self._recommendation_cache.move_to_end(key)
+            return list(cached)
+        
+        recommendations = self._compute_recommendations(key)
+        self._recommendation_cache[key] = recommendations
+        if len(self._recommendation_cache) > self.recommendation_cache_size:
+            self._recommendation_cache.popitem(last=False)
+        return list(recommendations)
+    
+    def _compute_recommendations(self, current_items: Tuple[str, ...]) -> List[MenuItem]:
         recommendations = []
         has_drink = False
         has_side = False
@@ -442,9 +736,12 @@ class TacoBellMenuRAG:
     
     def calculate_order_total(self, items: List[Tuple[str, int]]) -> float:
         """Calculate total price for order"""
+        # One batched lookup; names that need the encoder share one call
+        # and repeats come from the query-embedding cache
+        matches = self.search_menu_batch([item_name for item_name, _ in items], top_k=1)
+        
         total = 0.0
-        for item_name, quantity in items:
-            results = self.search_menu(item_name, top_k=1)
+        for (_, quantity), results in zip(items, matches):
             if results:
                 total += results[0].item.price * quantity
         return total
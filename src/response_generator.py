@@ -9,15 +9,12 @@ import random
 from typing import List, Dict, Optional
 from dataclasses import dataclass
 from datetime import datetime
-from openai import OpenAI
-from dotenv import load_dotenv
 from colorama import Fore, init
 
 from src.brand_voice import TACO_BELL_VOICE, BrandTone
 from src.intent_detector_llm import IntentResult, OrderIntent
 
 init(autoreset=True)
-load_dotenv()
 
 @dataclass
 class ResponseContext:
@@ -36,6 +33,11 @@ class TacoBellResponseGenerator:
     
     def __init__(self, model: str = "gpt-3.5-turbo-1106"):
         """Initialize response generator"""
+        # Imported here to keep the OpenAI SDK off the module import path
+        from openai import OpenAI
+        from dotenv import load_dotenv
+        load_dotenv()
+        
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("No OpenAI API key found in .env file")
@@ -186,22 +188,23 @@ RECENT CONVERSATION:
         if not context.current_order:
             return None
         
-        order_items_lower = [item.lower() for item in context.current_order]
+        # Keyword checks are case-insensitive, no need to lowercase here
+        order_items = context.current_order
         
         # Check for missing drink
-        if self.brand_config.check_no_drink(order_items_lower):
+        if self.brand_config.check_no_drink(order_items):
             return "a Baja Blast for $2.29"
         
         # Check for missing side
-        if self.brand_config.check_no_side(order_items_lower):
+        if self.brand_config.check_no_side(order_items):
             return "Nacho Fries for $1.49"
         
         # Check for combo upgrade
-        if self.brand_config.check_combo_upgrade(order_items_lower, context.order_total):
+        if self.brand_config.check_combo_upgrade(order_items, context.order_total):
             return "the $5 Cravings Box which includes way more food"
         
         # Check for dessert opportunity
-        if self.brand_config.check_dessert_opportunity(order_items_lower):
+        if self.brand_config.check_dessert_opportunity(order_items):
             return "Cinnamon Twists for just $1"
         
         return None
@@ -281,16 +284,7 @@ RECENT CONVERSATION:
     
     def get_time_based_greeting(self) -> str:
         """Get appropriate greeting based on time of day"""
-        hour = datetime.now().hour
-        
-        if 5 <= hour < 11:
-            return self.brand_config.time_based_greetings["morning"]
-        elif 11 <= hour < 17:
-            return self.brand_config.time_based_greetings["afternoon"]
-        elif 17 <= hour < 22:
-            return self.brand_config.time_based_greetings["evening"]
-        else:
-            return self.brand_config.time_based_greetings["late_night"]
+        return self.brand_config.greeting_for_hour(datetime.now().hour)
     
     def format_order_confirmation(self, order_items: List[Dict], total: float) -> str:
         """Format final order confirmation with personality"""
@@ -0,0 +1,146 @@
+"""
+Semantic Cache for Repeated Customer Utterances
+Random-projection LSH over sentence embeddings so near-identical phrasings
+("I want two crunchy tacos" / "i want 2 crunchy tacos") skip the LLM call.
+Embeddings barely move between "two" and "three crunchy tacos", so callers
+pass an exact key (quantities, item words) that a hit must also match.
+"""
+
+import numpy as np
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+class SemanticCache:
+    """LSH cache keyed on embedding vectors"""
+
+    def __init__(
+        self,
+        dim: int,
+        num_bits: int = 16,
+        num_tables: int = 8,
+        threshold: float = 0.95,
+        max_entries: int = 1024,
+        seed: int = 42
+    ):
+        """
+        Initialize the cache
+
+        Args:
+            dim: Embedding dimension
+            num_bits: Hyperplanes (signature bits) per table
+            num_tables: Number of independent hash tables
+            threshold: Minimum cosine similarity for a hit
+            max_entries: Entries kept before the oldest is evicted
+            seed: RNG seed for the random hyperplanes
+        """
+        rng = np.random.default_rng(seed)
+        # One (num_bits x dim) projection per table, stacked for a single matmul
+        self.planes = rng.standard_normal((num_tables * num_bits, dim)).astype(np.float32)
+        self.num_bits = num_bits
+        self.num_tables = num_tables
+        self.threshold = threshold
+        self.max_entries = max_entries
+
+        self.tables: List[Dict[int, List[int]]] = [{} for _ in range(num_tables)]
+        self.vectors: Dict[int, np.ndarray] = {}
+        self.values: Dict[int, Any] = {}
+        self.keys: Dict[int, Hashable] = {}
+        self.signatures: Dict[int, Tuple[int, ...]] = {}
+        self._next_id = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        # Bit weights to pack sign bits into one int per table
+        self._bit_weights = 1 << np.arange(num_bits, dtype=np.int64)
+
+    def _normalize(self, vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def hash(self, vector: np.ndarray) -> Tuple[int, ...]:
+        """Get the per-table bucket signatures for a (normalized) vector"""
+        bits = (self.planes @ vector > 0).reshape(self.num_tables, self.num_bits)
+        return tuple(int(k) for k in bits.astype(np.int64) @ self._bit_weights)
+
+    def get(self, vector: np.ndarray, key: Hashable = None) -> Optional[Any]:
+        """
+        Look up a cached value for a similar vector
+
+        Args:
+            vector: Query embedding
+            key: Exact part of the lookup; only entries set with an equal key match
+
+        Returns:
+            Cached value, or None on a miss
+        """
+        vector = self._normalize(vector)
+        signature = self.hash(vector)
+
+        # Gather candidates from every table the vector lands in
+        candidates = set()
+        for table, bucket_key in zip(self.tables, signature):
+            candidates.update(table.get(bucket_key, ()))
+
+        best_id, best_score = None, self.threshold
+        for entry_id in candidates:
+            if self.keys[entry_id] != key:
+                continue
+            score = float(self.vectors[entry_id] @ vector)
+            if score >= best_score:
+                best_id, best_score = entry_id, score
+
+        if best_id is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return self.values[best_id]
+
+    def set(self, vector: np.ndarray, value: Any, key: Hashable = None):
+        """Cache a value under a vector (and exact key, see get)"""
+        if len(self.values) >= self.max_entries:
+            self._evict(next(iter(self.values)))
+
+        vector = self._normalize(vector)
+        signature = self.hash(vector)
+        entry_id = self._next_id
+        self._next_id += 1
+
+        for table, bucket_key in zip(self.tables, signature):
+            table.setdefault(bucket_key, []).append(entry_id)
+
+        self.vectors[entry_id] = vector
+        self.values[entry_id] = value
+        self.keys[entry_id] = key
+        self.signatures[entry_id] = signature
+
+    def _evict(self, entry_id: int):
+        """Remove an entry from all tables"""
+        for table, key in zip(self.tables, self.signatures.pop(entry_id)):
+            bucket = table[key]
+            bucket.remove(entry_id)
+            if not bucket:
+                del table[key]
+        del self.vectors[entry_id]
+        del self.values[entry_id]
+        del self.keys[entry_id]
+
+    def clear(self):
+        """Drop all cached entries"""
+        self.tables = [{} for _ in range(self.num_tables)]
+        self.vectors.clear()
+        self.values.clear()
+        self.keys.clear()
+        self.signatures.clear()
+
+    def get_stats(self) -> dict:
+        """Get cache statistics"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self.values),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
@@ -1,27 +1,50 @@
-import whisper
+from faster_whisper import WhisperModel
 import pyaudio
 import wave
 import numpy as np
 import time
 import os
-from typing import Optional, Tuple
+import json
+import logging
+import threading
+from typing import Optional, Tuple, Callable
 import torch
 from pathlib import Path
 import pyttsx3
 from colorama import init, Fore, Style
 
 init(autoreset=True)
+log = logging.getLogger(__name__)
+
+# Streaming STT endpoint (Deepgram live transcription)
+STREAMING_STT_URL = (
+    "wss://api.deepgram.com/v1/listen"
+    "?encoding=linear16&sample_rate=16000&channels=1"
+    "&interim_results=true&endpointing=100"
+)
 
 class VoicePipeline:
     """Basic voice input/output pipeline for drive-thru system"""
     
-    def __init__(self, model_size: str = "base"):
+    def __init__(
+        self,
+        model_size: str = "base",
+        beam_size: int = 1,
+        vad_filter: bool = True,
+        quantize: bool = True,
+        streaming_stt: bool = False
+    ):
         """
-        Initialize voice pipeline with Whisper ASR
+        Initialize voice pipeline with faster-whisper ASR
         
         Args:
             model_size: Whisper model size (tiny, base, small, medium, large)
                        For M2 Pro 16GB, 'base' or 'small' recommended
+            beam_size: Decoding beam size (1 = greedy, fastest)
+            vad_filter: Trim silence with Silero VAD before decoding
+            quantize: Load weights as int8 (False keeps full fp32)
+            streaming_stt: Stream mic audio to a live STT service instead of
+                          recording then transcribing locally
         """
         print(f"{Fore.YELLOW}Initializing Voice Pipeline...")
         
@@ -33,25 +56,33 @@ class VoicePipeline:
         self.RECORD_SECONDS = 5  # Max recording time
         self.SILENCE_THRESHOLD = 500  # Adjust based on testing
         
-        # Initialize Whisper
+        # Decoding settings
+        self.beam_size = beam_size
+        self.vad_filter = vad_filter
+        self.vad_parameters = dict(min_silence_duration_ms=300)
+        
+        # Initialize Whisper (CTranslate2 backend)
         # Note: MPS has compatibility issues with Whisper, use CPU for now
         device = "cpu"  # Force CPU for compatibility
-        print(f"{Fore.CYAN}Loading Whisper model '{model_size}' on {device}...")
-        self.whisper_model = whisper.load_model(model_size, device=device)
+        # int8 weights are quantized at load time - same quality, ~1/3 faster on CPU
+        compute_type = "int8" if quantize else "float32"
+        print(f"{Fore.CYAN}Loading Whisper model '{model_size}' on {device} ({compute_type})...")
+        self.whisper_model = WhisperModel(model_size, device=device, compute_type=compute_type)
+        
+        # Streaming STT (needs DEEPGRAM_API_KEY, falls back to local Whisper)
+        self.stt_api_key = os.getenv("DEEPGRAM_API_KEY")
+        self.streaming_stt = streaming_stt and bool(self.stt_api_key)
+        if streaming_stt and not self.stt_api_key:
+            log.warning("No DEEPGRAM_API_KEY found, using local Whisper")
         
         # Initialize PyAudio
         self.audio = pyaudio.PyAudio()
         
-        # Initialize TTS (use macOS say command as fallback)
-        try:
-            self.tts_engine = pyttsx3.init()
-            self.tts_engine.setProperty('rate', 180)  # Speed
-            self.tts_engine.setProperty('volume', 0.9)
-            self.use_mac_say = False
-        except:
-            print(f"{Fore.YELLOW}Warning: pyttsx3 failed, using macOS 'say' command")
-            self.tts_engine = None
-            self.use_mac_say = True
+        # TTS is initialized by the first speak(): pyttsx3 isn't thread-safe
+        # (its macOS driver stalls when runAndWait runs off the creating
+        # thread), and the agent plays speech on its TTS worker thread
+        self.tts_engine = None
+        self.use_mac_say = False
         
         print(f"{Fore.GREEN}✓ Voice Pipeline initialized successfully!")
     
@@ -60,10 +91,19 @@ class VoicePipeline:
         audio_data = np.frombuffer(audio_chunk, dtype=np.int16)
         return np.max(np.abs(audio_data)) < threshold
     
-    def record_audio(self, output_file: str = "temp_recording.wav") -> str:
+    def record_audio(
+        self,
+        output_file: str = "temp_recording.wav",
+        barge_in: Optional[threading.Event] = None
+    ) -> str:
         """
         Record audio from microphone with silence detection
         
+        Args:
+            output_file: Where to write the recording
+            barge_in: Set as soon as the customer starts talking
+                     (lets the caller cut off agent speech)
+        
         Returns:
             Path to recorded audio file
         """
@@ -87,6 +127,8 @@ class VoicePipeline:
                 data = stream.read(self.CHUNK, exception_on_overflow=False)
                 
                 if not self.detect_silence(data, self.SILENCE_THRESHOLD):
+                    if not recording and barge_in is not None:
+                        barge_in.set()
                     recording = True
                     silence_chunks = 0
                     frames.append(data)
@@ -127,48 +169,196 @@ class VoicePipeline:
         
         print(f"{Fore.CYAN}Transcribing audio...")
         
-        # Transcribe with Whisper
-        result = self.whisper_model.transcribe(
+        # Transcribe with faster-whisper (segments is a lazy generator)
+        segments, _ = self.whisper_model.transcribe(
             audio_file, 
             language='en',
             task='transcribe',
+            beam_size=self.beam_size,  # 1 = greedy decoding
             temperature=0.2,  # Lower temperature for more consistent results
-            no_speech_threshold=0.3
+            no_speech_threshold=0.3,
+            vad_filter=self.vad_filter,
+            vad_parameters=self.vad_parameters
         )
+        segments = list(segments)
         
         # Extract text and calculate confidence
-        transcription = result.get('text', '').strip()
+        transcription = "".join(s.text for s in segments).strip()
         
         # Simple confidence calculation based on no_speech_prob
-        segments = result.get('segments', [])
         if segments:
-            avg_no_speech = np.mean([s.get('no_speech_prob', 0) for s in segments])
+            avg_no_speech = np.mean([s.no_speech_prob for s in segments])
             confidence = 1.0 - avg_no_speech
         else:
             confidence = 0.0
         
         return transcription, confidence
     
-    def speak(self, text: str):
-        """Convert text to speech"""
+    def stream_transcribe(
+        self,
+        barge_in: Optional[threading.Event] = None,
+        on_partial: Optional[Callable[[str], None]] = None
+    ) -> Tuple[str, float]:
+        """
+        Stream microphone audio to the live STT service
+        
+        PCM16 frames are sent as they are captured and partial transcripts
+        come back while the customer is still talking, so we return as soon
+        as the service marks the end of the utterance instead of waiting for
+        a full record + transcribe cycle.
+        
+        Args:
+            barge_in: Set on the first recognized speech
+            on_partial: Called with the transcript so far on each interim result
+                (e.g. to start intent detection early)
+        
+        Returns:
+            Tuple of (transcription, confidence_score)
+        """
+        from websockets.sync.client import connect
+        
+        print(f"{Fore.YELLOW}🎤 Listening... (speak now)")
+        
+        stream = self.audio.open(
+            format=self.FORMAT,
+            channels=self.CHANNELS,
+            rate=self.RATE,
+            input=True,
+            frames_per_buffer=self.CHUNK
+        )
+        
+        done = threading.Event()
+        finals = []
+        confidences = []
+        
+        def send_audio(ws):
+            max_chunks = int(self.RATE / self.CHUNK * self.RECORD_SECONDS)
+            try:
+                for _ in range(max_chunks):
+                    if done.is_set():
+                        break
+                    ws.send(stream.read(self.CHUNK, exception_on_overflow=False))
+                ws.send(json.dumps({"type": "CloseStream"}))
+            except Exception:
+                pass  # Socket closed after the final transcript
+        
+        try:
+            with connect(
+                STREAMING_STT_URL,
+                additional_headers={"Authorization": f"Token {self.stt_api_key}"}
+            ) as ws:
+                sender = threading.Thread(target=send_audio, args=(ws,), daemon=True)
+                sender.start()
+                
+                for message in ws:
+                    result = json.loads(message)
+                    if result.get("type") != "Results":
+                        continue
+                    
+                    alternative = result["channel"]["alternatives"][0]
+                    if barge_in is not None and alternative.get("transcript"):
+                        barge_in.set()
+                    
+                    if result.get("is_final") and alternative.get("transcript"):
+                        finals.append(alternative["transcript"])
+                        confidences.append(alternative.get("confidence", 0.0))
+                    elif on_partial is not None and alternative.get("transcript"):
+                        on_partial(" ".join(finals + [alternative["transcript"]]))
+                    
+                    # Endpoint detected - customer stopped talking
+                    if result.get("speech_final") and finals:
+                        break
+                
+                done.set()
+                sender.join(timeout=1)
+        except Exception as e:
+            log.warning("Streaming STT error: %s", e)
+        finally:
+            done.set()
+            stream.stop_stream()
+            stream.close()
+        
+        transcription = " ".join(finals).strip()
+        confidence = float(np.mean(confidences)) if confidences else 0.0
+        
+        return transcription, confidence
+    
+    def _init_tts(self):
+        """Create the pyttsx3 engine on the calling thread (use macOS say command as fallback)"""
+        try:
+            self.tts_engine = pyttsx3.init()
+            self.tts_engine.setProperty('rate', 180)  # Speed
+            self.tts_engine.setProperty('volume', 0.9)
+        except:
+            print(f"{Fore.YELLOW}Warning: pyttsx3 failed, using macOS 'say' command")
+            self.tts_engine = None
+            self.use_mac_say = True
+    
+    def speak(self, text: str, stop_event: Optional[threading.Event] = None):
+        """
+        Convert text to speech
+        
+        Always call this from the same thread - the pyttsx3 engine belongs
+        to the thread that first speaks.
+        
+        Args:
+            text: Text to speak
+            stop_event: When set, playback is cut off (barge-in)
+        """
+        if stop_event is not None and stop_event.is_set():
+            return
+        
+        if self.tts_engine is None and not self.use_mac_say:
+            self._init_tts()
+        
         print(f"{Fore.MAGENTA}🔊 Speaking: {text}")
         if self.use_mac_say:
             # Use macOS say command
             import subprocess
-            subprocess.run(['say', text], check=False)
+            process = subprocess.Popen(['say', text])
+            while process.poll() is None:
+                if stop_event is not None and stop_event.wait(0.05):
+                    process.terminate()
+                    break
+            process.wait()
         else:
+            if stop_event is not None:
+                def on_word(name, location, length):
+                    if stop_event.is_set():
+                        self.tts_engine.stop()
+                token = self.tts_engine.connect('started-word', on_word)
+            
             self.tts_engine.say(text)
             self.tts_engine.runAndWait()
+            
+            if stop_event is not None:
+                self.tts_engine.disconnect(token)
     
-    def process_voice_input(self) -> Tuple[str, float]:
+    def process_voice_input(
+        self,
+        barge_in: Optional[threading.Event] = None,
+        on_partial: Optional[Callable[[str], None]] = None
+    ) -> Tuple[str, float]:
         """
         Complete pipeline: record -> transcribe -> return text
         
+        Args:
+            barge_in: Set as soon as the customer starts talking
+            on_partial: Called with each interim transcript (streaming STT only)
+        
         Returns:
             Tuple of (transcribed_text, confidence)
         """
+        if self.streaming_stt:
+            text, confidence = self.stream_transcribe(barge_in, on_partial)
+            if text:
+                print(f"{Fore.GREEN}📝 Heard: '{text}' (confidence: {confidence:.2f})")
+            else:
+                print(f"{Fore.RED}❌ Could not understand audio")
+            return text, confidence
+        
         # Record audio
-        audio_file = self.record_audio()
+        audio_file = self.record_audio(barge_in=barge_in)
         
         if not audio_file:
             return "", 0.0
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""Test the paths that answer or guard a turn without a full LLM round trip"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.local_intent import LocalIntentClassifier, EXAMPLE_PHRASES
+from src.intent_detector_llm import OrderIntent, IntentResult
+from src.error_handler import CircuitBreaker, CircuitState, RetryHandler
+from colorama import init, Fore
+import numpy as np
+import asyncio
+import zlib
+import time
+
+init(autoreset=True)
+
+class HashEncoder:
+    """Deterministic stand-in for the sentence encoder: one random unit vector per phrase"""
+    dim = 256
+    
+    def encode(self, sentences, batch_size: int = 32, convert_to_numpy: bool = True):
+        return np.stack([
+            np.random.default_rng(zlib.crc32(sentence.encode())).standard_normal(self.dim)
+            for sentence in sentences
+        ]).astype(np.float32)
+
+def _unit(vector):
+    return vector / np.linalg.norm(vector)
+
+def test_local_intent_threshold_and_margin():
+    """Confident entity-free matches answer locally; weak or ambiguous ones go to the LLM"""
+    print(f"{Fore.CYAN}{'='*60}")
+    print(f"{Fore.CYAN}LOCAL INTENT CLASSIFIER TEST")
+    print(f"{Fore.CYAN}{'='*60}\n")
+    
+    encoder = HashEncoder()
+    classifier = LocalIntentClassifier(encoder, threshold=0.8, margin=0.05)
+    embed = lambda phrase: _unit(encoder.encode([phrase])[0])
+    
+    confirm = embed(EXAMPLE_PHRASES[OrderIntent.CONFIRM_ORDER][0])
+    ask_menu = embed(EXAMPLE_PHRASES[OrderIntent.ASK_MENU][0])
+    order_item = embed(EXAMPLE_PHRASES[OrderIntent.ORDER_ITEM][0])
+    
+    result = classifier.classify("that's all for me", confirm)
+    assert result is not None and result.intent == OrderIntent.CONFIRM_ORDER, f"Expected a local hit, got {result}"
+    assert result.confidence > 0.99 and result.entities['items'] == []
+    print(f"{Fore.GREEN}✓ Exact example answered locally ({result.confidence:.2f})")
+    
+    # cos 0.7 to the nearest example: under the 0.8 threshold
+    weak = 0.7 * confirm + np.sqrt(1 - 0.7 ** 2) * embed("something unrelated")
+    assert classifier.classify("weak", weak) is None, "Below threshold must fall through"
+    print(f"{Fore.GREEN}✓ Below-threshold match rejected")
+    
+    # Equally close to two intents: passes a lower threshold but not the margin
+    lenient = LocalIntentClassifier(encoder, threshold=0.5, margin=0.05)
+    between = _unit(confirm + ask_menu)
+    assert lenient.classify("between", between) is None, "Ambiguous match must fall through"
+    leaning = _unit(0.8 * confirm + 0.6 * ask_menu)
+    result = lenient.classify("leaning", leaning)
+    assert result is not None and result.intent == OrderIntent.CONFIRM_ORDER, "Clear winner beats the margin"
+    print(f"{Fore.GREEN}✓ Margin separates ambiguous from clear matches")
+    
+    # Item orders need entity extraction, however close the match
+    assert classifier.classify("can i get two crunchy tacos", order_item) is None, \
+        "Entity intents always go to the LLM"
+    print(f"{Fore.GREEN}✓ Entity intents never answered locally")
+    
+    assert classifier.hits == 1 and lenient.hits == 1, "Only local answers count as hits"
+    return True
+
+def test_circuit_breaker_transitions():
+    """Closed -> open at the threshold, one half-open probe, closed or open again"""
+    print(f"\n{Fore.CYAN}{'='*60}")
+    print(f"{Fore.CYAN}CIRCUIT BREAKER TEST")
+    print(f"{Fore.CYAN}{'='*60}\n")
+    
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.05)
+    
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED and breaker.allow(), "Stays closed under the threshold"
+    
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN, "Opens at the threshold"
+    assert not breaker.allow(), "Open breaker blocks calls"
+    print(f"{Fore.GREEN}✓ Opens after {breaker.failure_threshold} failures")
+    
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == CircuitState.HALF_OPEN, "Cool-down lets a probe through"
+    assert not breaker.allow(), "Only one probe per cool-down"
+    
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN and not breaker.allow(), "Failed probe re-opens"
+    print(f"{Fore.GREEN}✓ Failed half-open probe re-opens")
+    
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == CircuitState.HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED and breaker.failures == 0, "Successful probe closes"
+    assert breaker.allow()
+    print(f"{Fore.GREEN}✓ Successful half-open probe closes")
+    return True
+
+def test_retry_budget():
+    """Retries stop at the wall-clock budget, not just the attempt count"""
+    print(f"\n{Fore.CYAN}{'='*60}")
+    print(f"{Fore.CYAN}RETRY BUDGET TEST")
+    print(f"{Fore.CYAN}{'='*60}\n")
+    
+    calls = []
+    def always_fails():
+        calls.append(time.monotonic())
+        raise TimeoutError("upstream timeout")
+    
+    # No budget left after the first failure: exactly one attempt
+    assert RetryHandler.retry_with_backoff(always_fails, max_retries=5, total_budget=0) is None
+    assert len(calls) == 1, f"Expected 1 attempt, got {len(calls)}"
+    print(f"{Fore.GREEN}✓ Zero budget means a single attempt")
+    
+    # Plenty of attempts allowed, but the budget runs out first
+    calls.clear()
+    start = time.monotonic()
+    result = RetryHandler.retry_with_backoff(
+        always_fails, max_retries=1000, initial_delay=0.02, backoff_factor=1.0, total_budget=0.2
+    )
+    elapsed = time.monotonic() - start
+    assert result is None
+    assert 1 < len(calls) < 1000, f"Budget should cut retries short ({len(calls)} attempts)"
+    assert elapsed < 0.2 + 0.05, f"Overran the budget: {elapsed:.2f}s"
+    print(f"{Fore.GREEN}✓ Budget exhausted after {len(calls)} attempts in {elapsed:.2f}s")
+    
+    # Non-retryable errors fail at once
+    calls.clear()
+    def bad_request():
+        calls.append(time.monotonic())
+        raise ValueError("bad request")
+    assert RetryHandler.retry_with_backoff(bad_request, retryable=(TimeoutError,)) is None
+    assert len(calls) == 1, "Non-retryable error must not be retried"
+    print(f"{Fore.GREEN}✓ Non-retryable errors are not retried")
+    return True
+
+def test_inflight_coalescing():
+    """Identical concurrent requests share one API call"""
+    print(f"\n{Fore.CYAN}{'='*60}")
+    print(f"{Fore.CYAN}REQUEST COALESCING TEST")
+    print(f"{Fore.CYAN}{'='*60}\n")
+    
+    from src.intent_detector_llm import TacoBellIntentDetector
+    detector = TacoBellIntentDetector()
+    
+    requests = []
+    async def fake_request(text, conversation_history, stable_history, cache_key):
+        requests.append(text)
+        await asyncio.sleep(0.05)
+        return IntentResult(
+            intent=OrderIntent.ORDER_ITEM,
+            confidence=0.95,
+            entities={'items': ['crunchy taco'], 'quantities': {'crunchy taco': 2}, 'modifications': []},
+            raw_text=text
+        )
+    detector._arequest_intent = fake_request
+    
+    async def run():
+        history = ["Agent: What can I get for you?"]
+        return await asyncio.gather(
+            detector.adetect_intent("two crunchy tacos", history),
+            detector.adetect_intent("Two  crunchy tacos", history),
+            detector.adetect_intent("two crunchy tacos", history),
+            detector.adetect_intent("a bean burrito", history)
+        )
+    
+    results = asyncio.run(run())
+    assert sorted(requests) == ["a bean burrito", "two crunchy tacos"], f"Unexpected calls: {requests}"
+    assert all(r.intent == OrderIntent.ORDER_ITEM for r in results)
+    assert results[1].raw_text == "Two  crunchy tacos", "Waiters get their own raw text"
+    assert results[1].entities is not results[0].entities, "Waiters get their own entities"
+    assert not detector._inflight, "In-flight table is emptied"
+    print(f"{Fore.GREEN}✓ 4 requests, {len(requests)} API calls")
+    
+    detector.close()
+    return True
+
+def test_degraded_fallback():
+    """Keyword fallback keeps quantities; only transport errors trip the breaker"""
+    print(f"\n{Fore.CYAN}{'='*60}")
+    print(f"{Fore.CYAN}DEGRADED FALLBACK TEST")
+    print(f"{Fore.CYAN}{'='*60}\n")
+    
+    from types import SimpleNamespace
+    from src.intent_detector_llm import TacoBellIntentDetector
+    detector = TacoBellIntentDetector()
+    
+    result = detector._local_fallback("can i get two crunchy tacos and a bean burrito")
+    assert result.entities['degraded'], "Fallback results are marked degraded"
+    assert result.entities['quantities'] == {'crunchy taco': 2, 'bean burrito': 1}, \
+        f"Unexpected quantities: {result.entities['quantities']}"
+    assert detector._local_fallback("3 crunchy taco supremes").entities['quantities'] == {'crunchy taco supreme': 3}
+    print(f"{Fore.GREEN}✓ Counts before item names are kept")
+    
+    real_client = detector.client
+    def reply(content):
+        message = SimpleNamespace(content=content)
+        return lambda **kwargs: SimpleNamespace(choices=[SimpleNamespace(message=message)])
+    def outage(**kwargs):
+        raise TimeoutError("API timed out")
+    
+    detector.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=None)))
+    detector.breaker.record_failure()
+    detector.client.chat.completions.create = reply("not json")
+    result = detector.detect_intent("two crunchy tacos please")
+    assert result.entities.get('degraded'), "Unparseable reply falls back locally"
+    assert detector.breaker.failures == 1, "Parse errors are neither outages nor successes"
+    print(f"{Fore.GREEN}✓ Unparseable reply leaves the breaker alone")
+    
+    detector.client.chat.completions.create = outage
+    detector.detect_intent("two crunchy tacos please")
+    assert detector.breaker.failures == 2, "Transport errors count as failures"
+    
+    detector.client.chat.completions.create = reply('{"intent": "order_item", "items": ["crunchy taco"]}')
+    result = detector.detect_intent("two crunchy tacos please")
+    assert result.intent == OrderIntent.ORDER_ITEM and detector.breaker.failures == 0, "Parsed reply is a success"
+    print(f"{Fore.GREEN}✓ Outages count as failures, parsed replies as successes")
+    
+    detector.client = real_client
+    detector.close()
+    return True
+
+def test_order_indices():
+    """Order totals, merges and lookups stay right as lines change"""
+    print(f"\n{Fore.CYAN}{'='*60}")
+    print(f"{Fore.CYAN}ORDER INDEX TEST")
+    print(f"{Fore.CYAN}{'='*60}\n")
+    
+    from src.conversation_manager import Order as OrderV1, OrderItem as OrderItemV1
+    from src.conversation_manager_v2 import Order as OrderV2, OrderItem as OrderItemV2
+    
+    for Order, OrderItem in ((OrderV1, OrderItemV1), (OrderV2, OrderItemV2)):
+        taco = OrderItem(name="Crunchy Taco", quantity=2, price=1.49)
+        order = Order(items=[taco])
+        order.add_item(OrderItem(name="Bean Burrito", quantity=1, price=1.99, modifications=["no onions"]))
+        assert order.get_total() == 4.97
+        
+        # Same name and modifications merge into one line
+        order.add_item(OrderItem(name="Crunchy Taco", quantity=1, price=1.49))
+        assert len(order.items) == 2 and taco.quantity == 3 and order.get_total() == 6.46
+        
+        # Editing a line directly keeps the total and summary current
+        taco.quantity = 1
+        taco.price = 1.79
+        assert order.get_total() == 3.78, f"Stale total: {order.get_total()}"
+        assert "1x Crunchy Taco - $1.79" in order.get_summary()
+        
+        # Reassigned modifications re-key the line
+        taco.modifications = ["extra cheese"]
+        order.add_item(OrderItem(name="Crunchy Taco", quantity=1, price=1.79, modifications=["extra cheese"]))
+        assert len(order.items) == 2 and taco.quantity == 2
+        
+        assert order.remove_item("crunchy taco") and order.get_total() == 1.99
+        assert [item.name for item in order.items] == ["Bean Burrito"]
+        print(f"{Fore.GREEN}✓ {Order.__module__}.Order indices consistent")
+    
+    for Order, OrderItem in ((OrderV1, OrderItemV1), (OrderV2, OrderItemV2)):
+        order = Order(items=[OrderItem(name="Crunchy Taco", quantity=2, price=1.49)])
+        for mutate in (
+            lambda: order.items.append(OrderItem(name="Bean Burrito", quantity=1, price=1.29)),
+            lambda: order.items.pop(),
+            lambda: order.items.__setitem__(0, OrderItem(name="Soft Taco", quantity=1, price=1.79))
+        ):
+            try:
+                mutate()
+                assert False, "Order.items must not be mutable in place"
+            except TypeError:
+                pass
+        assert len(order.items) == 1 and order.get_total() == 2.98, "Rejected edits leave the order as it was"
+        
+        # Reassigning the whole list goes through the Order and re-indexes
+        order.items = [OrderItem(name="Bean Burrito", quantity=1, price=1.29)]
+        assert order.get_total() == 1.29 and order.remove_item("bean burrito") and order.get_total() == 0
+        print(f"{Fore.GREEN}✓ {Order.__module__}.Order.items is read-only")
+    return True
+
+def test_local_confirm_after_upsell():
+    """A local CONFIRM_ORDER hit right after an upsell offer goes to the LLM"""
+    print(f"\n{Fore.CYAN}{'='*60}")
+    print(f"{Fore.CYAN}LOCAL CONFIRM GATE TEST")
+    print(f"{Fore.CYAN}{'='*60}\n")
+    
+    from src.conversation_manager_v2 import EnhancedConversationManager, ConversationState
+    manager = EnhancedConversationManager()
+    # Pin the classifier's answer - what's under test is the manager's gate
+    manager.local_intent.classify = lambda text, embedding: IntentResult(
+        intent=OrderIntent.CONFIRM_ORDER,
+        confidence=0.9,
+        entities={'items': [], 'quantities': {}, 'modifications': [], 'tone': 'confirming'},
+        raw_text=text
+    )
+    
+    manager.state = ConversationState.TAKING_ORDER
+    manager._pending_upsell = "Baja Blast"
+    result, _ = manager._lookup_intent("yes that sounds right")
+    assert result is None, f"Upsell answer must not confirm the order locally, got {result}"
+    print(f"{Fore.GREEN}✓ Upsell answer handed to the LLM")
+    
+    manager._pending_upsell = None
+    result, _ = manager._lookup_intent("that looks right to me")
+    assert result is not None and result.intent == OrderIntent.CONFIRM_ORDER, "No offer pending: local hit stands"
+    print(f"{Fore.GREEN}✓ Local confirmation used when no offer is pending")
+    return True
+
+def main():
+    """Run all fast path tests"""
+    print(f"{Fore.MAGENTA}{'='*60}")
+    print(f"{Fore.MAGENTA}FAST PATH TESTS")
+    print(f"{Fore.MAGENTA}{'='*60}\n")
+    
+    results = {}
+    
+    results["Local Intent"] = test_local_intent_threshold_and_margin()
+    results["Circuit Breaker"] = test_circuit_breaker_transitions()
+    results["Retry Budget"] = test_retry_budget()
+    results["Coalescing"] = test_inflight_coalescing()
+    results["Degraded Fallback"] = test_degraded_fallback()
+    results["Order Indices"] = test_order_indices()
+    results["Local Confirm Gate"] = test_local_confirm_after_upsell()
+    
+    # Summary
+    print(f"\n{Fore.MAGENTA}{'='*60}")
+    print(f"{Fore.MAGENTA}FAST PATH TEST SUMMARY")
+    print(f"{Fore.MAGENTA}{'='*60}\n")
+    
+    for test_name, passed in results.items():
+        status = f"{Fore.GREEN}✅ PASS" if passed else f"{Fore.RED}❌ FAIL"
+        print(f"{test_name:20} {status}")
+    
+    if all(results.values()):
+        print(f"\n{Fore.GREEN}🎉 Fast paths working!")
+    else:
+        print(f"\n{Fore.YELLOW}⚠️ Some tests need attention")
+
+if __name__ == "__main__":
+    main()
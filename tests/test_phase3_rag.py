@@ -46,6 +46,41 @@ def test_menu_search():
     
     return len(results) > 0
 
+def test_semantic_top1():
+    """Pin top-1 semantic matches (the score thresholds assume the default MiniLM encoder)"""
+    print(f"{Fore.CYAN}{'='*60}")
+    print(f"{Fore.CYAN}SEMANTIC TOP-1 TEST")
+    print(f"{Fore.CYAN}{'='*60}\n")
+    
+    rag = TacoBellMenuRAG()
+    assert rag.encoder_backend != 'model2vec', "Static embeddings must stay opt-in"
+    
+    # None of these hit a name, alias or tag exactly, so they go through the encoder
+    expected = {
+        "five layer burrito": "Beefy 5-Layer Burrito",
+        "the crunchwrap": "Crunchwrap Supreme",
+        "pinto bean burrito": "Bean Burrito",
+        "dorito loco taco": "Doritos Locos Tacos",
+        "sugar twists": "Cinnamon Twists",
+        "mountain dew baja blast": "Baja Blast",
+    }
+    
+    mismatches = []
+    for query, name in expected.items():
+        results = rag.search_menu(query, top_k=1)
+        top = results[0] if results else None
+        found = top.item.name if top else None
+        # The manager only adds items scoring above 0.5
+        if found == name and top.score > 0.5:
+            print(f"  {Fore.GREEN}✓ '{query}' → {found} ({top.score:.2f})")
+        else:
+            print(f"  {Fore.RED}✗ '{query}' → {found}, expected {name}")
+            mismatches.append(query)
+    print()
+    
+    assert not mismatches, f"Top-1 changed for {mismatches}"
+    return True
+
 def test_recommendations():
     """Test recommendation system"""
     print(f"{Fore.CYAN}{'='*60}")
@@ -146,6 +181,10 @@ def main():
     print(f"{Fore.CYAN}Test 1: Menu Search")
     results["Search"] = test_menu_search()
     
+    # Test 1b: Semantic top-1 matches
+    print(f"{Fore.CYAN}Test 1b: Semantic Top-1")
+    results["Semantic Top-1"] = test_semantic_top1()
+    
     # Test 2: Recommendations
     print(f"{Fore.CYAN}Test 2: Recommendations")
     test_recommendations()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Test the LSH semantic intent cache"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.semantic_cache import SemanticCache
+from colorama import init, Fore
+import numpy as np
+
+init(autoreset=True)
+
+DIM = 384
+
+def _unit(vector):
+    return vector / np.linalg.norm(vector)
+
+def _near(vector, similarity, rng):
+    """A unit vector with the given cosine similarity to `vector`"""
+    noise = rng.standard_normal(vector.shape)
+    noise -= (noise @ vector) * vector
+    noise = _unit(noise)
+    return similarity * vector + np.sqrt(1 - similarity ** 2) * noise
+
+def test_lsh_signatures():
+    """Signatures are deterministic, one bucket per table, and shared by close vectors"""
+    print(f"{Fore.CYAN}{'='*60}")
+    print(f"{Fore.CYAN}LSH SIGNATURE TEST")
+    print(f"{Fore.CYAN}{'='*60}\n")
+    
+    rng = np.random.default_rng(0)
+    cache = SemanticCache(dim=DIM, num_bits=16, num_tables=8)
+    vector = _unit(rng.standard_normal(DIM))
+    
+    signature = cache.hash(vector)
+    assert len(signature) == 8, "One bucket key per table"
+    assert all(0 <= key < 2 ** 16 for key in signature), "Keys fit in num_bits"
+    assert signature == cache.hash(vector.copy()), "Hashing is deterministic"
+    assert signature == SemanticCache(dim=DIM).hash(vector), "Same seed, same hyperplanes"
+    
+    # Scaling doesn't change which side of a hyperplane a vector is on
+    assert signature == cache.hash(vector * 7.5), "Signature ignores magnitude"
+    
+    # A near-duplicate collides in at least one table; an unrelated vector shouldn't in all
+    near = _unit(_near(vector, 0.99, rng))
+    assert any(a == b for a, b in zip(signature, cache.hash(near))), "Near vector shares a bucket"
+    other = _unit(rng.standard_normal(DIM))
+    assert signature != cache.hash(other), "Unrelated vector has a different signature"
+    
+    print(f"{Fore.GREEN}✓ LSH signatures behave")
+    return True
+
+def test_hits_and_misses():
+    """Hits need cosine >= threshold; stats count both"""
+    print(f"\n{Fore.CYAN}{'='*60}")
+    print(f"{Fore.CYAN}HIT / MISS TEST")
+    print(f"{Fore.CYAN}{'='*60}\n")
+    
+    rng = np.random.default_rng(1)
+    cache = SemanticCache(dim=DIM, threshold=0.95)
+    vector = _unit(rng.standard_normal(DIM))
+    
+    assert cache.get(vector) is None, "Empty cache misses"
+    cache.set(vector, "order_item")
+    
+    assert cache.get(vector) == "order_item", "Same vector hits"
+    assert cache.get(vector * 3) == "order_item", "Lookup normalizes the query"
+    assert cache.get(_near(vector, 0.99, rng)) == "order_item", "Near-duplicate hits"
+    assert cache.get(_near(vector, 0.80, rng)) is None, "Below threshold misses"
+    assert cache.get(-vector) is None, "Opposite vector misses"
+    
+    stats = cache.get_stats()
+    assert stats["hits"] == 3 and stats["misses"] == 3, f"Unexpected stats: {stats}"
+    assert stats["entries"] == 1
+    
+    print(f"{Fore.GREEN}✓ Hits at >= threshold, misses below")
+    return True
+
+def test_exact_key():
+    """Quantity variants embed alike, so the exact key keeps them apart"""
+    print(f"\n{Fore.CYAN}{'='*60}")
+    print(f"{Fore.CYAN}EXACT KEY TEST")
+    print(f"{Fore.CYAN}{'='*60}\n")
+    
+    rng = np.random.default_rng(2)
+    cache = SemanticCache(dim=DIM)
+    two_tacos = _unit(rng.standard_normal(DIM))
+    # "three crunchy tacos" is nearly the same embedding as "two crunchy tacos"
+    three_tacos = _near(two_tacos, 0.99, rng)
+    
+    cache.set(two_tacos, {"quantities": {"crunchy taco": 2}}, key=(("2",), (), ("crunchy", "taco")))
+    
+    assert cache.get(three_tacos, key=(("3",), (), ("crunchy", "taco"))) is None, \
+        "Different quantity must not replay the cached entities"
+    assert cache.get(three_tacos, key=(("2",), (), ("crunchy", "taco"))) is not None, \
+        "Same key and a close embedding hits"
+    assert cache.get(two_tacos) is None, "Keyed entry doesn't match a keyless lookup"
+    
+    # Both variants can live side by side
+    cache.set(three_tacos, {"quantities": {"crunchy taco": 3}}, key=(("3",), (), ("crunchy", "taco")))
+    hit = cache.get(two_tacos, key=(("3",), (), ("crunchy", "taco")))
+    assert hit == {"quantities": {"crunchy taco": 3}}, f"Wrong entry for key: {hit}"
+    
+    print(f"{Fore.GREEN}✓ Exact key separates quantity variants")
+    return True
+
+def test_eviction_and_clear():
+    """Oldest entry goes first once full; clear empties every table"""
+    print(f"\n{Fore.CYAN}{'='*60}")
+    print(f"{Fore.CYAN}EVICTION TEST")
+    print(f"{Fore.CYAN}{'='*60}\n")
+    
+    rng = np.random.default_rng(3)
+    cache = SemanticCache(dim=DIM, max_entries=3)
+    vectors = [_unit(rng.standard_normal(DIM)) for _ in range(4)]
+    for i, vector in enumerate(vectors):
+        cache.set(vector, i)
+    
+    assert cache.get_stats()["entries"] == 3, "Capped at max_entries"
+    assert cache.get(vectors[0]) is None, "Oldest entry evicted"
+    assert [cache.get(v) for v in vectors[1:]] == [1, 2, 3], "Newer entries kept"
+    assert sum(len(bucket) for table in cache.tables for bucket in table.values()) == 3 * cache.num_tables, \
+        "Evicted id removed from every table"
+    
+    cache.clear()
+    assert cache.get(vectors[3]) is None, "Cleared cache misses"
+    assert not any(cache.tables) and not cache.keys, "Clear empties tables and keys"
+    
+    print(f"{Fore.GREEN}✓ Eviction and clear keep tables consistent")
+    return True
+
+def test_manager_cache_key():
+    """The conversation manager's exact key tracks quantities and items"""
+    print(f"\n{Fore.CYAN}{'='*60}")
+    print(f"{Fore.CYAN}MANAGER CACHE KEY TEST")
+    print(f"{Fore.CYAN}{'='*60}\n")
+    
+    from src.conversation_manager_v2 import EnhancedConversationManager
+    manager = EnhancedConversationManager()
+    key = manager._semantic_intent_key
+    
+    assert key("I want two crunchy tacos") == key("i want 2 crunchy taco"), "Digits and number words agree"
+    assert key("I want two crunchy tacos") != key("I want three crunchy tacos"), "Quantities differ"
+    assert key("crunchy taco no lettuce") != key("crunchy taco extra lettuce"), "Modifiers differ"
+    assert key("a bean burrito") != key("a beef burrito"), "Items differ"
+    assert key("yes please") is None, "Context-dependent answers aren't semantic-cached"
+    
+    print(f"{Fore.GREEN}✓ Manager key separates quantity variants")
+    return True
+
+def main():
+    """Run all semantic cache tests"""
+    print(f"{Fore.MAGENTA}{'='*60}")
+    print(f"{Fore.MAGENTA}SEMANTIC CACHE TESTS")
+    print(f"{Fore.MAGENTA}{'='*60}\n")
+    
+    results = {}
+    
+    results["LSH Signatures"] = test_lsh_signatures()
+    results["Hits and Misses"] = test_hits_and_misses()
+    results["Exact Key"] = test_exact_key()
+    results["Eviction"] = test_eviction_and_clear()
+    results["Manager Key"] = test_manager_cache_key()
+    
+    # Summary
+    print(f"\n{Fore.MAGENTA}{'='*60}")
+    print(f"{Fore.MAGENTA}SEMANTIC CACHE TEST SUMMARY")
+    print(f"{Fore.MAGENTA}{'='*60}\n")
+    
+    for test_name, passed in results.items():
+        status = f"{Fore.GREEN}✅ PASS" if passed else f"{Fore.RED}❌ FAIL"
+        print(f"{test_name:20} {status}")
+    
+    if all(results.values()):
+        print(f"\n{Fore.GREEN}🎉 Semantic cache working!")
+    else:
+        print(f"\n{Fore.YELLOW}⚠️ Some tests need attention")
+
+if __name__ == "__main__":
+    main()